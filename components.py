@@ -77,6 +77,10 @@ class Terminal(QtWidgets.QPlainTextEdit):
     The widget where user interacts with the interpreter. Runs the interpreter and output from the interpreter is kept read-only, along with previous
     inputs from the user.
     """
+    #
+    # Number of milliseconds a stopped program is given to finish before its process is killed
+    #
+    STOP_TIMEOUT_MS: int = 1000
 
     def __init__(self, on_run_start: Optional[Callable] = None, on_run_end: Optional[Callable] = None, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -183,10 +187,14 @@ class Terminal(QtWidgets.QPlainTextEdit):
 
     def stop_running(self):
         """
-        Ends the running process
+        Ends the running process. It is first asked to terminate, so that the interpreter writes out the output it has buffered,
+        and is only killed if it has not finished in time
         :return:
         """
-        self.process.close()
+        process: QtCore.QProcess = self.process
+        process.terminate()
+        if not process.waitForFinished(Terminal.STOP_TIMEOUT_MS):
+            process.close()
         self.process = None
 
     @property
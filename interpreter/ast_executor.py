@@ -1,7 +1,9 @@
 import operator
 import logging
 import os
-from typing import Callable, Type, Dict, TypeVar, Optional, List, Tuple
+import sys
+import threading
+from typing import Callable, Type, Dict, TypeVar, Optional, List, Tuple, Sequence
 from parsed_ast import Node, Program, VarAssign, Identifier, IntLiteral, ArrayDecl, AddrMember, ExprList, \
     Expr, Term, Factor, UnaryMinus, IfElse, UnaryNot, SwitchCase, ForLoop, GoToInstr, InnerInstrBlock, DoUntil, \
     WhileLoop, StrLiteral, NumLiteral, PrintInstr, FunDecl, AddrIdOrCall, Param, ReturnInstr, CallableSuffix, ProcDecl, CastStr, CastInt, CastFloat, Length, StrSubstring, Input, EndOfFile, \
@@ -9,8 +11,13 @@ from parsed_ast import Node, Program, VarAssign, Identifier, IntLiteral, ArrayDe
     Comparison, Disjunction, ArithmExpr, Op
 from parsed_token import TokenVals, KNOWN_TOKEN_VALS, TokenContents
 from parser import Parser
-from sym_table import V, SymTable, ArrayVal, SymAddr, NullVal, ObjSymTable
-from io import TextIOWrapper
+from sym_table import V, SymTable, ArrayVal, SymAddr, SymRef, NullVal, NULL, ObjSymTable, LocalSymTable, ClassLayout, ObjRef, ObjectHeap, StrBuilder, StrView, \
+    LAZY_STR_TYPES, RENDERED_TYPES, render_value
+from io import IOBase
+from memo_cache import MemoCache
+from output_writer import OutputWriter, FlushPolicy
+from erl_file import ErlFile
+from input_provider import InputProvider, StdinInputProvider
 
 #
 # Generic types for evaluation results and symbol table keys, respectively
@@ -35,6 +42,8 @@ class ExeCtx(Dict[K, V]):
       - a flag indicating if the current instruction is inside a procedure
       - a list of the names of parameters passed by reference in subroutine calls (default = [])
       - the outer object in which current execution takes place (e.g. if an object method is called, this value is set to the object storing that method) (default = None)
+      - the call stack, an explicit stack of CallFrame instances for the subroutine calls in progress, the innermost call being at the top
+      - the object heap, in which instantiated objects are allocated
     """
     GLOBAL_SYM_TABLE: str = "__GLOBAL_SYM_TABLE__"
     CUR_SYM_EXEC_TABLE: str = "__CUR_SYM_EXEC_TABLE__"
@@ -49,12 +58,16 @@ class ExeCtx(Dict[K, V]):
     INSIDE_PROC: str = "__INSIDE_PROC__"
     BY_REF_PARAMS: str = "__BY_REF_PARAMS__"
     OUTER_CLASS: str = "__OUTER_CLASS__"
+    CALL_STACK: str = "__CALL_STACK__"
+    OBJECT_HEAP: str = "__OBJECT_HEAP__"
 
     def __init__(self):
         super().__init__()
         self[ExeCtx.GLOBAL_SYM_TABLE] = SymTable()
         self[ExeCtx.CUR_SYM_EXEC_TABLE] = self.global_table
         self[ExeCtx.CUR_SYM_LOOKUP_TABLE] = self.global_table
+        self[ExeCtx.CALL_STACK] = []
+        self[ExeCtx.OBJECT_HEAP] = ObjectHeap()
 
     @property
     def global_table(self) -> SymTable:
@@ -154,24 +167,121 @@ class ExeCtx(Dict[K, V]):
 
     @property
     def outer_class(self) -> Optional[ObjSymTable]:
-        assert isinstance(self.get(ExeCtx.OUTER_CLASS, None), Optional[ObjSymTable])
         return self.get(ExeCtx.OUTER_CLASS, None)
 
     @outer_class.setter
-    def outer_class(self, val: ObjSymTable):
+    def outer_class(self, val: Optional[ObjSymTable]):
+        assert val is None or isinstance(val, ObjSymTable), f"Illegal outer class: {val}"
         self[ExeCtx.OUTER_CLASS] = val
 
+    @property
+    def call_stack(self) -> list['CallFrame']:
+        return self[ExeCtx.CALL_STACK]
+
+    @property
+    def object_heap(self) -> ObjectHeap:
+        return self[ExeCtx.OBJECT_HEAP]
+
+
+class CallFrame:
+    """Activation record of a subroutine call, pushed onto the call stack of the execution context while the subroutine executes.
+
+    Stores the called subroutine and the state of the execution context at the time of the call, which is restored when the call returns.
+    """
+
+    def __init__(self, subroutine: FunDecl | ProcDecl, ctx: ExeCtx):
+        self.subroutine = subroutine
+        self.caller_table: SymTable = ctx.cur_exec_table
+        self.inside_function: bool = ctx.inside_function
+        self.inside_procedure: bool = ctx.inside_procedure
+        self.by_ref_params: list[str] = ctx.by_ref_params
+        self.outer_class: Optional[ObjSymTable] = ctx.outer_class
+
+    @property
+    def name(self) -> str:
+        return self.subroutine.sub_nodes[0].name
+
+    def restore(self, ctx: ExeCtx):
+        """
+        Resets the execution context to its state at the time of the call
+        :param ctx: the execution context the call took place in
+        :return: None
+        """
+        ctx.inside_function = self.inside_function
+        ctx.inside_procedure = self.inside_procedure
+        ctx.by_ref_params = self.by_ref_params
+        ctx.cur_exec_table = self.caller_table
+        ctx.outer_class = self.outer_class
+
+
+class TailCall:
+    """Pending function call in tail position, i.e. a call whose result is directly returned by the calling function.
+
+    It is returned in place of a value by the ReturnInstr of the calling function, so that the called function's body can be run in the calling function's frame
+    rather than in a new nested frame.
+    """
+
+    def __init__(self, subroutine: FunDecl, parent_table: SymTable, local_table: SymTable, by_ref_params: list[str], caller_table_in_use: bool):
+        self.subroutine = subroutine
+        self.parent_table = parent_table
+        self.local_table = local_table
+        self.by_ref_params = by_ref_params
+        #
+        # True if the arguments still depend on the local table of the calling function (e.g. byRef arguments addressing its variables),
+        # in which case it must not be closed until the call completes, and the call is run as a nested call rather than in the caller's frame
+        #
+        self.caller_table_in_use = caller_table_in_use
+
 
 class AstExecutor:
     """
     The executor of the AST, recursively interpreting each node (calling pre-callbacks before execution and calling post-callbacks after execution of each node)
     """
 
-    __FILE_READ_MODE: str = "r+"
-    __FILE_WRITE_MODE: str = "w+"
-    __FILE_STREAM_TYPE: str = TextIOWrapper
-
-    def __init__(self, parser: Parser, pre_callback: Optional[Callable] = None, post_callback: Optional[Callable] = None, output_stream=None, on_error: Optional[Callable] = None):
+    __FILE_STREAM_TYPE: Type = ErlFile
+    #
+    # Minimum length of a string variable for appends to itself to go through a StrBuilder. Shorter strings are cheap enough to copy
+    #
+    __MIN_STR_BUILDER_LENGTH: int = 256
+    #
+    # Minimum length of a substring assigned to a variable for it to be stored as a StrView. Shorter substrings are cheap enough to copy
+    #
+    __MIN_STR_VIEW_LENGTH: int = 256
+    #
+    # Budgets used to size the execution thread when the depth of subroutine calls is bounded, as the evaluator recurses in Python for each nested ERL call.
+    # A recursive function takes 16 Python frames per call, and 25 when its recursive call is nested in a for loop, a while loop and a switch;
+    # each level of nesting of the call in expressions or control structures adds 1 to 3 frames, so 64 frames leave room for deeply nested calls.
+    # Since Python 3.11, calls between Python functions take no native stack, but on Python 3.10 each frame takes about 500 bytes of it,
+    # i.e. from 7.5 KiB to 12 KiB per ERL call for the functions above, hence 16 KiB per call. The minimum size covers the rest of the program
+    #
+    __PY_FRAMES_PER_CALL: int = 64
+    __STACK_BYTES_PER_CALL: int = 16 * 1024
+    __MIN_THREAD_STACK_SIZE: int = 16 * 1024 * 1024
+    #
+    # Nodes that make a function impure when present in its body, as they perform I/O or create or access objects
+    #
+    __IMPURE_NODE_TYPES: tuple[Type, ...] = (PrintInstr, Input, EndOfFile, ReadLine, WriteLine, FileClose, OpenRead, OpenWrite, NewExpr, AddrExpr, ClassDecl,
+                                             FunDecl, ProcDecl)
+    #
+    # Types of argument and result values that can be memoized, being immutable
+    #
+    __MEMOIZABLE_TYPES: tuple[Type, ...] = (int, float, str, bool)
+    #
+    # Type-dispatch tables of the int() and float() casts and of unary minus, mapping the type of the operand to the conversion or operation.
+    # Operands of other types are rejected, except strings for casts, which are parsed separately as their conversion may fail
+    #
+    __INT_CASTS: dict[type, Callable] = {int: int, float: int}
+    __FLOAT_CASTS: dict[type, Callable] = {int: float, float: float}
+    __NEGATIONS: dict[type, Callable] = {int: operator.neg, float: operator.neg}
+    #
+    # Types of operands for which operators accepting any type, i.e. equality and inequality, are also found in the typed dispatch table
+    #
+    __SCALAR_TYPES: tuple[type, ...] = (int, float, str, bool)
+
+    def __init__(self, parser: Parser, pre_callback: Optional[Callable] = None, post_callback: Optional[Callable] = None, output_stream=None, on_error: Optional[Callable] = None,
+                 max_call_depth: Optional[int] = None, memo_cache_size: Optional[int] = None, output_buffer_size: int = 8192,
+                 flush_policy: FlushPolicy = FlushPolicy.ON_INPUT, memory_map_min_size: Optional[int] = None, input_provider: Optional[InputProvider] = None,
+                 output_max_latency: Optional[float] = None):
         self.__parser = parser
         self.__pre_callbacks = [pre_callback] if pre_callback else []
         self.__post_callbacks = [post_callback] if post_callback else []
@@ -282,14 +392,41 @@ class AstExecutor:
             TokenVals.OR: [[bool, bool]],
         }
         #
-        # I/O stream used by print() and input() statements. If None, the default console buffer will be used, but if the output
-        # needs to be a different location it can be customised when the ASTExecutor is instantiated.
+        # Precomputed from the two tables above, maps (operator, type of left operand, type of right operand) directly to the operation,
+        # so that type checking and dispatch take a single dictionary lookup. Operators accepting operands of any type are kept apart.
+        #
+        self.__OP_DISPATCH: dict[tuple[TokenVals, type, type], Callable] = {}
+        self.__UNTYPED_OPS: dict[TokenVals, Callable] = {}
+        for op_val, accepted_types in self.OP_TO_ACCEPTED_TYPES.items():
+            operation: Callable = self.OP_TO_OPERATION[op_val]
+            if not accepted_types:
+                self.__UNTYPED_OPS[op_val] = operation
+            for type_a, type_b in accepted_types:
+                self.__OP_DISPATCH[(op_val, type_a, type_b)] = operation
+                self.__OP_DISPATCH[(op_val, type_b, type_a)] = operation
+        #
+        # Comparisons of scalars for equality are looked up in the typed table too, so that they take a single lookup like other operators
         #
-        self.__output_stream = output_stream
+        for op_val, operation in self.__UNTYPED_OPS.items():
+            for type_a in AstExecutor.__SCALAR_TYPES:
+                for type_b in AstExecutor.__SCALAR_TYPES:
+                    self.__OP_DISPATCH[(op_val, type_a, type_b)] = operation
         #
-        # Stores instance counts of each class to be able to allocate a unique key for newly instantiated objects
+        # Buffers the lines printed by print() statements so that they are written to the output stream in blocks, as decided by the flush policy.
+        # Whatever is left in the buffer is written out when execution finishes, successfully or not. If output_stream is None, the default
+        # console buffer will be used, but if the output needs to be a different location it can be customised when the ASTExecutor is instantiated.
+        # If output_max_latency is set, buffered output is also written out after that many seconds, so that it appears while the program is busy.
         #
-        self.__instance_count = {}
+        self.__output_writer = OutputWriter(output_stream, output_buffer_size, flush_policy, output_max_latency)
+        #
+        # Files opened via openRead() whose size is at least memory_map_min_size bytes are memory-mapped instead of being read through a buffered text stream.
+        # If None, no file is memory-mapped
+        #
+        self.__memory_map_min_size: Optional[int] = memory_map_min_size
+        #
+        # Source of the lines read by input() statements. If None, they are read from the console
+        #
+        self.__input_provider: InputProvider = input_provider if input_provider is not None else StdinInputProvider()
         #
         # Stores method to call when an error is thrown
         #
@@ -298,6 +435,38 @@ class AstExecutor:
         # Store for the node which caused the errors
         #
         self.__erroneous_nodes = []
+        #
+        # Set when execution running on a separate thread (see __run_on_deep_stack) is interrupted by the user, for loops and subroutine calls
+        # to stop it by raising KeyboardInterrupt in that thread
+        #
+        self.__stop_requested: bool = False
+        #
+        # Caches whether each loop block can be executed without checking the break, continue and return flags after each iteration
+        #
+        self.__simple_loop_bodies: dict[Node, bool] = {}
+        #
+        # Caches the bulk array assignment idiom recognised in each for loop, if any (see __match_bulk_array_assignment)
+        #
+        self.__bulk_array_assignments: dict[ForLoop, Optional[Tuple[str, str, Optional[Node]]]] = {}
+        #
+        # Caches whether each variable assignment appends strings to the variable itself (see __is_append_to_self)
+        #
+        self.__appends_to_self: dict[VarAssign, bool] = {}
+        #
+        # Caches the layout of each instantiated class, shared by all its instances
+        #
+        self.__class_layouts: dict[ClassDecl, ClassLayout] = {}
+        #
+        # Maximum number of nested subroutine calls. If None, the depth of calls is only limited by the Python recursion limit; otherwise
+        # the program is executed on a dedicated thread whose stack and recursion limit are sized to allow that many nested calls
+        #
+        self.__max_call_depth = max_call_depth
+        #
+        # Cache of the results of pure functions, i.e. functions only reading their byVal parameters and local variables, keyed by their argument values.
+        # If memo_cache_size is None, function results are not memoized.
+        #
+        self.__memo_cache: Optional[MemoCache] = MemoCache(memo_cache_size) if memo_cache_size is not None else None
+        self.__pure_functions: dict[FunDecl, bool] = {}
 
     def push_callback(self, callback: Callable, post: bool = False):
         if post:
@@ -312,6 +481,14 @@ class AstExecutor:
             result: Callable = self.__pre_callbacks.pop(-1)
         return result
 
+    @property
+    def memo_cache(self) -> Optional[MemoCache]:
+        """
+        Gets the cache of pure function results, holding statistics on its hit rate
+        :return: the MemoCache instance, or None if memoization is disabled
+        """
+        return self.__memo_cache
+
     def execute(self):
         """
         Executes the AST from its root node, if it exists, creating an empty execution context
@@ -322,13 +499,66 @@ class AstExecutor:
         if parsed:
             ctx = ExeCtx()
             try:
-                self.__execute(parsed, ctx)
+                if self.__max_call_depth is None:
+                    self.__execute(parsed, ctx)
+                else:
+                    self.__run_on_deep_stack(lambda: self.__execute(parsed, ctx))
             except BaseException as e:
+                self.__output_writer.flush()
                 if self.__on_error is not None:
                     self.__on_error(e, self.__erroneous_nodes)
                 raise e
+            self.__output_writer.flush()
             ctx.global_table.close()
 
+    def __run_on_deep_stack(self, proc: Callable):
+        """
+        Runs the given procedure on a new thread with enough stack and a high enough recursion limit for max_call_depth nested subroutine calls,
+        waiting for it to finish. Any exception raised by the procedure is re-raised in the calling thread.
+        The recursion limit is global to the process, so the previous limit, as well as the stack size of new threads, is restored once the thread has finished.
+        :param proc: the procedure to run
+        :return: None
+        """
+        errors: list[BaseException] = []
+        done = threading.Event()
+
+        def run():
+            try:
+                proc()
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                done.set()
+
+        self.__stop_requested = False
+        prev_recursion_limit: int = sys.getrecursionlimit()
+        sys.setrecursionlimit(prev_recursion_limit + self.__max_call_depth * AstExecutor.__PY_FRAMES_PER_CALL)
+        prev_stack_size: int = threading.stack_size(max(AstExecutor.__MIN_THREAD_STACK_SIZE, self.__max_call_depth * AstExecutor.__STACK_BYTES_PER_CALL))
+        try:
+            thread = threading.Thread(target=run, name="erl-execution")
+            thread.start()
+            #
+            # Ctrl-C interrupts the waiting thread rather than the execution thread, which is asked to stop and waited for until it has,
+            # so that the interruption is reported from the node being executed and the limits are only restored once the thread is done.
+            # The thread signals it is done through an event, as a join() interrupted by Ctrl-C may consider the thread finished when it is not
+            #
+            while not done.is_set():
+                try:
+                    done.wait()
+                except KeyboardInterrupt:
+                    self.__stop_requested = True
+            thread.join()
+        finally:
+            threading.stack_size(prev_stack_size)
+            sys.setrecursionlimit(prev_recursion_limit)
+        if errors:
+            raise errors[0]
+        if self.__stop_requested:
+            #
+            # The execution thread finished before reaching a point where it could be stopped, the interruption is reported all the same
+            #
+            raise KeyboardInterrupt
+
     # ---------------------------------------------------------------------------------------------------------------------------------------------------------------------------- #
 
     def __execute(self, node: Node | Type[Node], ctx: ExeCtx):
@@ -388,7 +618,16 @@ class AstExecutor:
         :param ctx: current execution context
         :return: None
         """
-        eval_result: T = self.__eval(var_assign.sub_nodes[1], ctx)
+        if self.__is_append_to_self(var_assign) and self.__execute_append_to_self(var_assign, ctx):
+            return
+        val_node: Node = var_assign.sub_nodes[1]
+        #
+        # Long substrings assigned to variables are stored as views of the string they are taken from, see __substring
+        #
+        if isinstance(val_node, StrSubstring) and isinstance(var_assign.sub_nodes[0], Identifier) and self.__has_only_log_callbacks():
+            eval_result: T = self.__substring(val_node, ctx, AstExecutor.__MIN_STR_VIEW_LENGTH)
+        else:
+            eval_result = self.__eval(val_node, ctx)
         ctx.is_global = var_assign.is_global
         result_addr: SymAddr = self.__address(var_assign.sub_nodes[0], ctx)
         #
@@ -400,6 +639,79 @@ class AstExecutor:
                 self.__raise_error([var_assign], SyntaxError(f"There is an open file at '{result_addr.name}'. It must be closed before the variable is overwritten"))
         result_addr.value = eval_result
 
+    def __is_append_to_self(self, var_assign: VarAssign) -> bool:
+        """
+        Recognises assignments appending values to the assigned variable itself, e.g. 's = s + x' or 's = s + x + y', where the appended values neither read the variable
+        nor call subroutines, so that evaluating them cannot change the variable. The result is cached for each assignment.
+        :param var_assign: the VarAssign node
+        :return: True if the assignment appends to the variable, else False
+        """
+        appends: Optional[bool] = self.__appends_to_self.get(var_assign)
+        if appends is None:
+            target, val_node = var_assign.sub_nodes
+            appends = not var_assign.is_global and isinstance(target, Identifier) and isinstance(val_node, ArithmExpr) \
+                and isinstance(val_node.sub_nodes[0], Identifier) and val_node.sub_nodes[0].name == target.name \
+                and all(op.val == TokenVals.PLUS for op in val_node.sub_nodes[1::2])
+            stack: list[Node] = list(val_node.sub_nodes[2::2]) if appends else []
+            while stack and appends:
+                node: Node = stack.pop()
+                appends = not isinstance(node, (AddrIdOrCall, NewExpr)) and not (isinstance(node, Identifier) and node.name == target.name)
+                stack.extend(node.sub_nodes)
+            self.__appends_to_self[var_assign] = appends
+        return appends
+
+    def __execute_append_to_self(self, var_assign: VarAssign, ctx: ExeCtx) -> bool:
+        """
+        Executes an assignment appending to a string variable (see __is_append_to_self) by appending the strings to a StrBuilder stored in place of the string,
+        rather than creating a new string each time. This is only done for variables of the current scope (or fields of the current object) holding long enough strings,
+        when no callbacks other than logging are registered. Otherwise, the assignment is left to be executed normally.
+        :param var_assign: the VarAssign node
+        :param ctx: current execution context
+        :return: True if the assignment was executed, else False
+        """
+        if ctx.is_global or not self.__has_only_log_callbacks():
+            return False
+        name: str = var_assign.sub_nodes[0].name
+        ret: Optional[Tuple[V, SymTable]] = ctx.cur_lookup_table.lookup_symbol_with_table(name)
+        if ret is None:
+            return False
+        val, tbl = ret
+        if type(val) is str:
+            if len(val) < AstExecutor.__MIN_STR_BUILDER_LENGTH:
+                return False
+        elif type(val) is not StrBuilder:
+            return False
+        if tbl is not ctx.cur_lookup_table and not (isinstance(tbl, ObjSymTable) and AstExecutor.__is_accessible(tbl, name, ctx)):
+            return False
+        nodes: list[Node] = var_assign.sub_nodes[1].sub_nodes
+        appended: list[str] = []
+        #
+        # Operands are evaluated one at a time as in __eval_expr_nodes. Should one of them not be a string, the rest of the expression is evaluated
+        # normally from the built string, which fails the same way, and the builder is left unchanged
+        #
+        result: Optional[T] = None
+        for i in range(2, len(nodes), 2):
+            operand: T = self.__eval(nodes[i], ctx)
+            if result is None:
+                if type(operand) is str:
+                    appended.append(operand)
+                    continue
+                result = (val if type(val) is str else val.build()) + "".join(appended)
+            try:
+                result = self.__eval_operation(result, nodes[i - 1], operand)
+            except SyntaxError as e:
+                self.__raise_error(nodes[i - 2:i + 1], e)
+        if result is not None:
+            tbl.update_symbol(name, result)
+        else:
+            if type(val) is str:
+                val = StrBuilder(val)
+                tbl.update_symbol(name, val)
+            for operand in appended:
+                val.append(operand)
+        ctx.is_global = False
+        return True
+
     def __execute_array_decl(self, array_decl: ArrayDecl, ctx: ExeCtx):
         """
         Executes array declaration, creating an ArrayVal with the given dimensions
@@ -506,24 +818,154 @@ class AstExecutor:
         if type(upper_bound) != int:
             self.__raise_error([for_loop.sub_nodes[2]], TypeError(f"Non-integer value '{upper_bound}' not valid for upper bound of for loop"))
         ctx.inside_loop = True
-        for value in range(lower_bound, upper_bound + 1):
+        values: range = range(lower_bound, upper_bound + 1)
+        if values:
             #
-            # Assigns value in the range to the variable
+            # The storage of the loop counter is resolved once per loop. Plain addresses are written to directly in their symbol table,
+            # while references (e.g. to byRef parameters) are written to through the address.
             #
-            self.__address(var, ctx).value = value
+            counter_addr: SymAddr = self.__address(var, ctx)
+            counter_table: Optional[SymTable] = counter_addr.sym_table if type(counter_addr) is SymAddr else None
+            counter_name: str = counter_addr.name
+            if counter_table is not None and counter_name not in counter_table:
+                counter_table.update_symbol(counter_name, lower_bound)
             #
-            # Executes block
+            # If the block cannot raise the break, continue or return flags, they are not checked after each iteration
             #
-            self.__execute(block, ctx)
-            if ctx.continue_detected:
-                ctx.continue_detected = False
-            if ctx.break_detected:
-                ctx.break_detected = False
-                break
-            if ctx.return_detected:
-                break
+            check_flags: bool = not self.__is_simple_loop_body(block)
+            #
+            # Loops filling or copying a one-dimensional array are run as a single assignment to a range of the array, leaving the counter set to its last value
+            #
+            if self.__execute_bulk_array_assignment(for_loop, values, ctx):
+                if counter_table is not None:
+                    counter_table[counter_name] = values[-1]
+                else:
+                    counter_addr.value = values[-1]
+                values = range(0)
+            for value in values:
+                if self.__stop_requested:
+                    raise KeyboardInterrupt
+                #
+                # Assigns value in the range to the variable
+                #
+                if counter_table is not None:
+                    counter_table[counter_name] = value
+                else:
+                    counter_addr.value = value
+                #
+                # Executes block
+                #
+                self.__execute(block, ctx)
+                if check_flags:
+                    if ctx.continue_detected:
+                        ctx.continue_detected = False
+                    if ctx.break_detected:
+                        ctx.break_detected = False
+                        break
+                    if ctx.return_detected:
+                        break
         ctx.inside_loop = in_outer_loop
 
+    def __match_bulk_array_assignment(self, for_loop: ForLoop) -> Optional[Tuple[str, str, Optional[Node]]]:
+        """
+        Recognises for loops whose block is a single assignment to the element of an array indexed by the loop counter, of either:
+          - a literal or a variable other than the counter and the array, e.g. 'arr[i] = 0' (fill)
+          - the loop counter, e.g. 'arr[i] = i' (counter)
+          - the element of an array at the same index, e.g. 'b[i] = a[i]' (copy)
+        The result is cached for each loop.
+        :param for_loop: the ForLoop node
+        :return: tuple of the kind of idiom ('fill', 'counter' or 'copy'), the name of the assigned array and the node of the assigned value, or None if the loop does not match
+        """
+        if for_loop in self.__bulk_array_assignments:
+            return self.__bulk_array_assignments[for_loop]
+        result: Optional[Tuple[str, str, Optional[Node]]] = None
+        counter_name: str = for_loop.sub_nodes[0].name
+        block: Node = for_loop.sub_nodes[3]
+        if isinstance(block, InnerInstrBlock) and len(block.sub_nodes) == 1:
+            block = block.sub_nodes[0]
+
+        def is_indexed_by_counter(node: Node) -> bool:
+            return isinstance(node, AddrMember) and len(node.sub_nodes) == 2 and isinstance(node.sub_nodes[0], Identifier) \
+                and isinstance(node.sub_nodes[1], Identifier) and node.sub_nodes[1].name == counter_name and node.sub_nodes[0].name != counter_name
+
+        if isinstance(block, VarAssign) and not block.is_global and is_indexed_by_counter(block.sub_nodes[0]):
+            array_name: str = block.sub_nodes[0].sub_nodes[0].name
+            val_node: Node = block.sub_nodes[1]
+            if isinstance(val_node, (IntLiteral, NumLiteral, StrLiteral, BoolLiteral)):
+                result = ("fill", array_name, val_node)
+            elif isinstance(val_node, Identifier) and val_node.name == counter_name:
+                result = ("counter", array_name, None)
+            elif isinstance(val_node, Identifier) and val_node.name != array_name:
+                result = ("fill", array_name, val_node)
+            elif is_indexed_by_counter(val_node):
+                result = ("copy", array_name, val_node.sub_nodes[0])
+        self.__bulk_array_assignments[for_loop] = result
+        return result
+
+    def __execute_bulk_array_assignment(self, for_loop: ForLoop, values: range, ctx: ExeCtx) -> bool:
+        """
+        Runs a for loop matching a bulk array assignment idiom (see __match_bulk_array_assignment) as a single assignment to a range of the array.
+        This is only done when running it element by element could not have any other effect: no callbacks other than logging are registered,
+        the variables involved are plain variables holding one-dimensional arrays, all indexes are within bounds and no open file is overwritten.
+        Otherwise, the loop is left to be run normally.
+        :param for_loop: the ForLoop node
+        :param values: the values of the loop counter
+        :param ctx: current execution context
+        :return: True if the loop was run, else False
+        """
+        match: Optional[Tuple[str, str, Optional[Node]]] = self.__match_bulk_array_assignment(for_loop)
+        if match is None or ctx.is_global or not self.__has_only_log_callbacks():
+            return False
+
+        def plain_variable(name: str) -> Optional[V]:
+            ret: Optional[Tuple[V, SymTable]] = ctx.cur_lookup_table.lookup_symbol_with_table(name)
+            if ret is None or isinstance(ret[1], ObjSymTable) or name in ctx.by_ref_params:
+                return None
+            return ret[0]
+
+        kind, array_name, val_node = match
+        arr: Optional[V] = plain_variable(array_name)
+        if not isinstance(arr, ArrayVal) or len(arr.dims) != 1 or values[0] < 0 or values[-1] >= arr.size:
+            return False
+        if kind == "fill":
+            val: Optional[V] = self.__eval(val_node, ctx) if not isinstance(val_node, Identifier) else plain_variable(val_node.name)
+            if not isinstance(val, (int, float, str)):
+                return False
+            vals: Sequence[V] = [val] * len(values)
+        elif kind == "counter":
+            vals = values
+        else:
+            src: Optional[V] = plain_variable(val_node.name)
+            if not isinstance(src, ArrayVal) or len(src.dims) != 1 or values[-1] >= src.size:
+                return False
+            vals = src.get_values(values[0], values[-1] + 1)
+        if arr.typecode is None and any(isinstance(v, AstExecutor.__FILE_STREAM_TYPE) and not v.closed for v in arr.get_values(values[0], values[-1] + 1)):
+            return False
+        arr.set_values(values[0], vals)
+        ctx.is_global = False
+        return True
+
+    def __is_simple_loop_body(self, block: Node) -> bool:
+        """
+        Checks whether a loop block can never raise the break, continue or return flags, i.e. it contains no break, continue or return
+        instructions and no subroutine calls (a break or continue executed in a subroutine called from a loop stops that loop).
+        The result is cached for each block.
+        :param block: the block of the loop
+        :return: True if the flags do not need to be checked after executing the block, else False
+        """
+        is_simple: Optional[bool] = self.__simple_loop_bodies.get(block)
+        if is_simple is None:
+            is_simple = True
+            stack: list[Node] = [block]
+            while stack and is_simple:
+                node: Node = stack.pop()
+                is_simple = not isinstance(node, (GoToInstr, ReturnInstr, AddrIdOrCall, NewExpr))
+                stack.extend(node.sub_nodes)
+                if isinstance(node, ArrayDecl):
+                    stack.extend(node.dims)
+            self.__simple_loop_bodies[block] = is_simple
+        return is_simple
+
     def __execute_do_until_loop(self, do_until: DoUntil, ctx: ExeCtx):
         """
         Executes DoUntil by running block continuously and breaking the loop if the condition evaluates to true
@@ -539,6 +981,8 @@ class AstExecutor:
         in_outer_loop: bool = ctx.inside_loop
         ctx.inside_loop = True
         while True:
+            if self.__stop_requested:
+                raise KeyboardInterrupt
             #
             # Execute block continuously until condition evaluates to true
             #
@@ -575,6 +1019,8 @@ class AstExecutor:
         in_outer_loop: bool = ctx.inside_loop
         ctx.inside_loop = True
         while True:
+            if self.__stop_requested:
+                raise KeyboardInterrupt
             #
             # Handling continue and break statements from within block
             #
@@ -605,9 +1051,18 @@ class AstExecutor:
         :return: None
         """
         evaluated_args = [self.__eval(print_arg, ctx) for print_arg in print_node.sub_nodes]
-        output: str = ", ".join(str(arg) for arg in evaluated_args)
-        print(output, file=self.__output_stream)
-        logging.debug(f"CONSOLE OUTPUT: {output}")
+        writer: OutputWriter = self.__output_writer
+        if not any(isinstance(arg, RENDERED_TYPES) for arg in evaluated_args):
+            writer.write_line(", ".join(str(arg) for arg in evaluated_args))
+            return
+        #
+        # Arrays and objects are rendered straight into the output buffer, chunk by chunk, rather than converted to a string first
+        #
+        for i, arg in enumerate(evaluated_args):
+            if i:
+                writer.write(", ")
+            writer.write_parts(render_value(arg))
+        writer.write_line("")
 
     def __execute_fun_decl(self, fun_decl: FunDecl, ctx: ExeCtx):
         result_addr: SymAddr = self.__address(fun_decl.sub_nodes[0], ctx)
@@ -629,6 +1084,15 @@ class AstExecutor:
         :param ctx: current execution context
         :return: None, value to be returned is written to ctx.eval_result
         """
+        #
+        # Tail calls skip the callbacks of the called function's nodes, so they are only run in place when no callbacks other than logging are registered
+        #
+        if return_instr.sub_nodes and ctx.inside_function and isinstance(return_instr.sub_nodes[0], AddrIdOrCall) and self.__has_only_log_callbacks():
+            tail_call: Optional[TailCall] = self.__prepare_tail_call(return_instr.sub_nodes[0], ctx)
+            if tail_call is not None:
+                ctx.return_detected = True
+                ctx.eval_result = tail_call
+                return
         return_val: Optional[T] = self.__eval(return_instr.sub_nodes[0], ctx) if return_instr.sub_nodes else None
         if return_val is None and ctx.inside_function:
             self.__raise_error([return_instr], SyntaxError("Functions can only return non-null values"))
@@ -703,7 +1167,7 @@ class AstExecutor:
         ret: Optional[Tuple[V, SymTable]] = tbl.lookup_symbol_with_table(name)
         if ret is not None:
             _, _tbl = ret
-            if _tbl != ctx.outer_class and not _tbl.is_symbol_public(name):
+            if not AstExecutor.__is_accessible(_tbl, name, ctx):
                 self.__raise_error([identifier], SyntaxError(f"Cannot reference private field '{name}'"))
             #
             # If name references a field of an object, we want to return the address pointing directly to the field in its object symbol table.
@@ -747,6 +1211,18 @@ class AstExecutor:
         return result
 
     def __eval_addr_member(self, addr_member: AddrMember, ctx: ExeCtx) -> T:
+        #
+        # Indexed reads of array variables get the element straight from the array value, rather than through an address looking the array up again
+        #
+        if len(addr_member.sub_nodes) > 1 and isinstance(addr_member.sub_nodes[0], Identifier):
+            arr: T = self.__eval(addr_member.sub_nodes[0], ctx)
+            if isinstance(arr, ArrayVal):
+                indexes: T = self.__eval(addr_member.sub_nodes[1], ctx)
+                if isinstance(indexes, List):
+                    return arr.get_item(*indexes)
+                elif isinstance(indexes, int):
+                    return arr.get_item(indexes)
+                self.__raise_error([addr_member], RuntimeError(f"Indexes of invalid type: {indexes}"))
         return self.__address_addr_member(addr_member, ctx).value
 
     def __eval_addr_id_or_call(self, addr_id_or_call: AddrIdOrCall, ctx: ExeCtx) -> T | SymAddr:
@@ -757,6 +1233,32 @@ class AstExecutor:
         :param ctx:
         :return:
         """
+        subroutine_to_exec, parent_table, args = self.__resolve_subroutine(addr_id_or_call, ctx)
+        if isinstance(subroutine_to_exec, FunDecl):
+            execution_result = self.__eval_subroutine(
+                args,
+                subroutine_to_exec,
+                parent_table,
+                ctx,
+                is_function=True)
+        elif isinstance(subroutine_to_exec, ProcDecl):
+            execution_result = self.__eval_subroutine(
+                args,
+                subroutine_to_exec,
+                parent_table,
+                ctx,
+                is_function=False)
+        else:
+            self.__raise_error([addr_id_or_call], LookupError(f"Subroutine is of unrecognised type {type(subroutine_to_exec)}"))
+        return execution_result
+
+    def __resolve_subroutine(self, addr_id_or_call: AddrIdOrCall, ctx: ExeCtx) -> Tuple[FunDecl | ProcDecl, SymTable, list[Node]]:
+        """
+        Obtains the declaration of the called subroutine, checking correct number of arguments were given and that the subroutine can be accessed
+        :param addr_id_or_call: the AddrIdOrCall node storing name of subroutine to call and its arguments
+        :param ctx: current execution context
+        :return: tuple of the subroutine declaration, the symbol table it is declared in and the argument nodes
+        """
         subroutine_id: Identifier = addr_id_or_call.sub_nodes[0]
         subroutine_name: str = subroutine_id.name
         arg_node = addr_id_or_call.sub_nodes[1]
@@ -772,7 +1274,7 @@ class AstExecutor:
         if subroutine_and_parent_table is None:
             self.__raise_error([addr_id_or_call], SyntaxError(f"Function or procedure '{subroutine_name}' is not defined"))
         subroutine_to_exec, parent_table = subroutine_and_parent_table
-        if not (parent_table == ctx.outer_class or parent_table.is_symbol_public(subroutine_name)):
+        if not AstExecutor.__is_accessible(parent_table, subroutine_name, ctx):
             self.__raise_error([addr_id_or_call], SyntaxError(f"Cannot execute private subroutine '{subroutine_name}()'"))
         #
         # Checks the number of arguments given and parameters specified in function declaration are the same
@@ -780,31 +1282,44 @@ class AstExecutor:
         params: list[Param] = subroutine_to_exec.sub_nodes[1].sub_nodes
         if len(args) != len(params):
             self.__raise_error([addr_id_or_call], SyntaxError(f"Expected {len(params)} argument(s) but received {len(args)}"))
-        if isinstance(subroutine_to_exec, FunDecl):
-            execution_result = self.__eval_subroutine(
-                args,
-                subroutine_to_exec,
-                parent_table,
-                ctx,
-                is_function=True)
-        elif isinstance(subroutine_to_exec, ProcDecl):
-            execution_result = self.__eval_subroutine(
-                args,
-                subroutine_to_exec,
-                parent_table,
-                ctx,
-                is_function=False)
-        else:
-            self.__raise_error([addr_id_or_call], LookupError(f"Subroutine is of unrecognised type {type(subroutine_to_exec)}"))
-        return execution_result
+        return subroutine_to_exec, parent_table, args
 
-    def __eval_new_expr(self, new_expr: NewExpr, ctx: ExeCtx) -> SymAddr:
+    def __prepare_tail_call(self, addr_id_or_call: AddrIdOrCall, ctx: ExeCtx) -> Optional[TailCall]:
         """
-        Evaluates new expression by obtaining the class declaration, evaluating it, calling the object's constructor and
-        writing the result to the current symbol table.
+        Prepares a function call in tail position by resolving the called function and binding its arguments, without running its body.
+        Only calls from a function to another function are eligible, as these need no change to the context flags or checks on the returned value.
+        :param addr_id_or_call: the AddrIdOrCall node being returned
+        :param ctx: current execution context
+        :return: the pending TailCall instance, or None if the node is not a call to a function
+        """
+        if len(addr_id_or_call.sub_nodes) < 2 or not ctx.call_stack:
+            return None
+        ret: Optional[Tuple[V, SymTable]] = ctx.cur_lookup_table.lookup_symbol_with_table(addr_id_or_call.sub_nodes[0].name)
+        if ret is None or not isinstance(ret[0], FunDecl):
+            return None
+        caller_table: SymTable = ctx.cur_exec_table
+        subroutine, parent_table, args = self.__resolve_subroutine(addr_id_or_call, ctx)
+        if isinstance(parent_table, ObjSymTable):
+            ctx.outer_class = parent_table
+        local_table, by_ref_param_names = self.__bind_args(args, subroutine.sub_nodes[1].sub_nodes, parent_table, ctx)
+        #
+        # The table of the calling function can be closed before the call, unless arguments reference variables of that table or are I/O streams that closing it would close
+        #
+        caller_table_in_use: bool = False
+        for name, val in local_table.items():
+            if name in by_ref_param_names:
+                caller_table_in_use = caller_table_in_use or (val.sym_table is caller_table and not isinstance(val, SymRef))
+            elif isinstance(val, IOBase):
+                caller_table_in_use = True
+        return TailCall(subroutine, parent_table, local_table, by_ref_param_names, caller_table_in_use)
+
+    def __eval_new_expr(self, new_expr: NewExpr, ctx: ExeCtx) -> ObjRef:
+        """
+        Evaluates new expression by obtaining the class declaration, evaluating it, allocating the object in the object heap
+        and calling the object's constructor.
         :param new_expr: the NewExpr node storing the name of the class to instantiate and constructor arguments
         :param ctx: the current execution context
-        :return: the address to the newly instantiated object
+        :return: the reference to the newly instantiated object
         """
         class_identifier: Identifier = new_expr.sub_nodes[0]
         constructor_args: list[Node] = new_expr.sub_nodes[1:]
@@ -813,15 +1328,15 @@ class AstExecutor:
             self.__raise_error([new_expr], SyntaxError(f"'{class_identifier.name}' is not defined"))
         class_decl, tbl = ret
         _object: ObjSymTable = self.__eval_class_decl(class_decl, tbl, ctx)
-        ctx.cur_exec_table.update_symbol(_object.storage_key, _object)
+        result: ObjRef = ctx.object_heap.allocate(_object)
         constructor: Optional[ProcDecl] = _object.lookup_symbol(TokenContents.NEW.value)
         if constructor is not None:
             self.__eval_subroutine(constructor_args, constructor, _object, ctx, False)
-        return ctx.cur_exec_table.addr_of(_object.storage_key)
+        return result
 
     def __eval_class_decl(self, class_decl: ClassDecl, tbl: SymTable, ctx: ExeCtx) -> ObjSymTable:
         """
-        Evaluates class declaration, allocating fields and methods in a new ObjSymTable instance (and allocating all parent classes)
+        Evaluates class declaration, allocating fields in a new ObjSymTable instance resolving its methods through the class layout (and allocating all parent classes)
         without calling the constructor
         :param class_decl: the ClassDecl node containing information on field and method declarations
         :param tbl: the symbol table in which the declaration of the class to be instantiated is located
@@ -845,18 +1360,8 @@ class AstExecutor:
         #
         root_table: SymTable = tbl
         parent: SymTable = root_table
-
-        def get_name_and_val(member: ClassMember) -> Tuple[str, V]:
-            inner_node = member.sub_nodes[0]
-            if isinstance(inner_node, Identifier):
-                return inner_node.name, NullVal()
-            if isinstance(inner_node, AttrDecl):
-                return inner_node.sub_nodes[0].name, self.__eval(inner_node.sub_nodes[1], ctx)
-            if isinstance(inner_node, ProcDecl) or isinstance(inner_node, FunDecl):
-                return inner_node.sub_nodes[0].name, inner_node
-            raise ValueError(f"Cannot extract data from class member of type {type(member)}")
-        #
-        # Traverses the stack, initialising and allocating symbols of each class declaration (without calling the constructor)
+        #
+        # Traverses the stack, allocating the members of each class declaration from its layout (without calling the constructor)
         # and sets the parent of each new ObjSymTable to the previous ObjSymTable that was higher in the stack.
         # The result is a linked list of ObjSymTable instances.
         #
@@ -864,24 +1369,54 @@ class AstExecutor:
         prev_outer_class = ctx.outer_class
         obj: Optional[ObjSymTable] = None
         while stack:
-            c: ClassDecl = stack.pop()
-            members: list[ClassMember] = c.sub_nodes[1:]
-            class_name: str = c.sub_nodes[0].name
-            obj = ObjSymTable(parent, self.get_instance_key(class_name), class_name)
-            #
-            # sets the cur_table and outer_class fields of context to the current object as the values of some fields may use the values of other fields when they are first declared
-            #
-            ctx.cur_exec_table = obj
-            ctx.outer_class = obj
-            for member in members:
-                name, val = get_name_and_val(member)
-                obj.add_member(name, val, member.is_public)
+            layout: ClassLayout = self.__class_layout(stack.pop())
+            obj = ObjSymTable(parent, layout)
+            if layout.initializers:
+                #
+                # sets the cur_table and outer_class fields of context to the current object as the values of some fields may use the values of other fields when they are first declared
+                # The methods of the object are restricted to those declared before each field, like the fields it may use
+                #
+                ctx.cur_exec_table = obj
+                ctx.outer_class = obj
+                for name, val, needs_evaluation, methods in layout.initializers:
+                    if needs_evaluation:
+                        obj.methods = methods
+                        val = self.__eval(val, ctx)
+                    obj.update_symbol(name, val)
+                obj.methods = layout.methods
             parent = obj
         # Context fields reset
         ctx.cur_exec_table = prev_cur_table
         ctx.outer_class = prev_outer_class
         return obj
 
+    def __class_layout(self, class_decl: ClassDecl) -> ClassLayout:
+        """
+        Gets the layout of the members declared by a class, shared by all its instances. It is computed on the first instantiation of the class.
+        :param class_decl: the ClassDecl node containing information on field and method declarations
+        :return: the layout of the class
+        """
+        layout: Optional[ClassLayout] = self.__class_layouts.get(class_decl)
+        if layout is None:
+            layout = ClassLayout(class_decl.sub_nodes[0].name, class_decl.parent is not None)
+            member: ClassMember
+            for member in class_decl.sub_nodes[1:]:
+                inner_node = member.sub_nodes[0]
+                if isinstance(inner_node, Identifier):
+                    layout.add_member(inner_node.name, NULL, member.is_public)
+                elif isinstance(inner_node, AttrDecl):
+                    init_node: Node = inner_node.sub_nodes[1]
+                    if isinstance(init_node, (IntLiteral, NumLiteral, StrLiteral, BoolLiteral)):
+                        layout.add_member(inner_node.sub_nodes[0].name, init_node.val, member.is_public)
+                    else:
+                        layout.add_member(inner_node.sub_nodes[0].name, init_node, member.is_public, needs_evaluation=True)
+                elif isinstance(inner_node, ProcDecl) or isinstance(inner_node, FunDecl):
+                    layout.add_member(inner_node.sub_nodes[0].name, inner_node, member.is_public, is_method=True)
+                else:
+                    raise ValueError(f"Cannot extract data from class member of type {type(member)}")
+            self.__class_layouts[class_decl] = layout
+        return layout
+
     def __eval_expr_list(self, expr_list: ExprList, ctx: ExeCtx) -> list[T]:
         return [self.__eval(n, ctx) for n in expr_list.sub_nodes]
 
@@ -901,7 +1436,7 @@ class AstExecutor:
             is_last_node: bool = i == len(addr_expr.sub_nodes) - 1
             if not is_last_node:
                 result: SymAddr = self.__address(node, ctx)
-                if not (ctx.outer_class == result.sym_table or result.is_public):
+                if not AstExecutor.__is_accessible(result.sym_table, result.name, ctx):
                     self.__raise_error([addr_expr], SyntaxError(f"Cannot read from private field '{result.name}'"))
                 while isinstance(result.value, SymAddr):
                     result = result.value
@@ -914,7 +1449,37 @@ class AstExecutor:
         return result
 
     def __eval_identifier(self, identifier: Identifier, ctx: ExeCtx) -> T:
-        return self.__address_identifier(identifier, ctx).value
+        """
+        Gets the value of a variable directly from the symbol table it is found in, with the same checks as __address_identifier
+        but without creating an address that would look the variable up again.
+        :param identifier: the Identifier node containing the variable name
+        :param ctx: current execution context
+        :return: the value of the variable, or the value it references if it is a byRef parameter
+        """
+        val: T = self.__lookup_identifier(identifier, ctx)
+        if type(val) in LAZY_STR_TYPES:
+            return val.build()
+        return val
+
+    def __lookup_identifier(self, identifier: Identifier, ctx: ExeCtx) -> T:
+        """
+        Gets the value of a variable as it is stored, i.e. with strings represented by a StrBuilder or StrView left as they are.
+        :param identifier: the Identifier node containing the variable name
+        :param ctx: current execution context
+        :return: the value of the variable, or the value it references if it is a byRef parameter
+        """
+        tbl: SymTable = ctx.cur_lookup_table
+        tbl = tbl if not ctx.is_global else tbl.root
+        name: str = identifier.name
+        ret: Optional[Tuple[V, SymTable]] = tbl.lookup_symbol_with_table(name)
+        if ret is None:
+            raise ValueError(f"Unknown symbol to get value of: {name}")
+        val, _tbl = ret
+        if not AstExecutor.__is_accessible(_tbl, name, ctx):
+            self.__raise_error([identifier], SyntaxError(f"Cannot reference private field '{name}'"))
+        if isinstance(val, SymAddr) and name in ctx.by_ref_params:
+            return val.value
+        return val
 
     def __eval_expr(self, expr: Expr, ctx: ExeCtx) -> bool:
         for node in expr.sub_nodes:
@@ -963,8 +1528,17 @@ class AstExecutor:
             nodes[0] if left_to_right else nodes[-1],
             ctx
         )
+        op_dispatch: dict[tuple[TokenVals, type, type], Callable] = self.__OP_DISPATCH
         for i in (range(1, len(nodes), 2) if left_to_right else range(len(nodes) - 2, 0, -2)):
             a, op, b = (result, nodes[i], self.__eval(nodes[i + 1], ctx)) if left_to_right else (self.__eval(nodes[i - 1], ctx), nodes[i], result)
+            #
+            # Operations on operands of accepted types are dispatched directly, the others go through __eval_operation(), which rejects them
+            # unless the operator accepts operands of any type
+            #
+            operation: Optional[Callable] = op_dispatch.get((op.val, type(a), type(b)))
+            if operation is not None:
+                result = operation(a, b)
+                continue
             try:
                 result = self.__eval_operation(a, op, b)
             except SyntaxError as e:
@@ -980,8 +1554,14 @@ class AstExecutor:
         :param ctx: execution context to pass down to node evaluators
         :return: evaluation result
         """
+        op_dispatch: dict[tuple[TokenVals, type, type], Callable] = self.__OP_DISPATCH
         for i in range(1, len(nodes) - 1, 2):
             a, op, b = self.__eval(nodes[i - 1], ctx), nodes[i], self.__eval(nodes[i + 1], ctx)
+            operation: Optional[Callable] = op_dispatch.get((op.val, type(a), type(b)))
+            if operation is not None:
+                if not operation(a, b):
+                    return False
+                continue
             try:
                 if not self.__eval_operation(a, op, b):
                     return False
@@ -991,21 +1571,29 @@ class AstExecutor:
 
     def __eval_operation(self, a: T, operator: Op | TokenVals, b: T) -> T:
         #
-        # Carries out type checking by checking the types of operands against list of accepted
-        # types for the given operator
+        # Type checking and dispatch are carried out by looking up the operator and the operand types in the precomputed table.
+        # Only operators without type restrictions are looked up separately, and the error message is only built on failure.
         #
         operator_val = operator.val if isinstance(operator, Op) else operator
-        accepted_types: list[list[type, type]] = self.OP_TO_ACCEPTED_TYPES[operator_val]
-        if accepted_types:
-            operand_types = [type(a), type(b)]
-            types_correct: bool = operand_types in accepted_types or operand_types[::-1] in accepted_types
-            operator_str: str = KNOWN_TOKEN_VALS[operator_val].value
-            if not types_correct:
-                raise SyntaxError("Invalid type for '{}': '{}', '{}'".format(operator_str, *operand_types))
-        #
-        # Calls relevant operation lambda
-        #
-        return self.OP_TO_OPERATION[operator_val](a, b)
+        operation: Optional[Callable] = self.__OP_DISPATCH.get((operator_val, type(a), type(b)))
+        if operation is None:
+            operation = self.__UNTYPED_OPS.get(operator_val)
+            if operation is None:
+                operator_str: str = KNOWN_TOKEN_VALS[operator_val].value
+                raise SyntaxError("Invalid type for '{}': '{}', '{}'".format(operator_str, type(a), type(b)))
+        return operation(a, b)
+
+    @staticmethod
+    def __is_accessible(tbl: SymTable, name: str, ctx: ExeCtx) -> bool:
+        """
+        Checks whether a symbol can be accessed from the current execution context: symbols of tables other than objects always are,
+        while members of objects are if they are public or if the access takes place inside an object of the same class (i.e. in one of its methods)
+        :param tbl: the symbol table in which the symbol was found
+        :param name: the symbol
+        :param ctx: current execution context
+        :return: True if the symbol can be accessed, else False
+        """
+        return not isinstance(tbl, ObjSymTable) or name in tbl.public_symbols or (ctx.outer_class is not None and tbl.class_name == ctx.outer_class.class_name)
 
     """
     Obtains literal value from the .val field of IntLiteral, StrLiteral, NumLiteral and BoolLiteral nodes
@@ -1034,9 +1622,10 @@ class AstExecutor:
         :return: result of unary minus operation
         """
         result = self.__eval(unary_minus.get_sub_node(0), ctx)
-        if type(result) not in [float, int]:
+        negation: Optional[Callable] = AstExecutor.__NEGATIONS.get(type(result))
+        if negation is None:
             self.__raise_error([unary_minus], SyntaxError(f"Non-number value '{result}' cannot be negated"))
-        return -result
+        return negation(result)
 
     def __eval_unary_not(self, unary_not: UnaryNot, ctx: ExeCtx) -> bool:
         """
@@ -1046,7 +1635,7 @@ class AstExecutor:
         :return: result of boolean NOT operation
         """
         result = self.__eval(unary_not.get_sub_node(0), ctx)
-        if type(result) != bool:
+        if type(result) is not bool:
             self.__raise_error([unary_not], SyntaxError(f"Boolean NOT operation cannot be performed on non-boolean value '{result}'"))
         return not result
 
@@ -1069,62 +1658,250 @@ class AstExecutor:
         assert (is_function and isinstance(subroutine, FunDecl)) or (not is_function and isinstance(subroutine, ProcDecl)), \
             f"is_function is set to {is_function} but the subroutine given is of type {type(subroutine)}"
         params: list[Param] = subroutine.sub_nodes[1].sub_nodes
-        body: Node = subroutine.sub_nodes[2]
-        in_outer_func: bool = ctx.inside_function
-        in_outer_proc: bool = ctx.inside_procedure
-        prev_outer_class: Optional[ObjSymTable] = ctx.outer_class
+        frame: CallFrame = self.__push_frame(subroutine, ctx)
         if isinstance(parent_table, ObjSymTable):
             ctx.outer_class = parent_table
-        prev_by_ref_params: list[str] = ctx.by_ref_params
         ctx.inside_function = is_function
         ctx.inside_procedure = not is_function
+        local_table, by_ref_param_names = self.__bind_args(args, params, parent_table, ctx)
+        return self.__run_call(frame, parent_table, local_table, by_ref_param_names, ctx, is_function)
+
+    def __push_frame(self, subroutine: FunDecl | ProcDecl, ctx: ExeCtx) -> CallFrame:
+        """
+        Pushes a frame storing the state of the context at the time of a call onto the call stack, the state being restored when the call returns
+        :param subroutine: the called subroutine
+        :param ctx: current execution context
+        :return: the pushed frame
+        """
+        if self.__stop_requested:
+            raise KeyboardInterrupt
+        frame = CallFrame(subroutine, ctx)
+        if self.__max_call_depth is not None and len(ctx.call_stack) >= self.__max_call_depth:
+            raise RecursionError(f"Maximum depth of {self.__max_call_depth} nested subroutine calls exceeded when calling '{frame.name}()'")
+        ctx.call_stack.append(frame)
+        return frame
+
+    def __run_call(self, frame: CallFrame, parent_table: SymTable, local_table: SymTable, by_ref_param_names: list[str], ctx: ExeCtx, is_function: bool) -> T:
+        """
+        Runs the body of a subroutine whose frame has been pushed and whose arguments have been bound, then pops the frame
+        :param frame: the frame of the call
+        :param parent_table: the symbol table the subroutine is declared in
+        :param local_table: the local table of the call, in which the parameters are bound to the arguments
+        :param by_ref_param_names: the names of the parameters passed by reference
+        :param ctx: current execution context
+        :param is_function: True if the subroutine is a function, False if it is a procedure
+        :return: the value returned by the subroutine, or NULL if there is none
+        """
+        subroutine: FunDecl | ProcDecl = frame.subroutine
+        body: Node = subroutine.sub_nodes[2]
+        ctx.by_ref_params = by_ref_param_names
         #
-        # Creates local lookup table for the function, setting the arguments given as variables
+        # Pure functions called with immutable arguments are looked up in the memoization cache first
         #
-        evaluated_args = []
-        by_ref_param_names: list[str] = []
-        for i in range(len(args)):
-            arg = args[i]
-            param = params[i]
-            if param.is_byref and self.__is_addressable(arg):
-                by_ref_param_names.append(param.name)
-                arg_addr = self.__address(arg, ctx)
-                evaluated_args.append(arg_addr)
-            else:
-                evaluated_args.append(self.__eval(arg, ctx))
-        local_table = SymTable(parent_table, {params[i].name: evaluated_args[i] for i in range(len(evaluated_args))})
-        ctx.by_ref_params = by_ref_param_names
+        memo_key: Optional[tuple] = self.__memo_key(subroutine, parent_table, local_table) if is_function else None
+        result: Optional[T] = self.__memo_cache.get(memo_key) if memo_key is not None else None
+        if result is not None:
+            ctx.call_stack.pop().restore(ctx)
+            local_table.close()
+            return result
         #
         # Sets current table of context to the local table, executes function body,
         # extracts returned value from eval_result and sets current table to outer symbol table
         #
-        prev_cur_table: SymTable = ctx.cur_exec_table
         ctx.cur_exec_table = local_table
         self.__execute(body, ctx)
-        result: T = ctx.eval_result
+        result = ctx.eval_result
+        #
+        # Calls in tail position are run in the current frame, replacing the local table of the finished function with the one of the called function.
+        # The called functions are looked up in the memoization cache as any other call, their result being the result of every function of the chain
+        #
+        memo_keys: list[tuple] = [memo_key] if memo_key is not None else []
+        while isinstance(result, TailCall):
+            if self.__stop_requested:
+                raise KeyboardInterrupt
+            ctx.return_detected = False
+            ctx.eval_result = None
+            if result.caller_table_in_use:
+                #
+                # Arguments still depending on the local table of the finished function keep it open, so the call is run as a nested call:
+                # running it in the current frame would keep the tables of every function of the chain open until the chain returns
+                #
+                result = self.__run_call(self.__push_frame(result.subroutine, ctx), result.parent_table, result.local_table, result.by_ref_params, ctx, True)
+                break
+            local_table.close()
+            frame.subroutine = result.subroutine
+            local_table = result.local_table
+            callee_memo_key: Optional[tuple] = self.__memo_key(result.subroutine, result.parent_table, local_table)
+            if callee_memo_key is not None:
+                cached_result: Optional[T] = self.__memo_cache.get(callee_memo_key)
+                if cached_result is not None:
+                    result = cached_result
+                    break
+                memo_keys.append(callee_memo_key)
+            ctx.by_ref_params = result.by_ref_params
+            ctx.cur_exec_table = local_table
+            self.__execute(result.subroutine.sub_nodes[2], ctx)
+            result = ctx.eval_result
         #
         # Context parameters are reset to previous states
         #
-        ctx.inside_function = in_outer_func
-        ctx.inside_procedure = in_outer_proc
-        ctx.by_ref_params = prev_by_ref_params
+        ctx.call_stack.pop().restore(ctx)
         ctx.return_detected = False
         ctx.eval_result = None
-        ctx.cur_exec_table = prev_cur_table
-        ctx.outer_class = prev_outer_class
+        local_table.close()
+        if type(result) in AstExecutor.__MEMOIZABLE_TYPES:
+            for key in memo_keys:
+                self.__memo_cache.put(key, result)
+        return result if result is not None else NULL
+
+    def __memo_key(self, fun_decl: FunDecl, parent_table: SymTable, local_table: SymTable) -> Optional[tuple]:
+        """
+        Gets the key of a function call in the memoization cache, made of the function and its arguments.
+        :param fun_decl: the called function
+        :param parent_table: the symbol table the function is declared in
+        :param local_table: the local table of the call, in which the parameters are bound to the arguments
+        :return: the key, or None if there is no cache, the function is not pure or an argument is mutable
+        """
+        if self.__memo_cache is None or not self.__is_pure_function(fun_decl, parent_table):
+            return None
+        arg_vals: list[T] = [local_table[param.name] for param in fun_decl.sub_nodes[1].sub_nodes]
+        if not all(type(val) in AstExecutor.__MEMOIZABLE_TYPES for val in arg_vals):
+            return None
+        return fun_decl, *((type(val), val) for val in arg_vals)
+
+    def __is_pure_function(self, fun_decl: FunDecl, parent_table: SymTable) -> bool:
+        """
+        Checks whether a function is pure, so that its results can be memoized: it has no byRef parameters, performs no I/O, creates or accesses no objects,
+        only reads its parameters and local variables, only writes to its local variables and arrays, and only calls pure functions.
+        The result is cached for each function declaration.
+        :param fun_decl: the function declaration
+        :param parent_table: the symbol table the function is declared in
+        :return: True if the function is pure, else False
+        """
+        is_pure: Optional[bool] = self.__pure_functions.get(fun_decl)
+        if is_pure is None:
+            is_pure = self.__check_purity(fun_decl, parent_table, set())
+            self.__pure_functions[fun_decl] = is_pure
+        return is_pure
+
+    def __check_purity(self, fun_decl: FunDecl, parent_table: SymTable, in_progress: set[FunDecl]) -> bool:
+        """
+        Analyses the body of a function to check it is pure (see __is_pure_function).
+        :param fun_decl: the function declaration
+        :param parent_table: the symbol table the function is declared in
+        :param in_progress: functions being analysed further up in the call graph, assumed to be pure to allow for recursion
+        :return: True if the function is pure, else False
+        """
+        if isinstance(parent_table, ObjSymTable):
+            return False
+        params: list[Param] = fun_decl.sub_nodes[1].sub_nodes
+        if any(param.is_byref for param in params):
+            return False
+        in_progress.add(fun_decl)
+        body: Node = fun_decl.sub_nodes[2]
         #
-        # If result is an address to an object that is located in the local SymTable,
-        # the object is moved to the scope in which the function was called so that the local
-        # table can be closed and garbage-collected
+        # Collects the names of the local arrays, i.e. the arrays declared in the body
         #
-        if isinstance(result, SymAddr):
-            assert isinstance(result.value, ObjSymTable)
-            if result.sym_table == local_table:
-                obj: ObjSymTable = result.value
-                ctx.cur_exec_table.update_symbol(obj.storage_key, obj)
-                result = ctx.cur_exec_table.addr_of(obj.storage_key)
-        local_table.close()
-        return result if result is not None else NullVal()
+        local_arrays: set[str] = set()
+        stack: list[Node] = [body]
+        while stack:
+            node: Node = stack.pop()
+            if isinstance(node, (VarAssign, ArrayDecl)) and node.is_global:
+                return False
+            if isinstance(node, ArrayDecl):
+                local_arrays.add(node.name)
+            stack.extend(node.sub_nodes)
+        #
+        # Every variable read must be of a parameter or of a local variable assigned beforehand, as otherwise the read may get the value of a global variable
+        #
+        if not AstExecutor.__reads_only_assigned(body, {param.name for param in params}):
+            return False
+        #
+        # Checks every node of the body, keeping track of whether it is inside a loop, as a break or continue outside of a loop affects the calling loop
+        #
+        stack_with_loop_flags: list[Tuple[Node, bool]] = [(body, False)]
+        while stack_with_loop_flags:
+            node, in_loop = stack_with_loop_flags.pop()
+            if isinstance(node, AstExecutor.__IMPURE_NODE_TYPES) or (isinstance(node, GoToInstr) and not in_loop):
+                return False
+            if isinstance(node, VarAssign) and isinstance(node.sub_nodes[0], AddrMember) and node.sub_nodes[0].sub_nodes[0].name not in local_arrays:
+                return False
+            sub_nodes: list[Node] = node.sub_nodes
+            if isinstance(node, AddrIdOrCall):
+                #
+                # The subroutine name is not a variable read, the called subroutine must be a pure function
+                #
+                ret: Optional[Tuple[V, SymTable]] = parent_table.lookup_symbol_with_table(node.sub_nodes[0].name)
+                if ret is None or not isinstance(ret[0], FunDecl):
+                    return False
+                callee, callee_table = ret
+                if callee not in in_progress:
+                    callee_is_pure: Optional[bool] = self.__pure_functions.get(callee)
+                    if not (callee_is_pure if callee_is_pure is not None else self.__check_purity(callee, callee_table, in_progress)):
+                        return False
+                sub_nodes = sub_nodes[1:]
+            if isinstance(node, ArrayDecl):
+                sub_nodes = sub_nodes + node.dims
+            in_sub_loop: bool = in_loop or isinstance(node, (ForLoop, WhileLoop, DoUntil))
+            stack_with_loop_flags.extend((sn, in_sub_loop) for sn in sub_nodes)
+        return True
+
+    @staticmethod
+    def __reads_only_assigned(node: Node, assigned: set[str]) -> bool:
+        """
+        Checks that the variables read by a node (and its sub-nodes, in the order they are executed) are definitely assigned beforehand.
+        The analysis is conservative: variables assigned inside a branch or loop body only count as assigned within it, except for do-until loops,
+        whose body is always executed.
+        :param node: the node to check
+        :param assigned: names of the variables definitely assigned before the node, updated with those it definitely assigns
+        :return: True if no variable may be read before being assigned, else False
+        """
+        if isinstance(node, Identifier):
+            return node.name in assigned
+        if isinstance(node, VarAssign):
+            target: Node = node.sub_nodes[0]
+            if not all(AstExecutor.__reads_only_assigned(sn, assigned) for sn in node.sub_nodes[1:]):
+                return False
+            if isinstance(target, Identifier):
+                assigned.add(target.name)
+                return True
+            return AstExecutor.__reads_only_assigned(target, assigned)
+        if isinstance(node, ArrayDecl):
+            if not all(AstExecutor.__reads_only_assigned(dim, assigned) for dim in node.dims):
+                return False
+            assigned.add(node.name)
+            return True
+        if isinstance(node, ForLoop):
+            counter, lower_bound, upper_bound, block = node.sub_nodes
+            return (AstExecutor.__reads_only_assigned(lower_bound, assigned) and AstExecutor.__reads_only_assigned(upper_bound, assigned)
+                    and AstExecutor.__reads_only_assigned(block, assigned | {counter.name}))
+        sub_nodes: list[Node] = node.sub_nodes[1:] if isinstance(node, AddrIdOrCall) else node.sub_nodes
+        if isinstance(node, (InnerInstrBlock, DoUntil)):
+            #
+            # Instructions of a block are executed in sequence, each seeing the variables assigned by the previous ones
+            #
+            return all(AstExecutor.__reads_only_assigned(sn, assigned) for sn in sub_nodes)
+        return all(AstExecutor.__reads_only_assigned(sn, set(assigned)) for sn in sub_nodes)
+
+    def __bind_args(self, args: list[Node], params: list[Param], parent_table: SymTable, ctx: ExeCtx) -> Tuple[LocalSymTable, list[str]]:
+        """
+        Creates the local table of a subroutine call, setting the given arguments as variables named after the corresponding parameters.
+        Arguments to byRef parameters are addressed if possible, the others are evaluated.
+        :param args: list of arguments in the form of AST nodes
+        :param params: the parameters of the called subroutine
+        :param parent_table: the symbol table the subroutine is declared in
+        :param ctx: current execution context
+        :return: tuple of the local table and the names of the parameters bound to addresses
+        """
+        local_table = LocalSymTable(parent_table)
+        by_ref_param_names: list[str] = []
+        for arg, param in zip(args, params):
+            if param.is_byref and self.__is_addressable(arg):
+                by_ref_param_names.append(param.name)
+                local_table.bind(param.name, self.__address(arg, ctx))
+            else:
+                local_table.bind(param.name, self.__eval(arg, ctx))
+        return local_table, by_ref_param_names
 
     def __eval_str_cast(self, cast_str: CastStr, ctx: ExeCtx) -> str:
         """
@@ -1146,15 +1923,16 @@ class AstExecutor:
         :return: result of int cast
         """
         evaluated_expr: T = self.__eval(cast_int.sub_nodes[0], ctx)
+        cast: Optional[Callable] = AstExecutor.__INT_CASTS.get(type(evaluated_expr))
+        if cast is not None:
+            return cast(evaluated_expr)
         if AstExecutor.__is_null(evaluated_expr):
             self.__raise_error([cast_int], ValueError(f"Cannot convert null value to integer"))
-        if type(evaluated_expr) == str:
+        if type(evaluated_expr) is str:
             try:
                 return int(evaluated_expr)
             except ValueError:
                 self.__raise_error([cast_int.sub_nodes[0]], ValueError(f"Cannot convert string of value '{evaluated_expr}' to integer"))
-        elif type(evaluated_expr) in [int, float]:
-            return int(evaluated_expr)
         else:
             self.__raise_error([cast_int], ValueError(f"Cannot convert value '{evaluated_expr}' of type '{type(evaluated_expr)}' to integer"))
 
@@ -1166,15 +1944,16 @@ class AstExecutor:
         :return: result of float cast
         """
         evaluated_expr: T = self.__eval(cast_float.sub_nodes[0], ctx)
+        cast: Optional[Callable] = AstExecutor.__FLOAT_CASTS.get(type(evaluated_expr))
+        if cast is not None:
+            return cast(evaluated_expr)
         if AstExecutor.__is_null(evaluated_expr):
             self.__raise_error([cast_float], ValueError(f"Cannot convert null value to float"))
-        if type(evaluated_expr) == str:
+        if type(evaluated_expr) is str:
             try:
                 return float(evaluated_expr)
             except ValueError:
                 self.__raise_error([cast_float], ValueError(f"Cannot convert string of value '{evaluated_expr}' to float"))
-        elif type(evaluated_expr) in [int, float]:
-            return float(evaluated_expr)
         else:
             self.__raise_error([cast_float], ValueError(f"Cannot convert value '{evaluated_expr}' of type '{type(evaluated_expr)} to float"))
 
@@ -1185,9 +1964,11 @@ class AstExecutor:
         :param ctx: current execution context
         :return: the length of the string referenced
         """
-        val: T = self.__eval(length.sub_nodes[0], ctx)
+        val: T = self.__eval_str_operand(length.sub_nodes[0], ctx)
         if isinstance(val, str):
             return len(val)
+        if type(val) is StrView:
+            return val.length
         if isinstance(val, ArrayVal):
             return val.length
         else:
@@ -1200,8 +1981,19 @@ class AstExecutor:
         :param ctx: current execution context
         :return: the string slice
         """
-        evaluated_sub_nodes: list[T] = [self.__eval(node, ctx) for node in str_substring.sub_nodes]
-        start_index, substring_len, larger_str = tuple(evaluated_sub_nodes)
+        return self.__substring(str_substring, ctx)
+
+    def __substring(self, str_substring: StrSubstring, ctx: ExeCtx, min_view_length: Optional[int] = None) -> str | StrView:
+        """
+        Evaluates .subString(start, end), taking the substring of a StrView straight from the string it is a view of
+        :param str_substring: StrSubstring node in which the identifier of the string to open and the arguments are stored
+        :param ctx: current execution context
+        :param min_view_length: if not None, substrings of at least this length are returned as a StrView rather than copied
+        :return: the string slice, or its view
+        """
+        start_index: T = self.__eval(str_substring.sub_nodes[0], ctx)
+        substring_len: T = self.__eval(str_substring.sub_nodes[1], ctx)
+        larger_str: T = self.__eval_str_operand(str_substring.sub_nodes[2], ctx)
         #
         # Checking substring arguments are integers
         #
@@ -1212,24 +2004,51 @@ class AstExecutor:
         #
         # Checking the expression on which substring is called evaluates to a string literal, and that the starting index is within the length of that literal
         #
+        if type(larger_str) is StrView:
+            if not 0 <= start_index <= larger_str.length - 1:
+                self.__raise_error([str_substring], SyntaxError(f"Cannot find substring of '{larger_str}' starting from out-of-range index '{start_index}'"))
+            if min_view_length is not None and min(substring_len, larger_str.length - start_index) >= min_view_length:
+                return larger_str.view(start_index, substring_len)
+            return larger_str.substring(start_index, substring_len)
         if not isinstance(larger_str, str):
             self.__raise_error([str_substring], SyntaxError(f"Cannot find substring of non-string value '{larger_str}'"))
         if not 0 <= start_index <= len(larger_str) - 1:
             self.__raise_error([str_substring], SyntaxError(f"Cannot find substring of '{larger_str}' starting from out-of-range index '{start_index}'"))
+        if min_view_length is not None and min(substring_len, len(larger_str) - start_index) >= min_view_length:
+            return StrView(larger_str, start_index, min(substring_len, len(larger_str) - start_index))
         return larger_str[start_index:start_index + substring_len]
 
+    def __eval_str_operand(self, node: Node, ctx: ExeCtx) -> T:
+        """
+        Evaluates the string operand of .length or .substring(). Variables holding a StrView are left as they are rather than copied,
+        unless callbacks other than logging are registered, which expect each node to be evaluated.
+        :param node: the node of the operand
+        :param ctx: current execution context
+        :return: the value of the operand
+        """
+        if isinstance(node, Identifier) and self.__has_only_log_callbacks():
+            val: T = self.__lookup_identifier(node, ctx)
+            return val.build() if type(val) is StrBuilder else val
+        return self.__eval(node, ctx)
+
     def __eval_input(self, input_node: Input, ctx: ExeCtx) -> str:
         """
-        Evaluates expression argument to get input message and calls input() with that message
+        Evaluates expression argument to get input message and reads a line from the input provider. The message is displayed by the provider
+        or written to the output, depending on the provider
         :param input_node: the Input node in which expression argument is contained
         :param ctx: current execution context
         :return: the user's input, type 'str'
         """
         msg: str = str(self.__eval(input_node.sub_nodes[0], ctx))
-        logging.debug(f"AWAITING INPUT: '{msg}'")
-        return input(msg)
+        if logging.root.isEnabledFor(logging.DEBUG):
+            logging.debug(f"AWAITING INPUT: '{msg}'")
+        if self.__input_provider.echo_prompt:
+            self.__output_writer.write(msg)
+        else:
+            self.__output_writer.before_input()
+        return self.__input_provider.read_line(msg)
 
-    def __eval_open_read(self, open_read: OpenRead, ctx: ExeCtx) -> TextIOWrapper:
+    def __eval_open_read(self, open_read: OpenRead, ctx: ExeCtx) -> ErlFile:
         """
         Gets file path to open in read mode by evaluating expression argument and opens the file
         :param open_read: the OpenRead node containing the expression argument
@@ -1239,9 +2058,19 @@ class AstExecutor:
         file_path: T = self.__eval(open_read.sub_nodes[0], ctx)
         if not isinstance(file_path, str):
             self.__raise_error([open_read], SyntaxError(f"File path argument '{file_path}' is not a string"))
-        return open(file_path, AstExecutor.__FILE_READ_MODE)
+        min_size: Optional[int] = self.__memory_map_min_size
+        if min_size is None or min_size == 0:
+            return ErlFile.open_read(file_path, min_size is not None)
+        #
+        # A file whose size cannot be obtained, e.g. a missing file, is opened as a text stream, which reports the error
+        #
+        try:
+            size: int = os.path.getsize(file_path)
+        except OSError:
+            size = 0
+        return ErlFile.open_read(file_path, size >= min_size)
 
-    def __eval_open_write(self, open_write: OpenWrite, ctx: ExeCtx) -> TextIOWrapper:
+    def __eval_open_write(self, open_write: OpenWrite, ctx: ExeCtx) -> ErlFile:
         """
         Gets file path to open in write mode by evaluating expression argument and opens the file
         :param open_write: the OpenWrite node containing the expression argument
@@ -1251,7 +2080,7 @@ class AstExecutor:
         file_path: T = self.__eval(open_write.sub_nodes[0], ctx)
         if not isinstance(file_path, str):
             self.__raise_error([open_write], SyntaxError(f"File path argument '{file_path}' is not a string"))
-        return open(file_path, AstExecutor.__FILE_WRITE_MODE)
+        return ErlFile.open_write(file_path)
 
     def __eval_read_line(self, read_line: ReadLine, ctx: ExeCtx) -> str:
         """
@@ -1260,17 +2089,14 @@ class AstExecutor:
         :param ctx: current execution context
         :return: the line that has been read, type 'str'
         """
-        file_address: SymAddr = self.__address(read_line.sub_nodes[0], ctx)
-        file_value: T = file_address.value
-        if not isinstance(file_value, TextIOWrapper):
+        file_value: T = self.__address(read_line.sub_nodes[0], ctx).value
+        if not isinstance(file_value, ErlFile):
             self.__raise_error([read_line], SyntaxError(f"Cannot read line from non-file '{file_value}'"))
-        if file_value.mode != AstExecutor.__FILE_READ_MODE:
+        if file_value.for_writing:
             self.__raise_error([read_line], SyntaxError(f"Cannot read from a file that was opened via openWrite()"))
         if file_value.closed:
             self.__raise_error([read_line], SyntaxError("Cannot read line from closed file stream"))
-        result: str = file_value.readline()
-        file_address.value = file_value
-        return result
+        return file_value.read_line()
 
     def __eval_write_line(self, write_line: WriteLine, ctx: ExeCtx) -> NullVal:
         """
@@ -1279,20 +2105,18 @@ class AstExecutor:
         :param ctx: current execution context
         :return: NullVal as writeLine() is a procedure
         """
-        file_address: SymAddr = self.__address(write_line.sub_nodes[1], ctx)
-        file_value: T = file_address.value
-        if not isinstance(file_value, TextIOWrapper):
+        file_value: T = self.__address(write_line.sub_nodes[1], ctx).value
+        if not isinstance(file_value, ErlFile):
             self.__raise_error([write_line], SyntaxError(f"Cannot write line to non-file '{file_value}'"))
-        if file_value.mode != AstExecutor.__FILE_WRITE_MODE:
+        if not file_value.for_writing:
             self.__raise_error([write_line], SyntaxError("Cannot write to a file that was opened via openRead()"))
         if file_value.closed:
             self.__raise_error([write_line], SyntaxError("Cannot write line to closed file stream"))
         line_to_write: T = self.__eval(write_line.sub_nodes[0], ctx)
         if not isinstance(line_to_write, str):
             self.__raise_error([write_line], SyntaxError(f"Cannot write non-string value '{line_to_write}' to file"))
-        file_value.write(line_to_write + "\n")
-        file_address.value = file_value
-        return NullVal()
+        file_value.write_line(line_to_write)
+        return NULL
 
     def __eval_end_of_file(self, end_of_file: EndOfFile, ctx: ExeCtx) -> bool:
         """
@@ -1301,44 +2125,38 @@ class AstExecutor:
         :param ctx: the current execution context
         :return: True if file pointer is at the end of the file, else False
         """
-        file_address: SymAddr = self.__address(end_of_file.sub_nodes[0], ctx)
-        file_value: T = file_address.value
-        if not isinstance(file_value, TextIOWrapper):
+        file_value: T = self.__address(end_of_file.sub_nodes[0], ctx).value
+        if not isinstance(file_value, ErlFile):
             self.__raise_error([end_of_file], SyntaxError(f"Cannot check for end-of-file of non-file '{file_value}'"))
         if file_value.closed:
             self.__raise_error([end_of_file], SyntaxError(f"Cannot check for end-of-file in closed file stream"))
-        #
-        # Checks if position of the file pointer is equal to the position of the end of the file
-        #
-        original_pos = file_value.tell()
-        # Moves file pointer to the end of the file
-        file_value.seek(0, os.SEEK_END)
-        result: bool = file_value.tell() == original_pos
-        # Moves file pointer back to the original position
-        file_value.seek(original_pos)
-        return result
+        return file_value.at_end()
 
     def __eval_file_close(self, file_close: FileClose, ctx: ExeCtx) -> NullVal:
         """
-        Obtains the file stream to close from first sub-node of FileClose, closes it
-        and overwrites the old, open file stream with the new, clsoed file stream
+        Obtains the file stream to close from first sub-node of FileClose and closes it
         :param file_close: the FileClose node to interpret
         :param ctx: execution context
         :return: NullVal instance, as the fileClose() is a procedure
         """
-        file_address: SymAddr = self.__address(file_close.sub_nodes[0], ctx)
-        file_value: T = file_address.value
+        file_value: T = self.__address(file_close.sub_nodes[0], ctx).value
         #
         # Checks that the value at the given location is actually a file stream
         #
-        if not isinstance(file_value, TextIOWrapper):
+        if not isinstance(file_value, ErlFile):
             self.__raise_error([file_close], SyntaxError(f"Cannot perform file close operation on non-file '{file_value}'"))
         file_value.close()
-        file_address.value = file_value
-        return NullVal()
+        return NULL
 
     # ---------------------------------------------------------------------------------------------------------------------------------------------------------------------------- #
 
+    def __has_only_log_callbacks(self) -> bool:
+        """
+        Checks that no callbacks other than logging are registered, in which case nodes may be executed without going through each of their sub-nodes.
+        :return: True if only the logging callbacks are registered, else False
+        """
+        return self.__pre_callbacks == [self.__log_pre] and self.__post_callbacks == [self.__log_post]
+
     def __call_back(self, node: Node, ctx, post: bool = False):
         c_list = self.__post_callbacks if post else self.__pre_callbacks
         for c in c_list:
@@ -1351,11 +2169,20 @@ class AstExecutor:
         self.__log(node, ctx, True)
 
     def __log(self, node: Node, ctx: ExeCtx, post: bool = False):
+        #
+        # Skips formatting the message when debug logging is disabled, as stringifying large results (e.g. arrays) is costly
+        #
+        if not logging.root.isEnabledFor(logging.DEBUG):
+            return
         result: str = ctx.eval_result
         prefix: str = "Evaluat" if result else "Execut"
         suffix: str = "ed" if post else "ing"
         ending: str = "." if post else " ..."
-        ending = f": {result}{ending}" if result else ending
+        #
+        # Arrays and objects are logged by their type only, as their representation may be very large, or impossible to build for objects referencing themselves
+        #
+        shown_result = f"<{type(result).__name__}>" if isinstance(result, RENDERED_TYPES) else result
+        ending = f": {shown_result}{ending}" if result else ending
         logging.debug(f"{prefix}{suffix} node {node.__class__.__name__} at line {node.line_index + 1}: {ending}")
 
     def __raise_error(self, nodes: list[Node], e: Exception):
@@ -1370,7 +2197,7 @@ class AstExecutor:
 
     @staticmethod
     def __is_null(val: T) -> bool:
-        return isinstance(val, NullVal)
+        return val is NULL
 
     def __is_addressable(self, node: Node) -> bool:
         """
@@ -1382,13 +2209,3 @@ class AstExecutor:
             if isinstance(node, node_type):
                 return True
         return False
-
-    def get_instance_key(self, class_name: str) -> str:
-        """
-        Creates a unique object key in the form "_._{class_name}_{instance # (at time of execution)}_._",
-        formatted so it cannot be overwritten through source code
-        :param class_name: the name of the class the object is an instance of
-        :return: the unique object key
-        """
-        self.__instance_count[class_name] = self.__instance_count.get(class_name, 0) + 1
-        return f"_._{class_name}_{self.__instance_count[class_name]}_._"
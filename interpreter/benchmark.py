@@ -0,0 +1,530 @@
+import os
+import tracemalloc
+from io import StringIO
+from sys import argv
+from tempfile import TemporaryDirectory
+from time import process_time_ns
+from typing import Callable, Iterable
+
+from ast_executor import AstExecutor
+from lexer import Lexer
+from parser import Parser
+from tokenizer import Tokenizer
+
+#
+# Maps the name of each benchmark to a function returning the ERL source code lines to execute.
+# Benchmark functions are run inside a temporary working directory, so any input files they need can be written to the current directory.
+#
+BENCHMARKS: dict[str, Callable[[], Iterable[str]]] = {}
+#
+# Names of the benchmarks whose program prints, as its last line of output, the number of operations it carried out (e.g. loop iterations),
+# for the throughput to be reported in operations per second
+#
+COUNTING_BENCHMARKS: set[str] = set()
+#
+# Number of times each benchmark is run, the fastest run being reported to reduce noise
+#
+REPEATS: int = 3
+
+
+def benchmark(name: str, counts_ops: bool = False) -> Callable:
+    """
+    Registers the decorated function as the source of the ERL program for the benchmark with the given name
+    :param name: name used to select the benchmark from the command line
+    :param counts_ops: True if the last line printed by the program is the number of operations it carried out
+    :return: decorator registering the function
+    """
+    def register(source: Callable[[], Iterable[str]]) -> Callable[[], Iterable[str]]:
+        BENCHMARKS[name] = source
+        if counts_ops:
+            COUNTING_BENCHMARKS.add(name)
+        return source
+    return register
+
+
+@benchmark("arithmetic")
+def arithmetic_loop() -> list[str]:
+    return [
+        "total = 0",
+        "for i = 1 to 20000",
+        "    total = total + i * 2 - i DIV 3 + i MOD 7",
+        "    ratio = (i + 0.5) / (i * 1.5)",
+        "    if total > 1000000 AND ratio < 1 then",
+        "        total = total - 1000000",
+        "    endif",
+        "next i",
+        "print(total)",
+    ]
+
+
+@benchmark("nested_for")
+def nested_for_loops() -> list[str]:
+    return [
+        "count = 0",
+        "for i = 1 to 1000",
+        "    for j = 1 to 1000",
+        "        count = count + 1",
+        "    next j",
+        "next i",
+        "print(count)",
+    ]
+
+
+@benchmark("grid_2d")
+def grid_2d() -> list[str]:
+    return [
+        "array grid[300, 300]",
+        "for i = 0 to 299",
+        "    for j = 0 to 299",
+        "        grid[i, j] = i * 1000 + j",
+        "    next j",
+        "next i",
+        "total = 0",
+        "for i = 0 to 299",
+        "    for j = 0 to 299",
+        "        total = total + grid[i, j]",
+        "    next j",
+        "next i",
+        "print(total)",
+    ]
+
+
+@benchmark("matrix_multiplication")
+def matrix_multiplication() -> list[str]:
+    return [
+        "n = 40",
+        "array a[n, n]",
+        "array b[n, n]",
+        "array c[n, n]",
+        "for i = 0 to n - 1",
+        "    for j = 0 to n - 1",
+        "        a[i, j] = i + j",
+        "        b[i, j] = i - j",
+        "    next j",
+        "next i",
+        "for i = 0 to n - 1",
+        "    for j = 0 to n - 1",
+        "        total = 0",
+        "        for k = 0 to n - 1",
+        "            total = total + a[i, k] * b[k, j]",
+        "        next k",
+        "        c[i, j] = total",
+        "    next j",
+        "next i",
+        "print(c[n - 1, n - 1])",
+    ]
+
+
+@benchmark("array_fill_copy")
+def array_fill_copy() -> list[str]:
+    return [
+        "n = 200000",
+        "array a[n]",
+        "array b[n]",
+        "for i = 0 to n - 1",
+        "    a[i] = 0",
+        "next i",
+        "for i = 0 to n - 1",
+        "    a[i] = i",
+        "next i",
+        "for i = 0 to n - 1",
+        "    b[i] = a[i]",
+        "next i",
+        "print(b[n - 1])",
+    ]
+
+
+@benchmark("oop_method_calls")
+def oop_method_calls() -> list[str]:
+    return [
+        "scale = 3",
+        "class Shape",
+        "    public sides = 0",
+        "    private area = 0",
+        "    public procedure new(s)",
+        "        sides = s",
+        "    endprocedure",
+        "    public function get_area()",
+        "        return area",
+        "    endfunction",
+        "    public procedure grow(by)",
+        "        area = area + by * scale",
+        "    endprocedure",
+        "endclass",
+        "class Square inherits Shape",
+        "    public side = 1",
+        "    public procedure new(len)",
+        "        super.new(4)",
+        "        side = len",
+        "    endprocedure",
+        "    public procedure step()",
+        "        grow(side + sides)",
+        "        side = side + 1",
+        "    endprocedure",
+        "endclass",
+        "sq = new Square(1)",
+        "for i = 1 to 20000",
+        "    sq.step()",
+        "next i",
+        "print(sq.get_area())",
+    ]
+
+
+@benchmark("recursive_fibonacci")
+def recursive_fibonacci() -> list[str]:
+    return [
+        "function fib(n)",
+        "    if n < 2 then",
+        "        return n",
+        "    endif",
+        "    return fib(n - 1) + fib(n - 2)",
+        "endfunction",
+        "print(fib(25))",
+    ]
+
+
+@benchmark("object_creation")
+def object_creation() -> list[str]:
+    return [
+        "class Shape",
+        "    public name = \"shape\"",
+        "    public sides = 0",
+        "    private area = 0.0",
+        "    public function get_area()",
+        "        return area",
+        "    endfunction",
+        "    public function get_sides()",
+        "        return sides",
+        "    endfunction",
+        "endclass",
+        "class Point inherits Shape",
+        "    public x",
+        "    public y",
+        "    private visible = true",
+        "    public function get_x()",
+        "        return x",
+        "    endfunction",
+        "    public function get_y()",
+        "        return y",
+        "    endfunction",
+        "    public procedure hide()",
+        "        visible = false",
+        "    endprocedure",
+        "endclass",
+        "for i = 1 to 100000",
+        "    p = new Point()",
+        "next i",
+        "print(p.get_sides())",
+    ]
+
+
+@benchmark("member_access")
+def member_access() -> list[str]:
+    fields: int = 50
+    return [
+        "class Record",
+        *(f"    public field_{i} = {i}" for i in range(fields)),
+        *(f"    private hidden_{i} = {i}" for i in range(fields)),
+        "    public function total()",
+        "        return " + " + ".join(f"hidden_{i}" for i in range(0, fields, 5)),
+        "    endfunction",
+        "endclass",
+        "r = new Record()",
+        "sum = 0",
+        "for i = 1 to 5000",
+        "    sum = sum + r.field_0 + r.field_25 + r.field_49 + r.total()",
+        "next i",
+        "print(sum)",
+    ]
+
+
+@benchmark("sparse_arrays")
+def sparse_arrays() -> list[str]:
+    return [
+        "procedure mark(arr, i)",
+        "    arr[i] = i",
+        "endprocedure",
+        "array a[50000]",
+        "array b[50000]",
+        "for i = 0 to 7142",
+        "    mark(a, i * 7)",
+        "next i",
+        "empty = 0",
+        "for i = 0 to 49999",
+        "    if a[i] == b[i] then",
+        "        empty = empty + 1",
+        "    endif",
+        "next i",
+        "print(empty)",
+    ]
+
+
+@benchmark("print_lines")
+def print_lines() -> list[str]:
+    return [
+        "for i = 1 to 100000",
+        "    print(\"line \" + str(i))",
+        "next i",
+    ]
+
+
+@benchmark("file_copy")
+def file_copy() -> list[str]:
+    #
+    # Copies a 100 MB file made of 100000 lines of 1000 characters. readLine() keeps the newline at the end of each line,
+    # so the copy has a blank line after each line
+    #
+    with open("input.txt", "w") as f:
+        line: str = "x" * 999 + "\n"
+        for _ in range(100000):
+            f.write(line)
+    return [
+        "src = openRead(\"input.txt\")",
+        "dst = openWrite(\"output.txt\")",
+        "while NOT src.endOfFile()",
+        "    dst.writeLine(src.readLine())",
+        "endwhile",
+        "src.close()",
+        "dst.close()",
+        "print(\"done\")",
+    ]
+
+
+@benchmark("line_count")
+def line_count() -> list[str]:
+    with open("input.txt", "w") as f:
+        for i in range(1000000):
+            f.write(f"line {i}\n")
+    return [
+        "count = 0",
+        "file = openRead(\"input.txt\")",
+        "while NOT file.endOfFile()",
+        "    line = file.readLine()",
+        "    count = count + 1",
+        "endwhile",
+        "file.close()",
+        "print(count)",
+    ]
+
+
+@benchmark("string_building")
+def string_building() -> list[str]:
+    return [
+        "s = \"\"",
+        "for i = 1 to 100000",
+        "    s = s + \"0123456789\"",
+        "next i",
+        "print(s.length)",
+    ]
+
+
+@benchmark("char_scan")
+def char_scan() -> list[str]:
+    return [
+        "s = \"\"",
+        "for i = 1 to 100000",
+        "    s = s + \"abcdefghij\"",
+        "next i",
+        "count = 0",
+        "for i = 0 to s.length - 1",
+        "    if s.substring(i, 1) == \"e\" then",
+        "        count = count + 1",
+        "    endif",
+        "next i",
+        "print(count)",
+    ]
+
+
+@benchmark("string_consume")
+def string_consume() -> list[str]:
+    return [
+        "s = \"\"",
+        "for i = 1 to 20000",
+        "    s = s + \"abcdefghij\"",
+        "next i",
+        "count = 0",
+        "while s.length > 1",
+        "    if s.substring(0, 1) == \"e\" then",
+        "        count = count + 1",
+        "    endif",
+        "    s = s.substring(1, s.length - 1)",
+        "endwhile",
+        "print(count)",
+    ]
+
+
+@benchmark("print_array")
+def print_array() -> list[str]:
+    return [
+        "array a[1000, 1000]",
+        "for i = 0 to 999",
+        "    for j = 0 to 999",
+        "        a[i, j] = i + j",
+        "    next j",
+        "next i",
+        "for k = 1 to 20",
+        "    print(a)",
+        "next k",
+    ]
+
+
+@benchmark("large_program")
+def large_program() -> list[str]:
+    #
+    # A long program repeating the same identifiers and string literals, mostly measured with --memory for the size of its parsed form
+    #
+    lines: list[str] = [f"total_{i} = 0" for i in range(100)] + ["counter_value = 1"]
+    for i in range(10000):
+        lines.append(f"total_{i % 100} = total_{i % 100} + counter_value")
+        lines.append(f"label = \"a repeated string literal, number {i % 10}\"")
+    return lines
+
+
+@benchmark("sieve", counts_ops=True)
+def sieve() -> list[str]:
+    #
+    # Sieve of Eratosthenes, counting the primes up to n. The operations are the values of the array visited
+    #
+    return [
+        "n = 30000",
+        "array composite[n + 1]",
+        "for i = 0 to n",
+        "    composite[i] = false",
+        "next i",
+        "primes = 0",
+        "ops = n + 1",
+        "for i = 2 to n",
+        "    if NOT composite[i] then",
+        "        primes = primes + 1",
+        "        j = i * i",
+        "        while j <= n",
+        "            composite[j] = true",
+        "            j = j + i",
+        "            ops = ops + 1",
+        "        endwhile",
+        "    endif",
+        "next i",
+        "print(primes)",
+        "print(ops + n - 1)",
+    ]
+
+
+@benchmark("collatz", counts_ops=True)
+def collatz() -> list[str]:
+    #
+    # Finds the starting number up to 1000 with the longest Collatz sequence. The operations are the steps of all the sequences
+    #
+    return [
+        "longest = 0",
+        "best = 0",
+        "ops = 0",
+        "for n = 1 to 1000",
+        "    x = n",
+        "    steps = 0",
+        "    while x != 1",
+        "        if x MOD 2 == 0 then",
+        "            x = x DIV 2",
+        "        else",
+        "            x = 3 * x + 1",
+        "        endif",
+        "        steps = steps + 1",
+        "    endwhile",
+        "    if steps > longest then",
+        "        longest = steps",
+        "        best = n",
+        "    endif",
+        "    ops = ops + steps",
+        "next n",
+        "print(best, longest)",
+        "print(ops)",
+    ]
+
+
+@benchmark("mandelbrot", counts_ops=True)
+def mandelbrot() -> list[str]:
+    #
+    # Renders the Mandelbrot set on a 60x24 grid of characters. The operations are the iterations of all the points
+    #
+    return [
+        "max_iter = 50",
+        "shades = \" .:-=+*%@\"",
+        "ops = 0",
+        "for py = 0 to 23",
+        "    line = \"\"",
+        "    cy = -1.2 + float(py) * 0.1",
+        "    for px = 0 to 59",
+        "        cx = float(px) * 3.0 / 60.0 - 2.0",
+        "        x = 0.0",
+        "        y = 0.0",
+        "        k = 0",
+        "        while k < max_iter AND x * x + y * y <= 4.0",
+        "            t = x * x - y * y + cx",
+        "            y = 2.0 * x * y + cy",
+        "            x = t",
+        "            k = k + 1",
+        "        endwhile",
+        "        if k == max_iter then",
+        "            line = line + \"#\"",
+        "        else",
+        "            line = line + shades.substring(int(float(k) / float(max_iter) * 9.0), 1)",
+        "        endif",
+        "        ops = ops + k",
+        "    next px",
+        "    print(line)",
+        "next py",
+        "print(ops)",
+    ]
+
+
+def run_benchmark(name: str) -> tuple[int, str]:
+    """
+    Parses and executes the named benchmark program inside a temporary working directory, capturing its console output
+    :param name: name of the registered benchmark
+    :return: tuple of CPU time taken by the execution in nanoseconds and the console output of the program
+    """
+    output = StringIO()
+    prev_cwd: str = os.getcwd()
+    with TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            lines: list[str] = list(BENCHMARKS[name]())
+            executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), output_stream=output)
+            begin_time: int = process_time_ns()
+            executor.execute()
+            elapsed: int = process_time_ns() - begin_time
+        finally:
+            os.chdir(prev_cwd)
+    return elapsed, output.getvalue()
+
+
+def measure_peak_memory(name: str) -> int:
+    """
+    Runs the named benchmark once while tracing memory allocations. Tracing slows execution down, so this is kept separate from timed runs
+    :param name: name of the registered benchmark
+    :return: peak size in bytes of the memory allocated during the run
+    """
+    tracemalloc.start()
+    try:
+        run_benchmark(name)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    #
+    # Usage: python benchmark.py [--memory] [benchmark names...]
+    #
+    with_memory: bool = "--memory" in argv[1:]
+    names: list[str] = [arg for arg in argv[1:] if arg != "--memory"] or list(BENCHMARKS.keys())
+    for benchmark_name in names:
+        assert benchmark_name in BENCHMARKS, f"unknown benchmark '{benchmark_name}', expected one of {list(BENCHMARKS.keys())}"
+        runs: list[tuple[int, str]] = [run_benchmark(benchmark_name) for _ in range(REPEATS)]
+        time_taken: int = min(elapsed for elapsed, _ in runs)
+        report: str = f"{benchmark_name}: {time_taken / 1e9:.3f} s CPU time"
+        if benchmark_name in COUNTING_BENCHMARKS:
+            ops: int = int(runs[0][1].splitlines()[-1])
+            report += f", {ops / (time_taken / 1e9):,.0f} ops/s"
+        if with_memory:
+            report += f", {measure_peak_memory(benchmark_name) / 2 ** 20:.1f} MiB peak memory"
+        print(report)
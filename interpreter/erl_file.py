@@ -0,0 +1,166 @@
+import io
+import locale
+import mmap
+import os
+from io import TextIOWrapper, BufferedReader
+from typing import Optional, IO
+
+
+class ErlFile(io.IOBase):
+    """File opened by an ERL program via openRead() or openWrite().
+
+    Wraps the underlying text stream, caching whether it was opened for writing so that readLine() and writeLine() can be checked
+    without inspecting the stream's mode string. The stream is given a large buffer, so that most lines are served from memory.
+    End of file is detected by reading the next line ahead of time rather than by seeking, which for text streams is slow.
+    Being an IOBase, the file is closed along with the symbol table holding it.
+    """
+    #
+    # Modes in which the underlying streams are opened by openRead() and openWrite() respectively
+    #
+    READ_MODE: str = "r+"
+    WRITE_MODE: str = "w+"
+    #
+    # Size in bytes of the buffer of the underlying binary stream
+    #
+    BUFFER_SIZE: int = 1 << 20
+
+    def __init__(self, stream: IO, for_writing: bool):
+        """Wraps an open text stream. Use open_read() or open_write() to open a file by path.
+
+        :param stream: the underlying stream.
+        :param for_writing: True if the file was opened via openWrite(), False if via openRead().
+        """
+        super().__init__()
+        self.__stream: IO = stream
+        self.for_writing: bool = for_writing
+        #
+        # Line read ahead by at_end(), returned by the next call to read_line()
+        #
+        self.__next_line: Optional[str] = None
+
+    @staticmethod
+    def open_read(file_path: str, memory_mapped: bool = False) -> 'ErlFile':
+        """Opens the file at the given path for reading.
+
+        :param file_path: path of the file.
+        :param memory_mapped: True to read the file through a memory mapping (see MappedErlFile), False to read it through a text stream.
+        :return: the opened file.
+        """
+        if memory_mapped:
+            return MappedErlFile(open(file_path, "rb", buffering=0))
+        return ErlFile(open(file_path, ErlFile.READ_MODE, buffering=ErlFile.BUFFER_SIZE), False)
+
+    @staticmethod
+    def open_write(file_path: str) -> 'ErlFile':
+        """Opens the file at the given path for writing, truncating it.
+
+        :param file_path: path of the file.
+        :return: the opened file.
+        """
+        return ErlFile(open(file_path, ErlFile.WRITE_MODE, buffering=ErlFile.BUFFER_SIZE), True)
+
+    def read_line(self) -> str:
+        """Reads the next line of the file.
+
+        :return: the line including its trailing newline, if any, or an empty string at the end of the file.
+        """
+        line: Optional[str] = self.__next_line
+        if line is None:
+            return self.__stream.readline()
+        self.__next_line = None
+        return line
+
+    def write_line(self, line: str):
+        """Writes a line to the file, followed by a newline.
+
+        :param line: the line to write.
+        """
+        self.__stream.write(line + "\n")
+
+    def at_end(self) -> bool:
+        """Checks if the file pointer is at the end of the file. Files opened for writing are truncated and only appended to, so they always are.
+
+        :return: True if there is nothing left to read, else False.
+        """
+        if self.for_writing:
+            return True
+        if self.__next_line is None:
+            self.__next_line = self.__stream.readline()
+        return not self.__next_line
+
+    def readable(self) -> bool:
+        return not self.for_writing
+
+    def writable(self) -> bool:
+        return self.for_writing
+
+    def close(self):
+        """Closes the underlying stream, flushing anything written to it."""
+        if not self.closed:
+            self.__stream.close()
+        super().close()
+
+    def __str__(self) -> str:
+        return str(self.__stream)
+
+
+class MappedErlFile(ErlFile):
+    """File opened for reading via openRead() whose contents are memory-mapped rather than read through a buffered stream.
+
+    Processes reading the same file share its pages in the page cache instead of each copying it into their own buffers.
+    Lines are located in the mapping as bytes and only decoded when read, newlines being translated as in text mode.
+    """
+
+    def __init__(self, stream: BufferedReader):
+        """Maps the whole of an open binary stream.
+
+        :param stream: the underlying stream, opened in binary read mode.
+        """
+        super().__init__(stream, False)
+        self.__size: int = os.fstat(stream.fileno()).st_size
+        #
+        # Empty files cannot be mapped, they have no mapping at all
+        #
+        self.__map: Optional[mmap.mmap] = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ) if self.__size else None
+        self.__pos: int = 0
+        self.__encoding: str = locale.getpreferredencoding(False)
+        #
+        # Position of the next carriage return at or after the read position, or the size of the file if there is none.
+        # It is only searched for again once passed, so files without carriage returns are only scanned for them once
+        #
+        self.__next_cr_pos: int = -1
+
+    def read_line(self) -> str:
+        """Reads the next line of the file, decoding it. Like in text mode, "\\r\\n" and a lone "\\r" both end a line and are read as "\\n".
+
+        :return: the line including its trailing newline, if any, or an empty string at the end of the file.
+        """
+        pos: int = self.__pos
+        if pos >= self.__size:
+            return ""
+        mapping: mmap.mmap = self.__map
+        end: int = mapping.find(b"\n", pos)
+        end = self.__size if end == -1 else end + 1
+        cr_pos: int = self.__next_cr_pos
+        if cr_pos < pos:
+            cr_pos = mapping.find(b"\r", pos)
+            self.__next_cr_pos = cr_pos = self.__size if cr_pos == -1 else cr_pos
+        if cr_pos >= end:
+            self.__pos = end
+            return mapping[pos:end].decode(self.__encoding)
+        self.__pos = cr_pos + 2 if cr_pos + 1 < end and mapping[cr_pos + 1] == ord("\n") else cr_pos + 1
+        return mapping[pos:cr_pos].decode(self.__encoding) + "\n"
+
+    def at_end(self) -> bool:
+        """Checks if the whole mapping has been read.
+
+        :return: True if there is nothing left to read, else False.
+        """
+        return self.__pos >= self.__size
+
+    def close(self):
+        """Releases the mapping and closes the underlying stream."""
+        if self.__map is not None:
+            self.__map.close()
+            self.__map = None
+        super().close()
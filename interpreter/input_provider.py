@@ -0,0 +1,99 @@
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, Iterator, Optional, TextIO
+
+
+class InputProvider(ABC):
+    """Source of the lines read by the input() statements of a program.
+
+    Providers reading from a terminal or another interactive source display the prompt of input() themselves, while other providers leave
+    the executor to write it to the program output, as the prompt would be when standard input is redirected from a file.
+    """
+    #
+    # True if the prompt of input() is written to the program output rather than displayed by the provider
+    #
+    echo_prompt: bool = True
+
+    @abstractmethod
+    def read_line(self, prompt: str) -> str:
+        """Reads the next line of input.
+
+        :param prompt: the prompt of the input() statement.
+        :return: the line, without its trailing newline.
+        :raises EOFError: if there is no more input.
+        """
+
+    def close(self):
+        """Releases any resource held by the provider."""
+        pass
+
+    def __enter__(self) -> 'InputProvider':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class StdinInputProvider(InputProvider):
+    """Reads input lines from the console via the built-in input(), which displays the prompt."""
+    echo_prompt: bool = False
+
+    def read_line(self, prompt: str) -> str:
+        return input(prompt)
+
+
+class ListInputProvider(InputProvider):
+    """Reads input lines from a pre-loaded sequence of lines."""
+
+    def __init__(self, lines: Iterable[str]):
+        """Initializes the provider with the lines to read, in order.
+
+        :param lines: the lines, without trailing newlines.
+        """
+        self.__lines: Iterator[str] = iter(lines)
+
+    def read_line(self, prompt: str) -> str:
+        line: Optional[str] = next(self.__lines, None)
+        if line is None:
+            raise EOFError("No more input lines")
+        return line
+
+
+class FileInputProvider(InputProvider):
+    """Reads input lines from a text file or stream, through its buffer rather than line by line from the terminal."""
+    #
+    # Size in bytes of the buffer of files opened by path
+    #
+    BUFFER_SIZE: int = 1 << 16
+
+    def __init__(self, file: str | TextIO):
+        """Initializes the provider with the file to read.
+
+        :param file: path of the file to open, or an open text stream, e.g. sys.stdin. Streams are not closed by the provider.
+        """
+        self.__owns_stream: bool = isinstance(file, str)
+        self.__stream: TextIO = open(file, "r", buffering=FileInputProvider.BUFFER_SIZE) if self.__owns_stream else file
+
+    def read_line(self, prompt: str) -> str:
+        line: str = self.__stream.readline()
+        if not line:
+            raise EOFError("No more input lines")
+        return line[:-1] if line[-1] == "\n" else line
+
+    def close(self):
+        if self.__owns_stream:
+            self.__stream.close()
+
+
+class CallableInputProvider(InputProvider):
+    """Reads input lines by calling a function with the prompt, which is left to the function to display."""
+    echo_prompt: bool = False
+
+    def __init__(self, read_line: Callable[[str], str]):
+        """Initializes the provider with the function to call.
+
+        :param read_line: function taking the prompt and returning the line, without its trailing newline.
+        """
+        self.__read_line: Callable[[str], str] = read_line
+
+    def read_line(self, prompt: str) -> str:
+        return self.__read_line(prompt)
@@ -1,8 +1,11 @@
 import json
+import signal
 from typing import Iterable, Iterator, Optional
-from sys import argv, stdout
+from sys import argv, stdout, stdin
 from time import time_ns
 from ast_executor import AstExecutor
+from erl_file import ErlFile
+from input_provider import InputProvider, FileInputProvider
 from parsed_ast import Node
 from lexer import Lexer
 from parser import Parser
@@ -12,10 +15,29 @@ import logging
 
 
 class Interpreter:
-    def __init__(self, lines: Iterable[str]):
+    #
+    # Maximum number of nested subroutine calls allowed in interpreted programs
+    #
+    MAX_CALL_DEPTH: int = 10000
+    #
+    # Number of characters of program output buffered before being written to the console, matching the usual capacity of a pipe
+    #
+    OUTPUT_BUFFER_SIZE: int = 65536
+    #
+    # Number of seconds after which buffered output is written to the console even if the buffer is not full,
+    # so that the output of a program busy computing or looping still appears in the terminal without a noticeable delay
+    #
+    OUTPUT_MAX_LATENCY: float = 0.1
+    #
+    # Size in bytes from which files opened by openRead() are memory-mapped. Smaller files fit in the buffer of a text stream, filled by a single read
+    #
+    MEMORY_MAP_MIN_SIZE: int = ErlFile.BUFFER_SIZE
+
+    def __init__(self, lines: Iterable[str], input_provider: Optional[InputProvider] = None):
         """
         Sets up logging and initialises lexer, parser and executor with input source code lines
         :param lines: iterable of strings
+        :param input_provider: source of the lines read by input() statements. If None, they are read from the console
         """
         logging.basicConfig(filename="interpreterlog.log", format="[%(asctime)s:%(created).9f %(levelname)s] %(message)s", level=logging.DEBUG)
         self.source_code: list[str] = []
@@ -23,7 +45,9 @@ class Interpreter:
         self.__tokenizer = Tokenizer(on_new_line_input=lambda s: self.source_code.append(s))
         self.__lexer = Lexer(self.__tokenizer, lines)
         self.__parser = Parser(self.__lexer, on_parse_begin=self.on_parse_begin, on_parse_finish=self.on_parse_finish, on_error=lambda *args: self.on_error(*args, post_parse=False))
-        self.__executor = AstExecutor(self.__parser, on_error=self.on_executor_error)
+        self.__executor = AstExecutor(self.__parser, on_error=self.on_executor_error, max_call_depth=Interpreter.MAX_CALL_DEPTH,
+                                     output_buffer_size=Interpreter.OUTPUT_BUFFER_SIZE, input_provider=input_provider,
+                                     output_max_latency=Interpreter.OUTPUT_MAX_LATENCY, memory_map_min_size=Interpreter.MEMORY_MAP_MIN_SIZE)
 
     def interpret(self):
         logging.debug("\n\n" + "#" * 50 + "\n" + "BEGINNING EXECUTION" + "\n" + "#" * 50)
@@ -50,7 +74,10 @@ class Interpreter:
             logging.debug("....")
         ex_msg = f"{e.__class__.__name__}: {str(e)}"
         whole_msg = [heading] + code_snippet + [ex_msg]
-        max_src_code_line_len = max(len(line) for line in code_snippet)
+        #
+        # Errors may not be attributed to any line, e.g. when execution is interrupted between two instructions
+        #
+        max_src_code_line_len = max((len(line) for line in code_snippet), default=len(heading))
         whole_msg.insert(1, "-" * max_src_code_line_len)
         whole_msg.insert(-1, "-" * max_src_code_line_len)
         for line in whole_msg:
@@ -111,5 +138,17 @@ def get_lines(file_name: str) -> Iterator[str]:
 
 
 if __name__ == "__main__":
+    #
+    # Usage: python interpreter.py <source file> [<input file>]
+    # If an input file is given, input() statements read their lines from it, or from standard input in batch if it is '-', rather than from the console
+    #
     assert len(argv) > 1, "name of input text file required"
-    Interpreter(get_lines(argv[1])).interpret()
+    #
+    # The editor stops a running program by terminating its process, which is handled as Ctrl-C so that the output buffered so far is written out
+    #
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    if len(argv) > 2:
+        with FileInputProvider(stdin if argv[2] == "-" else argv[2]) as inputs:
+            Interpreter(get_lines(argv[1]), inputs).interpret()
+    else:
+        Interpreter(get_lines(argv[1])).interpret()
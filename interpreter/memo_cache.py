@@ -0,0 +1,70 @@
+from collections import OrderedDict
+from typing import Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+class MemoCache:
+    """Bounded least-recently-used cache of function results, keyed by the called function and its argument values.
+
+    Keeps statistics on lookups so the caller can assess how effective memoization was.
+    """
+
+    def __init__(self, max_size: int):
+        """Initializes an empty cache.
+
+        :param max_size: maximum number of results stored, the least recently used result being evicted when it is exceeded.
+        """
+        assert max_size > 0, f"Illegal memoization cache size: {max_size}"
+        self.max_size: int = max_size
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.__entries: OrderedDict[Hashable, V] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """Gets the cached result for the given key, marking it as the most recently used and counting the hit or miss.
+
+        :param key: key of the function call.
+        :return: the cached result, or None if there is none.
+        """
+        result: Optional[V] = self.__entries.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.__entries.move_to_end(key)
+        return result
+
+    def put(self, key: Hashable, result: V):
+        """Stores the result of a function call, evicting the least recently used result if the cache is full.
+
+        :param key: key of the function call.
+        :param result: result of the call. It may not be None.
+        """
+        assert result is not None, "Cannot cache a None result"
+        self.__entries[key] = result
+        self.__entries.move_to_end(key)
+        if len(self.__entries) > self.max_size:
+            self.__entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Removes all cached results and resets the statistics."""
+        self.__entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Gets the proportion of lookups that found a cached result, or 0 if no lookups took place."""
+        lookups: int = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.__entries
+
+    def __str__(self) -> str:
+        return f"{len(self)}/{self.max_size} results cached, {self.hits} hit(s), {self.misses} miss(es), {self.evictions} eviction(s), hit rate {self.hit_rate:.1%}"
@@ -0,0 +1,149 @@
+import logging
+import sys
+import threading
+from enum import Enum
+from typing import Optional, TextIO, Iterable
+
+
+class FlushPolicy(Enum):
+    """When buffered console output is written out to the underlying stream."""
+    #
+    # After every printed line, as if the output was not buffered
+    #
+    LINE = "line"
+    #
+    # Whenever the buffer is full
+    #
+    BLOCK = "block"
+    #
+    # Whenever the buffer is full, and before the program asks for user input so that prompts appear after the preceding output
+    #
+    ON_INPUT = "on-input"
+    #
+    # Only when the program finishes, regardless of how much output was buffered
+    #
+    ON_EXIT = "on-exit"
+
+
+class OutputWriter:
+    """Buffers the lines printed by a program, writing them to the output stream in blocks rather than one write per line.
+
+    The buffer is always flushed when the program finishes; flushing at other times is governed by the flush policy,
+    and by the maximum latency of the output if there is one.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, buffer_size: int = 8192, flush_policy: FlushPolicy = FlushPolicy.ON_INPUT,
+                 max_latency: Optional[float] = None):
+        """Initializes an empty buffer.
+
+        :param stream: stream written to. If None, the standard output at the time of flushing is used.
+        :param buffer_size: number of characters buffered before the buffer is considered full.
+        :param flush_policy: when the buffered output is written to the stream.
+        :param max_latency: number of seconds after which buffered output is written to the stream, even if the flush policy does not require it,
+            so that the output of a program busy computing still appears. If None, output waits for the flush policy.
+        """
+        assert buffer_size > 0, f"Illegal output buffer size: {buffer_size}"
+        assert max_latency is None or max_latency > 0, f"Illegal output latency: {max_latency}"
+        self.stream: Optional[TextIO] = stream
+        self.buffer_size: int = buffer_size
+        self.flush_policy: FlushPolicy = flush_policy
+        self.max_latency: Optional[float] = max_latency
+        self.__parts: list[str] = []
+        self.__buffered_size: int = 0
+        #
+        # With a maximum latency, a timer thread flushes the buffer max_latency seconds after output is buffered while no timer is pending,
+        # so there is at most one timer per period however much is printed. The lock guards the buffer against the timer thread
+        #
+        self.__lock = threading.Lock()
+        self.__timer: Optional[threading.Timer] = None
+        #
+        # Precomputed flags, so that writing a line takes no enum comparisons
+        #
+        self.__flush_every_line: bool = flush_policy is FlushPolicy.LINE
+        self.__flush_when_full: bool = flush_policy in (FlushPolicy.BLOCK, FlushPolicy.ON_INPUT)
+
+    def write_line(self, line: str):
+        """Buffers a line of output, flushing the buffer if the flush policy requires it.
+
+        :param line: the line, without its trailing newline.
+        """
+        with self.__lock:
+            if self.__timer is None and self.max_latency is not None:
+                self.__schedule_flush()
+            self.__parts.append(line)
+            self.__parts.append("\n")
+            self.__buffered_size += len(line) + 1
+            if self.__flush_every_line or (self.__flush_when_full and self.__buffered_size >= self.buffer_size):
+                self.__flush()
+
+    def write(self, text: str):
+        """Buffers output that does not end the line, such as the prompt of an input() statement. It is flushed with the next line,
+        or when the buffer is full.
+
+        :param text: the text to write.
+        """
+        with self.__lock:
+            if self.__timer is None and self.max_latency is not None:
+                self.__schedule_flush()
+            self.__parts.append(text)
+            self.__buffered_size += len(text)
+            if self.__flush_when_full and self.__buffered_size >= self.buffer_size:
+                self.__flush()
+
+    def write_parts(self, parts: Iterable[str]):
+        """Buffers output produced in parts, such as the representation of a large array, without joining them first.
+        Like write(), the parts do not end the line, and the buffer is flushed as soon as it is full.
+
+        :param parts: the parts of the text to write.
+        """
+        buffer: list[str] = self.__parts
+        flush_when_full: bool = self.__flush_when_full
+        with self.__lock:
+            if self.__timer is None and self.max_latency is not None:
+                self.__schedule_flush()
+            for part in parts:
+                buffer.append(part)
+                self.__buffered_size += len(part)
+                if flush_when_full and self.__buffered_size >= self.buffer_size:
+                    self.__flush()
+
+    def before_input(self):
+        """Flushes the buffer if the flush policy requires it to happen before the program reads user input."""
+        if self.flush_policy is FlushPolicy.ON_INPUT or self.flush_policy is FlushPolicy.LINE:
+            self.flush()
+
+    def flush(self):
+        """Writes all the buffered output to the stream in a single write and flushes the stream."""
+        with self.__lock:
+            self.__flush()
+
+    def __schedule_flush(self):
+        timer = threading.Timer(self.max_latency, self.__flush_on_timer)
+        #
+        # A pending timer must not keep the process alive once the program has finished
+        #
+        timer.daemon = True
+        self.__timer = timer
+        timer.start()
+
+    def __flush_on_timer(self):
+        with self.__lock:
+            self.__timer = None
+            self.__flush()
+
+    def __flush(self):
+        if not self.__parts:
+            return
+        output: str = "".join(self.__parts)
+        self.__parts.clear()
+        self.__buffered_size = 0
+        stream: TextIO = self.stream if self.stream is not None else sys.stdout
+        stream.write(output)
+        stream.flush()
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug(f"CONSOLE OUTPUT: {output.rstrip()}")
+
+    @property
+    def buffered_size(self) -> int:
+        """Gets the number of characters waiting to be written to the stream."""
+        return self.__buffered_size
@@ -2,6 +2,7 @@ from enum import Enum
 from functools import cache
 from typing import Iterable, Optional
 from parsed_token import TokenVals
+from string_pool import intern_name
 
 
 class ProgramBlockKinds(Enum):
@@ -132,7 +133,7 @@ class ArrayDecl(GlobDecl):
         return self
 
     def set_name(self, name: str) -> 'ArrayDecl':
-        self.name = name
+        self.name = intern_name(name)
         return self
 
     def set_dims(self, expr_list: 'ExprList') -> 'ArrayDecl':
@@ -269,7 +270,7 @@ class Identifier(Node):
 
     def __init__(self, line_index: int, name: str = ""):
         super().__init__(line_index)
-        self.name = name
+        self.name = intern_name(name)
         assert Identifier.NAME_FIELD in self.__dict__
 
     def reduce(self) -> 'Node':
@@ -405,7 +406,7 @@ class Param(Node):
     def __init__(self, line_index: int, name: str, is_byref: bool):
         super().__init__(line_index)
         self.is_byref = is_byref
-        self.name = name
+        self.name = intern_name(name)
         assert Param.NAME_FIELD in self.__dict__
         assert Param.IS_BYREF_FIELD in self.__dict__
 
@@ -2,16 +2,28 @@ import logging
 from io import StringIO
 from sys import stdout
 from typing import Iterable
-import re
 
 from interpreter import Interpreter
 from ast_executor import AstExecutor
+from input_provider import CallableInputProvider
 from parsed_ast import Node
 from lexer import Lexer
 from parser import Parser
 from tokenizer import Tokenizer
 
 output_buffer = StringIO()
+# The whole program is run again for every line entered, so the values entered for input() statements are recorded and given again to the
+# same statements in later runs, only reading from the console for input() statements that were not run before
+inputs: list[str] = []
+num_of_replayed_inputs = 0
+
+
+def read_input(prompt: str) -> str:
+    global num_of_replayed_inputs
+    if num_of_replayed_inputs == len(inputs):
+        inputs.append(input(prompt))
+    num_of_replayed_inputs += 1
+    return inputs[num_of_replayed_inputs - 1]
 
 
 class ReplInterpreter(Interpreter):
@@ -21,7 +33,9 @@ class ReplInterpreter(Interpreter):
         self.__lexer = Lexer(self.__tokenizer, lines)
         self.__parser = Parser(self.__lexer, on_parse_begin=self.on_parse_begin, on_parse_finish=self.on_parse_finish,
                                on_error=lambda *args: self.on_error(*args, post_parse=False))
-        self.__executor = AstExecutor(self.__parser, on_error=self.on_executor_error, output_stream=output_buffer)
+        self.__executor = AstExecutor(self.__parser, on_error=self.on_executor_error, output_stream=output_buffer,
+                                     max_call_depth=Interpreter.MAX_CALL_DEPTH, input_provider=CallableInputProvider(read_input),
+                                     memory_map_min_size=Interpreter.MEMORY_MAP_MIN_SIZE)
 
     def interpret(self):
         self.__executor.execute()
@@ -68,28 +82,6 @@ def get_iterable(arr: list[str]):
         yield i
 
 
-# Claude wrote these two functions ;)
-def detect_input_usage(code_string):
-    pattern = r'input\s*\([\'"](.+?)[\'"]\)'
-    match = re.search(pattern, code_string)
-
-    if match:
-        prompt = match.group(1)  # The text inside input()
-        return True, prompt
-    else:
-        return False, None
-
-
-def replace_input_with_string(code_string, new_value):
-    # Example:
-    # Input: x = input("Hello"), "hi"
-    # Output: x =  "hi"
-
-    pattern = r'input\s*\([^\)]*\)'
-    replacement = f'"{new_value}"'
-    return re.sub(pattern, replacement, code_string)
-
-
 lines = []
 indented_block = []
 num_of_outputs = 0
@@ -122,12 +114,6 @@ while "quit()" not in lines:
 
     next_line = input((symbols[depth % len(symbols)] * 3) + " ")
 
-    # Handle inputs manually and rewrite them to make code deterministic
-    is_input, text = detect_input_usage(next_line)
-    if is_input:
-        value_inputted = input(text)
-        next_line = replace_input_with_string(next_line, value_inputted)
-
     # Use split to avoid issues such as "if" being in "endif" and being flagged as both incrementer and decrementer of depth
     for i in increase_depth_words:
         if i == next_line.split()[0] or ((next_line.split()[0] == "public" or next_line.split()[0] == "private") and i == next_line.split()[1]):
@@ -143,12 +129,16 @@ while "quit()" not in lines:
         run = lines + indented_block
 
         run.append(next_line)
+        num_of_replayed_inputs = 0
+        num_of_recorded_inputs = len(inputs)
         try:
             ReplInterpreter(get_iterable(run)).interpret()
         except:
             error = True
             depth = 0
             indented_block = []
+            # The values entered while running the erroneous line are not given again to later runs
+            del inputs[num_of_recorded_inputs:]
 
         if not error:
             lines = run
@@ -0,0 +1,37 @@
+import sys
+
+
+def intern_name(name: str) -> str:
+    """Interns the name of an identifier, so that all occurrences of the name, from the tokens of a program to the keys of the symbol tables,
+    are the same string object. Looking up an interned name in a dictionary whose key is the same object compares them by identity.
+
+    :param name: the name.
+    :return: the interned name, equal to the given name.
+    """
+    return sys.intern(name)
+
+
+class StringPool:
+    """Pool of the string literals of a program, so that equal literals share a single string.
+
+    Unlike identifier names, literals are pooled per program rather than interned for the lifetime of the process, as they may be long.
+    """
+
+    def __init__(self):
+        """Initializes an empty pool."""
+        self.__strings: dict[str, str] = {}
+
+    def pooled(self, s: str) -> str:
+        """Gets the pooled string equal to the given string, adding it to the pool if there is none.
+
+        :param s: the string.
+        :return: the string of the pool equal to s.
+        """
+        return self.__strings.setdefault(s, s)
+
+    def __len__(self) -> int:
+        """Gets the number of distinct strings in the pool."""
+        return len(self.__strings)
+
+    def __contains__(self, s: str) -> bool:
+        return s in self.__strings
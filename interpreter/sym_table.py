@@ -1,7 +1,10 @@
 import io
-from typing import Dict, TypeVar, Optional, Iterable, Tuple, Iterator
+import weakref
+from array import array
+from typing import Dict, TypeVar, Optional, Iterable, Tuple, Iterator, Sequence
 
 from parsed_token import TokenContents
+from string_pool import intern_name
 
 V = TypeVar("V")
 
@@ -10,25 +13,144 @@ class NullVal:
     #
     # Used to provide distinction between a null value in the language
     # and None in Python used to indicate the lack of the existence of
-    # a value in a symbol table
+    # a value in a symbol table.
+    # NullVal is a singleton: NullVal() always returns the same instance, NULL, so that null values are checked by identity
     #
+    __instance: Optional['NullVal'] = None
+
+    def __new__(cls) -> 'NullVal':
+        if NullVal.__instance is None:
+            NullVal.__instance = super().__new__(cls)
+        return NullVal.__instance
+
     def __str__(self) -> str:
         return 'null'
 
-    def __eq__(self, other) -> str:
-        # All NullVal instances are the same
-        return type(other) == NullVal
+    def __eq__(self, other) -> bool:
+        return other is self
 
     def __hash__(self) -> int:
         return 9691
 
 
+NULL: NullVal = NullVal()
+
+
+class StrBuilder:
+    """String value of a variable that is repeatedly appended to, e.g. by 's = s + x' in a loop.
+
+    The appended strings are collected and only joined when the value is read, so that building a string is linear rather than quadratic
+    in its length. Reading the value through the symbol table (via SymAddr.value) or converting it with str() gives the built string.
+    """
+
+    __slots__ = ("__parts",)
+
+    def __init__(self, initial: str):
+        """Initializes the builder with the current value of the string.
+
+        :param initial: the string to append to.
+        """
+        self.__parts: list[str] = [initial]
+
+    def append(self, s: str):
+        """Appends a string to the value.
+
+        :param s: the string to append.
+        """
+        self.__parts.append(s)
+
+    def build(self) -> str:
+        """Gets the built string, joining the parts appended since it was last built.
+
+        :return: the value of the string.
+        """
+        parts: list[str] = self.__parts
+        if len(parts) > 1:
+            parts[:] = ["".join(parts)]
+        return parts[0]
+
+    def __str__(self) -> str:
+        return self.build()
+
+
+class StrView:
+    """String value of a variable assigned a long substring, e.g. by 's = s.substring(1, s.length - 1)'.
+
+    The view refers to its range of characters in the original string rather than copying them, so that substrings can be taken again and again
+    without copying the remaining characters each time. Reading the value through the symbol table (via SymAddr.value) or converting it with str()
+    gives the substring, copied once.
+    """
+
+    __slots__ = ("base", "start", "length", "__str")
+
+    def __init__(self, base: str, start: int, length: int):
+        """Initializes the view of a range of characters of a string.
+
+        :param base: the string the characters are in.
+        :param start: index of the first character of the range.
+        :param length: number of characters in the range. The range must be within the string.
+        """
+        self.base: str = base
+        self.start: int = start
+        self.length: int = length
+        self.__str: Optional[str] = None
+
+    def substring(self, start: int, length: int) -> str:
+        """Gets a substring of the view, in the same way as slicing the string it stands for would.
+
+        :param start: index of the first character of the substring in the view. It must be within the view.
+        :param length: maximum number of characters in the substring.
+        :return: the substring.
+        """
+        start, end, _ = slice(start, start + length).indices(self.length)
+        return self.base[self.start + start:self.start + max(start, end)]
+
+    def view(self, start: int, length: int) -> 'StrView':
+        """Gets the view of a substring of the view, sharing the same string.
+
+        :param start: index of the first character of the substring in the view. It must be within the view.
+        :param length: maximum number of characters in the substring.
+        :return: the view of the substring.
+        """
+        start, end, _ = slice(start, start + length).indices(self.length)
+        return StrView(self.base, self.start + start, max(0, end - start))
+
+    def build(self) -> str:
+        """Gets the substring the view stands for, copying it from the string on the first call.
+
+        :return: the value of the string.
+        """
+        if self.__str is None:
+            self.__str = self.base[self.start:self.start + self.length]
+        return self.__str
+
+    def __str__(self) -> str:
+        return self.build()
+
+
+#
+# Types of values standing for strings that are only turned into str when read
+#
+LAZY_STR_TYPES: frozenset[type] = frozenset({StrBuilder, StrView})
+
+
 class ArrayVal:
-    """Representation of an array value in the symbol table. Stores all values in a contiguous array and its dimensions"""
+    """Representation of an array value in the symbol table. Stores all values in a contiguous array and its dimensions.
+
+    While all the values written are integers (or all are floats), they are stored in a compact typed array along with a bitmap of the null elements.
+    The array switches to a list of objects on the first write of a value of another type. No storage is allocated before the first write.
+
+    Sub-arrays are views sharing the storage of the array they were obtained from, until either is written to: the view then gets its own copy of the values,
+    so that sub-arrays behave as copies.
+    """
 
     dims: list[int]
-    vals: list[V]
+    strides: tuple[int, ...]
     size: int
+    #
+    # Maps the types of values that can be stored in a typed array to the corresponding array type codes
+    #
+    __TYPECODES: dict[type, str] = {int: 'q', float: 'd'}
 
     def __init__(self, dims: list[int]):
         """Initializes the array value with a list of dimensions.
@@ -39,10 +161,59 @@ class ArrayVal:
         for d in dims:
             assert d > 0, f"Illegal array dimension: {d}"
         self.dims = dims
-        self.size = 1
-        for d in self.dims:
-            self.size *= d
-        self.vals = [NullVal()] * self.size
+        #
+        # The stride of each dimension is the distance between consecutive indexes of that dimension in the contiguous values, i.e. the size of a slice
+        #
+        strides: list[int] = [1] * len(dims)
+        for i in range(len(dims) - 1, 0, -1):
+            strides[i - 1] = strides[i] * dims[i]
+        self.strides = tuple(strides)
+        self.size = strides[0] * dims[0]
+        #
+        # Backing storage: None while all values are null, a typed array of values along with a bitmap of null values, or a list of objects
+        #
+        self.__store: Optional[array | list[V]] = None
+        self.__nulls: Optional[bytearray] = None
+        self.__null_count: int = self.size
+        #
+        # For views, the array owning the storage and the position of the first value of the view within it
+        #
+        self.__base: Optional[ArrayVal] = None
+        self.__offset: int = 0
+        #
+        # For arrays owning storage, weak references to the live views sharing it, keyed by their ids
+        #
+        self.__views: Optional[dict[int, weakref.ref]] = None
+
+    @property
+    def vals(self) -> list[V]:
+        """Gets the list of all values of the array, switching its storage to a list of objects if needed."""
+        self.__before_write()
+        if type(self.__store) is not list:
+            self.__to_list()
+        return self.__store
+
+    @vals.setter
+    def vals(self, vals: list[V]):
+        """Sets the list of all values of the array.
+
+        :param vals: list of values, its length must match the size of the array.
+        """
+        self.__before_write()
+        self.__store = vals
+        self.__nulls = None
+        self.__null_count = 0
+
+    @property
+    def typecode(self) -> Optional[str]:
+        """Gets the type code of the typed array storing the values, or None if values are not stored in a typed array."""
+        store = self.__base.__store if self.__base is not None else self.__store
+        return store.typecode if isinstance(store, array) else None
+
+    @property
+    def is_view(self) -> bool:
+        """Gets whether the array is a view sharing the storage of another array."""
+        return self.__base is not None
 
     def get_slice(self, indexes: list[int]) -> Tuple[int, int]:
         """Gets the range within the 'vals' attribute corresponding to the given indexes.
@@ -52,12 +223,14 @@ class ArrayVal:
         """
         if 0 < len(indexes) <= len(self.dims):
             start: int = 0
-            size: int = self.size
-            for i in range(0, len(indexes)):
-                size //= self.dims[i]
-                start += size * indexes[i]
-            return start, size
-        raise IndexError(f"Illegal array indexes: {indexes}")
+            for index, dim, stride in zip(indexes, self.dims, self.strides):
+                if not isinstance(index, int):
+                    raise IndexError(f"Array index '{index}' is not an integer")
+                if not 0 <= index < dim:
+                    raise IndexError(f"Array index {index} is out of bounds, it must be between 0 and {dim - 1}")
+                start += index * stride
+            return start, self.strides[len(indexes) - 1]
+        raise IndexError(f"Illegal array indexes: {list(indexes)}")
 
     def get_at(self, indexes: list[int]) -> 'ArrayVal' | V:
         """Gets the values at the given indexes.
@@ -68,15 +241,30 @@ class ArrayVal:
         :param indexes: list of indexes identifying the slice or value to retrieve.
         :return: sub-array value or scalar value, depending on the dimensionality of the result.
         """
+        return self.get_item(*indexes)
+
+    def get_item(self, *indexes: int) -> 'ArrayVal' | V:
+        """Gets the value or sub-array at the given indexes, e.g. arr.get_item(i, j).
+
+        :param indexes: indexes identifying the value or sub-array to retrieve, each of them being checked against the bounds of its dimension.
+        :return: sub-array value or scalar value, depending on the dimensionality of the result.
+        """
         start, size = self.get_slice(indexes)
-        assert start >= 0 and size >= 1, "Logical error, should never be here"
         if size == 1:
-            return self.vals[start]
-        end = start + size
+            return self.__read(start)
         assert len(indexes) < len(self.dims), "Logical error, should never be here"
+        #
+        # Views are always created on the array owning the storage, so that views of views do not chain
+        #
+        base: ArrayVal = self.__base if self.__base is not None else self
         result: 'ArrayVal' = ArrayVal(self.dims[len(indexes):])
-        result.vals = self.vals[start:end]
-        result.size = size
+        result.__base = base
+        result.__offset = self.__offset + start
+        if base.__views is None:
+            base.__views = {}
+        views: dict[int, weakref.ref] = base.__views
+        key: int = id(result)
+        views[key] = weakref.ref(result, lambda _: views.pop(key, None))
         return result
 
     def set_at(self, indexes: list[int], val: V) -> V:
@@ -86,50 +274,280 @@ class ArrayVal:
         :param indexes: list of indexes to set the value at. The length of this list must match the dimensionality of the array.
         :return: the value that has been set.
         """
+        return self.set_item(val, *indexes)
+
+    def set_item(self, val: V, *indexes: int) -> V:
+        """Sets a single value within the array at the given indexes, e.g. arr.set_item(val, i, j).
+
+        :param val: value to set.
+        :param indexes: indexes to set the value at, each of them being checked against the bounds of its dimension. There must be one index per dimension.
+        :return: the value that has been set.
+        """
         start, size = self.get_slice(indexes)
-        assert start >= 0 and size >= 1, "Logical error, should never be here"
         if size > 1:
-            raise IndexError(f"Illegal indexing for value setting: {indexes}")
-        self.vals[start] = val
+            raise IndexError(f"Illegal indexing for value setting: {list(indexes)}")
+        self.__write(start, val)
         return val
 
+    def get_values(self, start: int, end: int) -> Sequence[V]:
+        """Gets a range of consecutive values, in their contiguous order.
+
+        :param start: position of the first value.
+        :param end: position after the last value.
+        :return: a copy of the values, as a typed array if they are stored in one and none of them is null, otherwise as a list.
+        """
+        if not 0 <= start <= end <= self.size:
+            raise IndexError(f"Illegal range of array values: {start} to {end}")
+        if self.__base is not None:
+            return self.__base.get_values(self.__offset + start, self.__offset + end)
+        store = self.__store
+        if type(store) is list:
+            return store[start:end]
+        if store is None or self.__count_nulls(start, end):
+            return [self.__read(pos) for pos in range(start, end)]
+        return store[start:end]
+
+    def set_values(self, start: int, vals: Sequence[V]):
+        """Sets a range of consecutive values at once, e.g. when filling or copying a one-dimensional array.
+        The values are written with the same effect on the storage as writing them one by one.
+
+        :param start: position of the first value to set.
+        :param vals: the values to set.
+        """
+        end: int = start + len(vals)
+        if not 0 <= start <= end <= self.size:
+            raise IndexError(f"Illegal range of array values: {start} to {end}")
+        if self.__base is not None or self.__views:
+            self.__before_write()
+        store = self.__store
+        if type(store) is list:
+            store[start:end] = vals
+            return
+        if isinstance(vals, array):
+            typecode: Optional[str] = vals.typecode
+        else:
+            val_types: set[type] = set(map(type, vals))
+            typecode = ArrayVal.__TYPECODES.get(val_types.pop()) if len(val_types) == 1 else None
+        if typecode is not None and (store is None or store.typecode == typecode):
+            try:
+                typed_vals: array = vals if isinstance(vals, array) else array(typecode, vals)
+            except OverflowError:
+                typed_vals = None
+            if typed_vals is not None:
+                if store is None:
+                    self.__store = store = array(typecode, [0]) * self.size
+                    self.__nulls = ArrayVal.__null_bitmap(self.size)
+                store[start:end] = typed_vals
+                self.__null_count -= self.__count_nulls(start, end, clear=True)
+                return
+        for pos in range(start, end):
+            self.__write(pos, vals[pos - start])
+
+    def __count_nulls(self, start: int, end: int, clear: bool = False) -> int:
+        """Counts the null values in a range of positions of a typed array, optionally marking them as not null.
+
+        :param start: first position of the range.
+        :param end: position after the last position of the range.
+        :param clear: True if the null bits of the range should be cleared, else False.
+        :return: number of null values in the range (before clearing).
+        """
+        if not self.__null_count or start >= end:
+            return 0
+        nulls: bytearray = self.__nulls
+        count: int = 0
+        #
+        # Bits at the edges of the range that do not span a whole byte are handled one by one, whole bytes at once
+        #
+        first_byte: int = (start + 7) >> 3
+        last_byte: int = end >> 3
+        if first_byte >= last_byte:
+            edge_positions = range(start, end)
+        else:
+            edge_positions = [*range(start, first_byte << 3), *range(last_byte << 3, end)]
+            count += int.from_bytes(nulls[first_byte:last_byte], "little").bit_count()
+            if clear:
+                nulls[first_byte:last_byte] = bytes(last_byte - first_byte)
+        for pos in edge_positions:
+            if nulls[pos >> 3] & (1 << (pos & 7)):
+                count += 1
+                if clear:
+                    nulls[pos >> 3] &= ~(1 << (pos & 7))
+        return count
+
+    def __read(self, pos: int) -> V:
+        """Gets the value at the given position of the storage.
+
+        :param pos: position within the contiguous values of the array.
+        :return: the value, NullVal if it was never set.
+        """
+        if self.__base is not None:
+            return self.__base.__read(self.__offset + pos)
+        store = self.__store
+        if type(store) is list:
+            return store[pos]
+        if store is None or (self.__null_count and self.__nulls[pos >> 3] & (1 << (pos & 7))):
+            return NULL
+        return store[pos]
+
+    def __write(self, pos: int, val: V):
+        """Sets the value at the given position of the storage, switching to a typed array on the first write or to a list of objects on a write
+        not matching the type of the typed array.
+
+        :param pos: position within the contiguous values of the array.
+        :param val: value to set.
+        """
+        if self.__base is not None or self.__views:
+            self.__before_write()
+        store = self.__store
+        if type(store) is list:
+            store[pos] = val
+            return
+        if val is NULL:
+            if store is not None and not self.__nulls[pos >> 3] & (1 << (pos & 7)):
+                self.__nulls[pos >> 3] |= 1 << (pos & 7)
+                self.__null_count += 1
+                store[pos] = 0
+            return
+        typecode: Optional[str] = ArrayVal.__TYPECODES.get(type(val))
+        if store is None and typecode is not None:
+            store = self.__store = array(typecode, [0]) * self.size
+            self.__nulls = ArrayVal.__null_bitmap(self.size)
+        if typecode is None or typecode != store.typecode:
+            self.__to_list()[pos] = val
+            return
+        try:
+            store[pos] = val
+        except OverflowError:
+            self.__to_list()[pos] = val
+            return
+        if self.__null_count and self.__nulls[pos >> 3] & (1 << (pos & 7)):
+            self.__nulls[pos >> 3] &= ~(1 << (pos & 7))
+            self.__null_count -= 1
+
+    def __before_write(self):
+        """Ensures writing to the array does not affect other arrays: a view gets its own copy of the values, and views of the array are given
+        their own copy of the values before they change."""
+        if self.__base is not None:
+            base: ArrayVal = self.__base
+            base.__copy_to(self, self.__offset)
+            if base.__views is not None:
+                base.__views.pop(id(self), None)
+            self.__base = None
+            self.__offset = 0
+        if self.__views:
+            for ref in list(self.__views.values()):
+                view: Optional[ArrayVal] = ref()
+                if view is not None:
+                    view.__before_write()
+            self.__views.clear()
+
+    def __to_list(self) -> list[V]:
+        """Switches the storage to a list of objects, converting any typed array.
+
+        :return: the list of values.
+        """
+        store = self.__store
+        if store is None:
+            self.__store = [NULL] * self.size
+        elif type(store) is not list:
+            self.__store = store.tolist()
+            if self.__null_count:
+                for pos in range(self.size):
+                    if self.__nulls[pos >> 3] & (1 << (pos & 7)):
+                        self.__store[pos] = NULL
+        self.__nulls = None
+        self.__null_count = 0
+        return self.__store
+
+    def __copy_to(self, other: 'ArrayVal', start: int):
+        """Copies a range of values of the same size as the other array into its storage.
+
+        :param other: the array to copy values to.
+        :param start: position of the first value to copy.
+        """
+        store = self.__store
+        end: int = start + other.size
+        if store is None:
+            return
+        other.__store = store[start:end]
+        if type(store) is list:
+            other.__null_count = 0
+        elif not self.__null_count:
+            other.__nulls = bytearray(len(ArrayVal.__null_bitmap(other.size)))
+            other.__null_count = 0
+        else:
+            other.__nulls = ArrayVal.__null_bitmap(other.size)
+            for pos in range(start, end):
+                if not self.__nulls[pos >> 3] & (1 << (pos & 7)):
+                    other.__nulls[(pos - start) >> 3] &= ~(1 << ((pos - start) & 7))
+                    other.__null_count -= 1
+
+    @staticmethod
+    def __null_bitmap(size: int) -> bytearray:
+        """Creates a bitmap marking the given number of values as null.
+
+        :param size: number of values.
+        :return: bytearray with one set bit per value.
+        """
+        full_bytes, remaining_bits = divmod(size, 8)
+        bitmap = bytearray(b'\xff') * full_bytes
+        if remaining_bits:
+            bitmap.append((1 << remaining_bits) - 1)
+        return bitmap
+
+    def __iter__(self) -> Iterator[V]:
+        """Iterates over all values of the array, in their contiguous order. The values are read as they are reached, so the array must not be written
+        to while the iteration is in progress."""
+        store = self.__store
+        if type(store) is list:
+            return iter(store)
+        if self.__base is not None and type(self.__base.__store) is list:
+            #
+            # Values of views are read by position from the storage of their base, rather than from a copy of their range
+            #
+            return map(self.__base.__store.__getitem__, range(self.__offset, self.__offset + self.size))
+        return (self.__read(pos) for pos in range(self.size))
+
     @property
     def length(self) -> int:
         return self.dims[0]
 
     def __eq__(self, other: 'ArrayVal') -> bool:
-        return self.vals == other.vals
+        if isinstance(self.__store, array) and isinstance(other.__store, array) and self.__store.typecode == other.__store.typecode:
+            return self.__store == other.__store and self.__nulls == other.__nulls
+        return list(self) == list(other)
 
     def __str__(self) -> str:
-        result = ArrayVal.split_vals(self.vals.copy(), self.dims.copy())
-        return ArrayVal.stringify_list(result)
+        return "".join(self.render())
 
-    @staticmethod
-    def split_vals(vals: list[V], dims: list[int]) -> list:
+    def render(self) -> Iterator[str]:
+        """Renders the string representation of the array, e.g. "[[1, 2], [3, null]]", in chunks of one innermost sub-array at a time.
+        Joined, the chunks make up str() of the array, so that large arrays can be written out without building their whole representation.
+
+        :return: iterator over the chunks of the representation.
+        """
         #
-        # As the values in ArrayVal are stored as a contiguous array, regardless of dimensionality,
-        # this function is used to create an array with sub-arrays of correct length according to the dimensions
+        # The values are walked in their contiguous order one row (sub-array of the last dimension) at a time rather than split into nested lists.
+        # Besides its own brackets, a row opens the enclosing sub-arrays (and the array itself) that start with it, and closes those that end with it
         #
-        if len(dims) == 1:
-            return vals
-        first_dim = dims.pop(0)
-        slice_length = len(vals) // first_dim
-        result = [vals[i:i + slice_length] for i in range(0, len(vals), slice_length)]
-        for i in range(len(result)):
-            result[i] = ArrayVal.split_vals(result[i], dims)
-        return result
+        enclosing_sizes: tuple[int, ...] = ((self.size,) + self.strides)[:-2]
+        row_length: int = self.dims[-1]
+        for start in range(0, self.size, row_length):
+            end: int = start + row_length
+            opened: int = 1 + sum(1 for size in enclosing_sizes if start % size == 0)
+            closed: int = 1 + sum(1 for size in enclosing_sizes if end % size == 0)
+            yield (", " if start else "") + "[" * opened + ArrayVal.__render_row(self.get_values(start, end)) + "]" * closed
 
     @staticmethod
-    def stringify_list(vals: list[V]) -> str:
-        casted_values = []
-        for val in vals:
-            if type(val) == str:
-                casted_values.append(f"'{val}'")
-            elif type(val) == list:
-                casted_values.append(ArrayVal.stringify_list(val))
-            else:
-                casted_values.append(str(val))
-        return '[' + ", ".join(casted_values) + ']'
+    def __render_row(vals: Sequence[V]) -> str:
+        """Renders the values of a row of an array, delimited by commas. Strings are quoted, other values are converted with str().
+
+        :param vals: the values of the row.
+        :return: the representation of the values, without brackets.
+        """
+        if isinstance(vals, array):
+            return ", ".join(map(str, vals))
+        return ", ".join(f"'{val}'" if type(val) is str else str(val) for val in vals)
 
 
 class SymAddr:
@@ -147,8 +565,6 @@ class SymAddr:
         self.__indexes = None
         if indexes is not None:
             assert indexes, "List of addressing indexes may not be empty"
-            for index in indexes:
-                assert index >= 0, f"Invalid array dimension value: {index}"
             self.__indexes = indexes
 
     def addr_of(self, indexes: list[int]) -> 'SymAddr':
@@ -168,9 +584,11 @@ class SymAddr:
         """Gets the value associated with the symbol (and indexes, if any)."""
         result: V = self.sym_table.lookup_symbol(self.name)
         if result is not None:
-            if self.dims:
+            if self.__indexes:
                 arr: ArrayVal = result
-                return arr.get_at(self.__indexes)
+                return arr.get_item(*self.__indexes)
+            if type(result) in LAZY_STR_TYPES:
+                return result.build()
             return result
         raise ValueError(f"Unknown symbol to get value of: {self.name}")
 
@@ -188,7 +606,7 @@ class SymAddr:
             if arr:
                 if len(arr.dims) != len(self.__indexes):
                     raise RuntimeError(f"Invalid number of indexes to set: expected={len(arr.dims)}, provided={self.__indexes}")
-                arr.set_at(self.__indexes, val)
+                arr.set_item(val, *self.__indexes)
         else:
             self.sym_table.update_symbol(self.name, val)
 
@@ -229,11 +647,22 @@ class SymAddr:
         raise RuntimeError("Illegal to get index from non-dimensional address")
 
     def __str__(self) -> str:
+        return "".join(self.render())
+
+    def render(self) -> Iterator[str]:
+        """Renders the string representation of the address and its value in chunks, the value being rendered with render_value().
+
+        :return: iterator over the chunks of the representation.
+        """
         try:
             value = self.value
         except ValueError:
             value = None
-        return f"Address to '{self.name}'" + f" of value {value}" if value is not None else " of null value"
+        if value is None:
+            yield " of null value"
+            return
+        yield f"Address to '{self.name}' of value "
+        yield from render_value(value)
 
 
 class SymRef(SymAddr):
@@ -245,6 +674,11 @@ class SymRef(SymAddr):
         self.__addr = None
         if addr is None:
             addr = super().value
+        #
+        # A reference to a reference is collapsed into a reference to the original address, so that passing a byRef parameter on to further calls does not build chains
+        #
+        while isinstance(addr, SymRef):
+            addr = addr.__addr
         if isinstance(addr, SymAddr):
             self.__addr = addr
         else:
@@ -298,9 +732,18 @@ class SymTable(Dict[str, V]):
     It is a hierarchical dictionary of (name, value) correspondence, each 'name' representing a variable, and each 'value' the value associated with it.
 
     Each symbol table has a reference to its parent table (if any) and the root symbol table (defined as the table with no parent)
+
+    Each table caches the ancestor tables in which symbols missing from it were last found. Symbols must be added to and removed from tables through the methods of
+    this class (rather than by setting or deleting dictionary items) for these cached lookups to be invalidated.
     """
 
     parent: 'SymTable'
+    #
+    # Version of the scopes that symbols are looked up through, i.e. of the tables having child tables.
+    # It is incremented whenever a symbol is added to or removed from one of them, or one of them is closed, which invalidates all cached lookups
+    #
+    __scopes_version: int = 0
+    __NON_STREAM_TYPES: frozenset[type] = frozenset({int, float, str, bool, NullVal, StrBuilder, StrView, ArrayVal, SymAddr, SymRef})
 
     def __init__(self, parent: 'SymTable' = None, init_symbols: Dict[str, V] = {}):
         """Initializes the symbol table.
@@ -314,7 +757,12 @@ class SymTable(Dict[str, V]):
         super().__init__()
         self.parent = parent
         self.__root = None
-        self.update_symbols(init_symbols)
+        self.__has_children: bool = False
+        self.__lookup_cache: Optional[Dict[str, Tuple['SymTable', int]]] = None
+        if parent is not None:
+            parent.__has_children = True
+        if init_symbols:
+            self.update_symbols(init_symbols)
 
     def __enter__(self):
         return self
@@ -324,13 +772,16 @@ class SymTable(Dict[str, V]):
 
     def close(self):
         """Closes the object by removing circular references to parent and root symbol tables."""
+        if self.__has_children:
+            SymTable.__scopes_version += 1
         self.__root = None
         self.parent = None
+        self.__lookup_cache = None
         #
-        # Closes any I/O streams present
+        # Closes any I/O streams present. Values of the most common types are skipped without the slower check against the abstract base class
         #
         for v in self.values():
-            if isinstance(v, io.IOBase):
+            if type(v) not in SymTable.__NON_STREAM_TYPES and isinstance(v, io.IOBase):
                 v.close()
 
     @property
@@ -368,8 +819,18 @@ class SymTable(Dict[str, V]):
         :return: this symbol table.
         """
         if val is None:
-            self.pop(name, None)
+            if name in self:
+                del self[name]
+                if self.__has_children:
+                    SymTable.__scopes_version += 1
         else:
+            if name not in self:
+                #
+                # New symbols are keyed by their interned name, so that looking them up by the names of the program's identifiers compares them by identity
+                #
+                name = intern_name(name)
+                if self.__has_children:
+                    SymTable.__scopes_version += 1
             self[name] = val
         return self
 
@@ -409,14 +870,15 @@ class SymTable(Dict[str, V]):
                                 not be None for the assignment to take effect.
         :return: value associated with the symbol, if any.
         """
+        result: Optional[V] = self.get(name)
+        if result is not None:
+            return result
         ret: Optional[Tuple[V, 'SymTable']] = self.lookup_symbol_with_table(name)
         if ret is not None:
             result, _ = ret
         elif value_if_absent is not None:
             result = value_if_absent
-            self[name] = result
-        else:
-            result = None
+            self.update_symbol(name, result)
         return result
 
     def lookup_symbol_with_table(self, name: str) -> Optional[Tuple[V, 'SymTable']]:
@@ -427,10 +889,28 @@ class SymTable(Dict[str, V]):
         :param name: symbol to get the value for. It may not be None.
         :return: value associated with the symbol and the table in which it was found, if found, else None.
         """
-        sym_table = self
-        while name not in sym_table and sym_table.parent is not None:
+        if name in self:
+            return self[name], self
+        parent: Optional[SymTable] = self.parent
+        if parent is None or name in parent:
+            return (parent[name], parent) if parent is not None else None
+        #
+        # Beyond the parent, the table in which the symbol was last found is cached in the parent, for as long as the symbols of the scopes are unchanged
+        #
+        cache: Optional[Dict[str, Tuple[SymTable, int]]] = parent.__lookup_cache
+        entry: Optional[Tuple[SymTable, int]] = cache.get(name) if cache is not None else None
+        if entry is not None and entry[1] == SymTable.__scopes_version:
+            sym_table: SymTable = entry[0]
+            return sym_table[name], sym_table
+        sym_table = parent.parent
+        while sym_table is not None and name not in sym_table:
             sym_table = sym_table.parent
-        return (sym_table.get(name), sym_table) if name in sym_table else None
+        if sym_table is None:
+            return None
+        if cache is None:
+            parent.__lookup_cache = cache = {}
+        cache[name] = (sym_table, SymTable.__scopes_version)
+        return sym_table[name], sym_table
 
     def is_symbol_public(self, name: str) -> bool:
         #
@@ -439,46 +919,273 @@ class SymTable(Dict[str, V]):
         return True
 
 
+class ClassLayout:
+    """Layout of the members declared by a class, computed once from its declaration and shared by all its instances.
+
+    Methods are held by the layout alone, and resolved through it by the instances rather than copied into each of them.
+    Fields whose values need no evaluation (fields without an initial value or initialised with a literal) are copied at once into each instance from a template.
+    Fields initialised with other expressions are evaluated for each instance. As each such expression must only see the members declared before it, the template holds
+    the fields declared before the first of them, and the initializers hold all the following fields, in declaration order, along with the methods declared before each.
+    """
+
+    def __init__(self, class_name: str, has_parent: bool):
+        """Initializes the layout of a class with no members.
+
+        :param class_name: name of the class.
+        :param has_parent: True if the class inherits from another class, whose instance is then referenced by the 'super' member.
+        """
+        self.class_name: str = class_name
+        self.template: Dict[str, V] = {}
+        self.initializers: list[Tuple[str, V, bool, Dict[str, V]]] = []
+        self.methods: Dict[str, V] = {}
+        self.public_names: frozenset[str] = frozenset([TokenContents.SUPER.value]) if has_parent else frozenset()
+        self.member_names: list[str] = list(self.public_names)
+        self.__names: set[str] = set(self.public_names)
+
+    def declares(self, name: str) -> bool:
+        """Checks whether a member is declared by the class.
+
+        :param name: name of the member.
+        :return: True if the member is declared, or is the 'super' member of a class inheriting from another class, else False.
+        """
+        return name in self.__names
+
+    def add_member(self, name: str, val: V, is_public: bool, needs_evaluation: bool = False, is_method: bool = False):
+        """Adds the next declared member to the layout.
+
+        :param name: name of the member.
+        :param val: value of the member, or the expression to evaluate for each instance to get its value.
+        :param is_public: True if the member is public, False if private.
+        :param needs_evaluation: True if val is an expression to evaluate, False if it is the value itself.
+        :param is_method: True if val is the declaration of a method, shared by all instances.
+        """
+        if name in self.__names:
+            raise SyntaxError(f"Declaration of the attribute '{name}' cannot appear more than once")
+        name = intern_name(name)
+        self.__names.add(name)
+        self.member_names.append(name)
+        if is_method:
+            self.methods[name] = val
+        elif needs_evaluation or self.initializers:
+            #
+            # Initializers declared between the same methods share the same copy of the methods declared before them
+            #
+            methods: Dict[str, V] = self.initializers[-1][3] if self.initializers else {}
+            if len(methods) != len(self.methods):
+                methods = dict(self.methods)
+            self.initializers.append((name, val, needs_evaluation, methods))
+        else:
+            self.template[name] = val
+        if is_public:
+            self.public_names = self.public_names | {name}
+
+
 class ObjSymTable(SymTable):
     """
-    A subclass of SymTable, adding utility methods for allocating members at instantiation and for tracking which members are private.
+    A subclass of SymTable, holding the fields of an instance of a class (for one level of its class hierarchy) and tracking which members are private.
+
+    Methods are not stored in the table but resolved through the methods of the layout of the class, although they are found by the same lookups as fields.
+    While the initializers of the layout are evaluated, the methods resolved are restricted to those declared before each initializer.
+    A field stored with the name of a method hides the method for this instance only.
     """
-    def __init__(self, parent: SymTable, storage_key: str, class_name: str):
+    def __init__(self, parent: SymTable, layout: ClassLayout):
+        """Initializes the object with the fields of the template of its class layout.
+        The fields of the initializers of the layout are left to be evaluated and added with update_symbol.
+
+        :param parent: the instance of the parent class if the class inherits from another class, else the table the class is declared in.
+        :param layout: layout of the class of the object.
+        """
         super().__init__(parent)
-        self.class_name = class_name
-        self.STORAGE_KEY = storage_key
-        self.public_symbols = []
+        self.class_name: str = layout.class_name
+        self.public_symbols: frozenset[str] = layout.public_names
+        self.__layout: ClassLayout = layout
+        self.methods: Dict[str, V] = layout.methods
         if isinstance(parent, ObjSymTable):
-            self.add_parent_class(parent)
+            self[TokenContents.SUPER.value] = parent
+        self.update(layout.template)
+        #
+        # True while the object is being rendered, to detect objects that reference themselves
+        #
+        self.__rendering: bool = False
 
-    @property
-    def storage_key(self) -> str:
-        return self.STORAGE_KEY
+    def __contains__(self, name: str) -> bool:
+        return dict.__contains__(self, name) or name in self.methods
 
-    def add_member(self, name: str, val: V, is_public: bool):
-        ret: Optional[Tuple[V, SymTable]] = self.lookup_symbol_with_table(name)
-        if ret is not None:
-            _, tbl = ret
-            if tbl == self:
-                raise SyntaxError(f"Declaration of the attribute '{name}' cannot appear more than once")
-        self.update_symbol(name, val)
-        if is_public:
-            self.public_symbols.append(name)
+    def __missing__(self, name: str) -> V:
+        return self.methods[name]
 
-    def add_parent_class(self, parent: SymTable):
-        assert parent == self.parent, ("Parent class of the object cannot be different "
-                                       "from parent of the corresponding symbol table")
-        self.add_member(TokenContents.SUPER.value, parent, is_public=True)
+    def get(self, name: str, default: Optional[V] = None) -> Optional[V]:
+        val: Optional[V] = dict.get(self, name)
+        return val if val is not None else self.methods.get(name, default)
 
     def is_symbol_public(self, name: str) -> bool:
         return name in self.public_symbols
 
     def get_fields(self) -> Iterator[tuple[str, V]]:
+        #
+        # Members are listed in declaration order, including methods, followed by the fields added to this instance only
+        #
+        layout: ClassLayout = self.__layout
+        for k in layout.member_names:
+            v: Optional[V] = self.get(k)
+            if v is not None:
+                yield k, v
         for k, v in self.items():
-            yield k, v
+            if not layout.declares(k):
+                yield k, v
         if isinstance(self.parent, ObjSymTable):
             for k, v in self.parent.get_fields():
                 yield k, v
 
     def __str__(self) -> str:
-        return "<Instance of '{}': {}>".format(self.class_name, '{' + ", ".join(f"{str(k)}: {str(v)}" for k, v in self.get_fields()) + '}')
+        return "".join(self.render())
+
+    def render(self) -> Iterator[str]:
+        """Renders the string representation of the object and its fields in chunks, the values of the fields being rendered with render_value().
+
+        :return: iterator over the chunks of the representation.
+        :raises RecursionError: if the object references itself, directly or through other objects, as its representation would be infinite.
+        """
+        #
+        # Cycles are detected rather than left to the recursion limit, which may be raised high enough for deep programs that it would take very long to reach
+        #
+        if self.__rendering:
+            raise RecursionError(f"Cannot represent instance of '{self.class_name}' referencing itself")
+        self.__rendering = True
+        try:
+            yield f"<Instance of '{self.class_name}': {{"
+            separator: str = ""
+            for k, v in self.get_fields():
+                yield f"{separator}{k}: "
+                yield from render_value(v)
+                separator = ", "
+            yield "}>"
+        finally:
+            self.__rendering = False
+
+
+class LocalSymTable(SymTable):
+    """
+    Symbol table of the local variables of a subroutine call, i.e. its frame.
+
+    As no table can have looked symbols up through it yet, the arguments of the call are stored directly rather than through update_symbol.
+    """
+    def bind(self, name: str, val: Optional[V]):
+        """Stores the argument of a parameter of the call. It must be called before any other table is created with this table as its parent.
+
+        :param name: name of the parameter.
+        :param val: value of the argument, or address of the argument for byRef parameters. If None then the parameter is left unbound.
+        """
+        if val is not None:
+            self[name] = val
+
+
+class ObjRef(SymAddr):
+    """
+    Address of an object allocated in an object heap, identified by its handle.
+
+    References hold the object they address, so that an object lives as long as references to it are stored in variables, arrays or other objects.
+    """
+    def __init__(self, heap: 'ObjectHeap', handle: int, obj: ObjSymTable, instance: int):
+        super().__init__(None, None)
+        self.__heap = heap
+        self.__obj = obj
+        self.handle: int = handle
+        self.instance: int = instance
+
+    def addr_of(self, indexes: list[int]) -> 'SymAddr':
+        raise RuntimeError(f"Cannot index object {self.name}")
+
+    @property
+    def value(self) -> ObjSymTable:
+        """Gets the object."""
+        return self.__obj
+
+    @value.setter
+    def value(self, val: V):
+        raise RuntimeError(f"Cannot replace object {self.name}")
+
+    @property
+    def has_none_value(self) -> bool:
+        return False
+
+    @property
+    def sym_table(self) -> 'ObjectHeap':
+        """Gets the heap the object is allocated in."""
+        return self.__heap
+
+    @property
+    def name(self) -> str:
+        """
+        Gets the name of the object in the form "_._{class_name}_{instance #}_._", formatted so it cannot be confused with a name from source code.
+        """
+        return f"_._{self.__obj.class_name}_{self.instance}_._"
+
+    @property
+    def is_public(self) -> bool:
+        return True
+
+
+class ObjectHeap:
+    """Storage of the objects instantiated by a program, each identified by an integer handle.
+
+    The heap only holds weak references to the objects: an object is kept alive by the ObjRef references to it, and is removed from the heap
+    once there are none left (or, for objects referencing each other, once the cycle is collected).
+    """
+
+    def __init__(self):
+        self.__objects: Dict[int, weakref.ref] = {}
+        self.__next_handle: int = 1
+        self.__instance_count: Dict[str, int] = {}
+
+    def allocate(self, obj: ObjSymTable) -> ObjRef:
+        """Allocates an object in the heap.
+
+        :param obj: the object, with its members initialised.
+        :return: a reference to the object.
+        """
+        handle: int = self.__next_handle
+        self.__next_handle += 1
+        objects: Dict[int, weakref.ref] = self.__objects
+        objects[handle] = weakref.ref(obj, lambda _: objects.pop(handle, None))
+        instance: int = self.__instance_count.get(obj.class_name, 0) + 1
+        self.__instance_count[obj.class_name] = instance
+        return ObjRef(self, handle, obj, instance)
+
+    def get(self, handle: int) -> Optional[ObjSymTable]:
+        """Gets an object from its handle.
+
+        :param handle: handle of the object.
+        :return: the object, or None if it was reclaimed or never allocated.
+        """
+        ref: Optional[weakref.ref] = self.__objects.get(handle)
+        return ref() if ref is not None else None
+
+    @property
+    def allocated_count(self) -> int:
+        """Gets the number of objects allocated since the creation of the heap, including reclaimed objects."""
+        return self.__next_handle - 1
+
+    def __len__(self) -> int:
+        """Gets the number of live objects."""
+        return len(self.__objects)
+
+    def __contains__(self, handle: int) -> bool:
+        return handle in self.__objects
+
+
+#
+# Types of values whose string representation is rendered in chunks by their render() method
+#
+RENDERED_TYPES: tuple[type, ...] = (ArrayVal, SymAddr, ObjSymTable)
+
+
+def render_value(val: V) -> Iterable[str]:
+    """Renders the string representation of a value in chunks, without building the representation of arrays and objects as a whole.
+
+    :param val: the value.
+    :return: the chunks of the representation, which joined give str(val).
+    """
+    if isinstance(val, RENDERED_TYPES):
+        return val.render()
+    return (str(val),)
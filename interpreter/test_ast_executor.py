@@ -1,14 +1,20 @@
+import gc
 import os
+import signal
+import sys
+import threading
 from io import StringIO
 from typing import Iterable, Callable, Optional
 from unittest import TestCase
 from unittest.mock import patch
 
 from ast_executor import AstExecutor, ExeCtx
+from output_writer import FlushPolicy
+from input_provider import ListInputProvider, CallableInputProvider
 from lexer import Lexer
-from parsed_ast import Node, Program, VarAssign, ArrayDecl, ForLoop, GoToInstr, WhileLoop, DoUntil
+from parsed_ast import Node, Program, VarAssign, ArrayDecl, ForLoop, GoToInstr, WhileLoop, DoUntil, AddrIdOrCall
 from parser import Parser
-from sym_table import ArrayVal, SymAddr, NullVal
+from sym_table import ArrayVal, SymAddr, NullVal, ObjectHeap, StrBuilder, StrView, SymTable, LocalSymTable, ObjSymTable
 from tokenizer import Tokenizer
 
 
@@ -217,6 +223,119 @@ class TestAstExecutor(TestCase):
         self.__executor.execute()
         self.assertEqual(3, count)
 
+    def test_mixed_operand_types(self):
+        lines = [
+            "print(1 + 0.5, 0.5 + 1, 2 * \"ab\", \"ab\" * 2, 7 DIV 2.0)",
+            "print(1 == \"1\", true != \"true\", 3 < 3.5, 3.5 >= 3)",
+        ]
+        expected_output_lines = [
+            '1.5, 1.5, abab, abab, 3.0',
+            'False, True, True, True',
+            ''
+        ]
+        self.__test_print_output(lines, expected_output_lines)
+
+    def test_invalid_operand_types(self):
+        for expr, message in [("1 + \"a\"", "Invalid type for '+': '<class 'int'>', '<class 'str'>'"),
+                              ("\"a\" - \"b\"", "Invalid type for '-': '<class 'str'>', '<class 'str'>'"),
+                              ("true + 1", "Invalid type for '+': '<class 'bool'>', '<class 'int'>'"),
+                              ("\"a\" < \"b\"", "Invalid type for '<': '<class 'str'>', '<class 'str'>'")]:
+            self.__init_executor([f"x = {expr}"], None)
+            with self.assertRaises(SyntaxError) as ctx:
+                self.__executor.execute()
+            self.assertEqual(message, str(ctx.exception))
+
+    def test_array_index_out_of_bounds(self):
+        for instr, message in [("print(grid[1, 3])", "Array index 3 is out of bounds, it must be between 0 and 2"),
+                               ("grid[-1, 0] = 1", "Array index -1 is out of bounds, it must be between 0 and 1"),
+                               ("print(grid[0, 1.5])", "Array index '1.5' is not an integer"),
+                               ("print(grid[1, 1, 1])", "Illegal array indexes: [1, 1, 1]")]:
+            self.__init_executor(["array grid[2, 3]", instr], None)
+            with self.assertRaises(IndexError) as ctx:
+                self.__executor.execute()
+            self.assertEqual(message, str(ctx.exception))
+
+    def test_array_fill_and_copy_loops(self):
+        self.__test_print_output(["array a[6]",
+                                  "array b[6]",
+                                  "for i = 0 to 5",
+                                  "    a[i] = i",
+                                  "next i",
+                                  "print(a)",
+                                  "for i = 1 to 4",
+                                  "    b[i] = a[i]",
+                                  "next i",
+                                  "print(b)",
+                                  "print(i)",
+                                  "x = 2.5",
+                                  "for j = 4 to 5",
+                                  "    b[j] = x",
+                                  "next j",
+                                  "for j = 0 to 1",
+                                  "    b[j] = \"s\"",
+                                  "next j",
+                                  "print(b)",
+                                  "for j = 3 to 2",
+                                  "    b[j] = 0",
+                                  "next j",
+                                  "print(j)",
+                                  "b[0] = 9",
+                                  "print(a[0])"],
+                                 ["[0, 1, 2, 3, 4, 5]",
+                                  "[null, 1, 2, 3, 4, null]",
+                                  "4",
+                                  "['s', 's', 2, 3, 2.5, 2.5]",
+                                  "1",
+                                  "0",
+                                  ""])
+
+    def test_array_fill_loops_side_effects_and_exits(self):
+        #
+        # The value is computed at each iteration when it may have side effects
+        #
+        self.__test_print_output(["function next_value(v)",
+                                  "    print(v)",
+                                  "    return v * 2",
+                                  "endfunction",
+                                  "array a[3]",
+                                  "for i = 0 to 2",
+                                  "    a[i] = next_value(i)",
+                                  "next i",
+                                  "print(a)"],
+                                 ["0", "1", "2", "[0, 2, 4]", ""])
+        #
+        # Leaving the loop early stops the fill
+        #
+        self.__test_print_output(["array a[4]",
+                                  "for i = 0 to 3",
+                                  "    a[i] = 1",
+                                  "    if i == 1 then",
+                                  "        break",
+                                  "    endif",
+                                  "next i",
+                                  "print(a)"],
+                                 ["[1, 1, null, null]", ""])
+        #
+        # Out of bounds indexes are reported as when assigning elements one by one
+        #
+        self.__init_executor(["array a[3]", "for i = 1 to 3", "    a[i] = 5", "next i"], None)
+        with self.assertRaises(IndexError) as ctx:
+            self.__executor.execute()
+        self.assertEqual("Array index 3 is out of bounds, it must be between 0 and 2", str(ctx.exception))
+        #
+        # Callbacks see every assignment
+        #
+        count: int = 0
+
+        def callback(node: Node, ctx: ExeCtx):
+            nonlocal count
+            if isinstance(node, VarAssign):
+                count += 1
+
+        self.__init_executor(["array a[10]", "for i = 0 to 9", "    a[i] = 0", "next i"], callback)
+        self.__executor.execute()
+        self.assertEqual(10, count)
+
     def test_1_dim_array(self):
         count: int = 0
 
@@ -597,6 +716,441 @@ class TestAstExecutor(TestCase):
         self.__executor.execute()
         self.assertEqual(101, assign_count)
 
+    def test_for_loop_control_flow(self):
+        lines = [
+            "function firstOver(limit)",
+            "    for i = 0 to 100",
+            "        if i MOD 2 == 1 then",
+            "            continue",
+            "        endif",
+            "        if i > limit then",
+            "            return i",
+            "        endif",
+            "    next i",
+            "    return -1",
+            "endfunction",
+            "procedure stop()",
+            "    break",
+            "endprocedure",
+            "print(firstOver(7), firstOver(200))",
+            "for i = 0 to 5",
+            "    if i == 3 then",
+            "        stop()",
+            "    endif",
+            "    print(i)",
+            "next i",
+            "for k = 1 to 0",
+            "    print(k)",
+            "next k",
+        ]
+        expected_output_lines = ['8, -1', '0', '1', '2', '']
+        self.__test_print_output(lines, expected_output_lines)
+
+    def test_for_loop_by_ref_counter(self):
+        lines = [
+            "procedure countTo(n, i:byRef)",
+            "    for i = 1 to n",
+            "        total = i",
+            "    next i",
+            "endprocedure",
+            "x = 0",
+            "countTo(4, x)",
+            "print(x)",
+        ]
+        expected_output_lines = ['4', '']
+        self.__test_print_output(lines, expected_output_lines)
+
+    def test_deep_recursion(self):
+        lines = [
+            "function depth(n)",
+            "    if n == 0 then",
+            "        return 0",
+            "    endif",
+            "    return 1 + depth(n - 1)",
+            "endfunction",
+            "array values[10000]",
+            "for i = 0 to 9999",
+            "    values[i] = i",
+            "next i",
+            "function sumFrom(i)",
+            "    if i == 10000 then",
+            "        return 0",
+            "    endif",
+            "    return values[i] + sumFrom(i + 1)",
+            "endfunction",
+            "print(depth(10000))",
+            "print(sumFrom(0))",
+        ]
+        buffer = StringIO()
+        executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), output_stream=buffer, max_call_depth=20000)
+        recursion_limit = sys.getrecursionlimit()
+        executor.execute()
+        self.assertEqual("10000\n49995000\n", buffer.getvalue())
+        #
+        # The recursion limit raised for the execution thread is restored once it has finished
+        #
+        self.assertEqual(recursion_limit, sys.getrecursionlimit())
+
+    def test_max_call_depth_exceeded(self):
+        lines = [
+            "procedure recurse(n)",
+            "    recurse(n + 1)",
+            "endprocedure",
+            "recurse(0)",
+        ]
+        errors: list[BaseException] = []
+        executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), output_stream=StringIO(), on_error=lambda e, nodes: errors.append(e), max_call_depth=10000)
+        with self.assertRaises(RecursionError) as ctx:
+            executor.execute()
+        self.assertEqual("Maximum depth of 10000 nested subroutine calls exceeded when calling 'recurse()'", str(ctx.exception))
+        self.assertEqual([ctx.exception], errors)
+
+    def test_interrupted_on_deep_stack(self):
+        lines = [
+            'print("started")',
+            "x = 0",
+            "while true",
+            "    x = x + 1",
+            "endwhile",
+        ]
+        errors: list[tuple[BaseException, list[Node]]] = []
+        buffer = StringIO()
+        executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), output_stream=buffer, on_error=lambda e, nodes: errors.append((e, nodes)), max_call_depth=10000)
+        recursion_limit = sys.getrecursionlimit()
+        #
+        # Ctrl-C is simulated by sending SIGINT to the process, which requires it to be handled as it is by default
+        #
+        prev_handler = signal.signal(signal.SIGINT, signal.default_int_handler)
+        try:
+            threading.Timer(0.2, lambda: os.kill(os.getpid(), signal.SIGINT)).start()
+            with self.assertRaises(KeyboardInterrupt):
+                executor.execute()
+        finally:
+            signal.signal(signal.SIGINT, prev_handler)
+        self.assertEqual(recursion_limit, sys.getrecursionlimit())
+        self.assertEqual(1, len(errors))
+        self.assertIsInstance(errors[0][0], KeyboardInterrupt)
+        self.assertEqual(1, len(errors[0][1]))
+        self.assertIsInstance(errors[0][1][0], WhileLoop)
+        self.assertEqual("started\n", buffer.getvalue())
+
+    def test_tail_call_elimination(self):
+        lines = [
+            "function count(n, acc)",
+            "    if n == 0 then",
+            "        return acc",
+            "    endif",
+            "    return count(n - 1, acc + 1)",
+            "endfunction",
+            "print(count(1000000, 0))",
+        ]
+        expected_output_lines = ['1000000', '']
+        self.__test_print_output(lines, expected_output_lines)
+
+    def test_mutual_tail_calls(self):
+        lines = [
+            "function isEven(n)",
+            "    if n == 0 then",
+            "        return true",
+            "    endif",
+            "    return isOdd(n - 1)",
+            "endfunction",
+            "function isOdd(n)",
+            "    if n == 0 then",
+            "        return false",
+            "    endif",
+            "    return isEven(n - 1)",
+            "endfunction",
+            "print(isEven(10000))",
+            "print(isOdd(10001))",
+        ]
+        expected_output_lines = ['True', 'True', '']
+        self.__test_print_output(lines, expected_output_lines)
+
+    def test_tail_calls_with_references_and_objects(self):
+        lines = [
+            "class Counter",
+            "    public total",
+            "    public procedure new()",
+            "        total = 0",
+            "    endprocedure",
+            "    public function addUpTo(n)",
+            "        if n == 0 then",
+            "            return total",
+            "        endif",
+            "        total = total + n",
+            "        return addUpTo(n - 1)",
+            "    endfunction",
+            "endclass",
+            "function fill(n, counter)",
+            "    if n == 0 then",
+            "        return counter",
+            "    endif",
+            "    counter.total = counter.total + 1",
+            "    return fill(n - 1, counter)",
+            "endfunction",
+            "function makeFilled(n)",
+            "    return fill(n, new Counter())",
+            "endfunction",
+            "function incrementAll(n, x:byRef)",
+            "    if n == 0 then",
+            "        return x",
+            "    endif",
+            "    x = x + 1",
+            "    return incrementAll(n - 1, x)",
+            "endfunction",
+            "c = new Counter()",
+            "print(c.addUpTo(1000))",
+            "print(makeFilled(1000).total)",
+            "y = 0",
+            "print(incrementAll(1000, y))",
+            "print(y)",
+        ]
+        expected_output_lines = ['500500', '1000', '1000', '1000', '']
+        self.__test_print_output(lines, expected_output_lines)
+
+    def test_tail_calls_keep_open_tables_bounded(self):
+        #
+        # Tail calls passing arguments by value or passing on byRef parameters replace the local table of the caller, so the number of open local tables
+        # does not depend on the depth of the chain. Calls passing local variables of the caller byRef need its table, so they are run as nested calls
+        #
+        lines = [
+            "function count(n, acc)",
+            "    if n == 0 then",
+            "        return acc",
+            "    endif",
+            "    return count(n - 1, acc + 1)",
+            "endfunction",
+            "function incrementAll(n, x:byRef)",
+            "    if n == 0 then",
+            "        return x",
+            "    endif",
+            "    x = x + 1",
+            "    return incrementAll(n - 1, x)",
+            "endfunction",
+            "function copyDown(n, x:byRef)",
+            "    if n == 0 then",
+            "        return x",
+            "    endif",
+            "    y = x + 1",
+            "    return copyDown(n - 1, y)",
+            "endfunction",
+            "y = 0",
+            "print(count(DEPTH, 0))",
+            "print(incrementAll(DEPTH, y))",
+            "print(y)",
+        ]
+        max_open_tables: list[int] = []
+        for depth in (10, 1000):
+            open_tables: int = 0
+            max_open: int = 0
+            init_table: Callable = LocalSymTable.__init__
+            close_table: Callable = SymTable.close
+
+            def counting_init(table: LocalSymTable, *args):
+                nonlocal open_tables, max_open
+                init_table(table, *args)
+                open_tables += 1
+                max_open = max(max_open, open_tables)
+
+            def counting_close(table: SymTable):
+                nonlocal open_tables
+                if isinstance(table, LocalSymTable):
+                    open_tables -= 1
+                close_table(table)
+
+            buffer = StringIO()
+            executor = AstExecutor(Parser(Lexer(Tokenizer(), [line.replace("DEPTH", str(depth)) for line in lines])), output_stream=buffer, max_call_depth=2000)
+            with patch.object(LocalSymTable, "__init__", counting_init), patch.object(SymTable, "close", counting_close):
+                executor.execute()
+            self.assertEqual(f"{depth}\n{depth}\n{depth}\n", buffer.getvalue())
+            self.assertEqual(0, open_tables)
+            max_open_tables.append(max_open)
+        self.assertEqual(max_open_tables[0], max_open_tables[1])
+        lines = [line.replace("DEPTH", "100") for line in lines] + ["print(copyDown(100, y))"]
+        self.__test_print_output(lines, ["100", "100", "100", "200", ""])
+
+    def test_tail_calls_with_callbacks(self):
+        lines = [
+            "function count(n, acc)",
+            "    if n == 0 then",
+            "        return acc",
+            "    endif",
+            "    return count(n - 1, acc + 1)",
+            "endfunction",
+            "print(count(10, 0))",
+        ]
+        calls: list[Node] = []
+        buffer = StringIO()
+        executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), output_stream=buffer,
+                               pre_callback=lambda node, ctx: calls.append(node) if isinstance(node, AddrIdOrCall) and len(node.sub_nodes) > 1 else None)
+        executor.execute()
+        self.assertEqual("10\n", buffer.getvalue())
+        self.assertEqual(11, len([node for node in calls if node.sub_nodes[0].name == "count"]))
+
+    def test_memoized_tail_calls(self):
+        lines = [
+            "function square(n)",
+            "    return n * n",
+            "endfunction",
+            "function loudSquare(n)",
+            "    print(n)",
+            "    return square(n)",
+            "endfunction",
+            "for i = 1 to 3",
+            "    print(loudSquare(2))",
+            "next i",
+        ]
+        buffer = StringIO()
+        executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), output_stream=buffer, memo_cache_size=100)
+        executor.execute()
+        self.assertEqual("2\n4\n2\n4\n2\n4\n", buffer.getvalue())
+        self.assertEqual((2, 1), (executor.memo_cache.hits, executor.memo_cache.misses))
+
+    def test_memoized_pure_functions(self):
+        lines = [
+            "function fib(n)",
+            "    if n < 2 then",
+            "        return n",
+            "    endif",
+            "    return fib(n - 1) + fib(n - 2)",
+            "endfunction",
+            "function paths(x, y)",
+            "    if x == 0 OR y == 0 then",
+            "        return 1",
+            "    endif",
+            "    return paths(x - 1, y) + paths(x, y - 1)",
+            "endfunction",
+            "print(fib(60))",
+            "print(paths(16, 16))",
+            "print(fib(60))",
+        ]
+        buffer = StringIO()
+        executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), output_stream=buffer, max_call_depth=1000, memo_cache_size=1000)
+        executor.execute()
+        self.assertEqual("1548008755920\n601080390\n1548008755920\n", buffer.getvalue())
+        cache = executor.memo_cache
+        #
+        # Each distinct call misses once: fib(0) to fib(60) and paths(x, y) for 0 <= x, y <= 16 except paths(0, 0).
+        # All other calls hit: fib(n - 2) for 3 <= n <= 60 and the final fib(60), then paths makes 2 calls for each of its 16 * 16 non-base cases
+        #
+        self.assertEqual(61 + (17 * 17 - 1), cache.misses)
+        self.assertEqual(58 + 1 + (1 + 2 * 16 * 16) - (17 * 17 - 1), cache.hits)
+        self.assertEqual(cache.hits / (cache.hits + cache.misses), cache.hit_rate)
+
+    def test_memoization_bounded(self):
+        lines = [
+            "function square(n)",
+            "    return n * n",
+            "endfunction",
+            "total = 0",
+            "for i = 1 to 10",
+            "    total = total + square(i) + square(i)",
+            "next i",
+            "print(total)",
+        ]
+        buffer = StringIO()
+        executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), output_stream=buffer, memo_cache_size=4)
+        executor.execute()
+        self.assertEqual("770\n", buffer.getvalue())
+        self.assertEqual((10, 10, 6, 4), (executor.memo_cache.hits, executor.memo_cache.misses, executor.memo_cache.evictions, len(executor.memo_cache)))
+
+    def test_impure_functions_not_memoized(self):
+        lines = [
+            "offset = 0",
+            "function addOffset(n)",
+            "    return n + offset",
+            "endfunction",
+            "function loud(n)",
+            "    print(n)",
+            "    return n",
+            "endfunction",
+            "function swapFirst(arr, n)",
+            "    arr[0] = n",
+            "    return n",
+            "endfunction",
+            "function increment(n:byRef)",
+            "    n = n + 1",
+            "    return n",
+            "endfunction",
+            "function callsLoud(n)",
+            "    return loud(n) + 1",
+            "endfunction",
+            "function stopLoop(n)",
+            "    break",
+            "    return n",
+            "endfunction",
+            "function withLocalArray(n)",
+            "    array squares[n]",
+            "    for i = 0 to n - 1",
+            "        squares[i] = i * i",
+            "        if i == 2 then",
+            "            break",
+            "        endif",
+            "    next i",
+            "    return squares[2]",
+            "endfunction",
+            "function readsBeforeAssigning(n)",
+            "    offset = offset + n",
+            "    return offset",
+            "endfunction",
+            "function assignsInBranch(n)",
+            "    if n > 0 then",
+            "        offset = n",
+            "    endif",
+            "    return offset",
+            "endfunction",
+            "array values[1]",
+            "x = 1",
+            "for i = 1 to 2",
+            "    offset = i",
+            "    print(addOffset(1))",
+            "    print(loud(5))",
+            "    values[0] = 0",
+            "    print(swapFirst(values, 7) + values[0])",
+            "    print(increment(x))",
+            "    print(callsLoud(1))",
+            "    print(withLocalArray(4))",
+            "    print(readsBeforeAssigning(1))",
+            "    print(assignsInBranch(0))",
+            "next i",
+            "for i = 1 to 3",
+            "    print(stopLoop(i))",
+            "next i",
+        ]
+        buffer = StringIO()
+        executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), output_stream=buffer, memo_cache_size=100)
+        executor.execute()
+        expected_output_lines = ['2', '5', '5', '14', '2', '1', '2', '4', '2', '1', '3', '5', '5', '14', '3', '1', '2', '4', '3', '2', 'null', '']
+        self.assertEqual("\n".join(expected_output_lines), buffer.getvalue())
+        self.assertEqual((1, 1), (executor.memo_cache.hits, executor.memo_cache.misses))
+
+    def test_sub_arrays_behave_as_copies(self):
+        lines = [
+            "array grid[3, 3]",
+            "for i = 0 to 2",
+            "    for j = 0 to 2",
+            "        grid[i, j] = i * 3 + j",
+            "    next j",
+            "next i",
+            "total = 0",
+            "for i = 0 to 2",
+            "    row = grid[i]",
+            "    for j = 0 to row.length - 1",
+            "        total = total + row[j]",
+            "    next j",
+            "next i",
+            "print(total)",
+            "row = grid[1]",
+            "grid[1, 0] = 100",
+            "print(row)",
+            "row[1] = -1",
+            "print(grid[1])",
+            "print(row)",
+        ]
+        expected_output_lines = ['36', '[3, 4, 5]', '[100, 4, 5]', '[3, -1, 5]', '']
+        self.__test_print_output(lines, expected_output_lines)
+
     def test_while_loop(self):
         assign_count: int = 0
         while_loop_count: int = 0
@@ -1013,6 +1567,39 @@ class TestAstExecutor(TestCase):
         ]
         self.__test_print_output(lines, expected_output_lines)
 
+    def test_numeric_casts_and_operators(self):
+        lines = [
+            'print(int(7.9), int(-7.9), int(3), int("42"), float(2), float(2.5), float("1e3"))',
+            'x = 4',
+            'print(-x, -(-2.5), -x * 2)',
+            'print(1 == 1.0, 1 != "1", true == true, 2 == 2.0 != "2")',
+            'array a[1]',
+            'print(a[0] == a[0], 1 != a[0], 2 < 3 <= 3)',
+        ]
+        expected_output_lines = [
+            '7, -7, 3, 42, 2.0, 2.5, 1000.0',
+            '-4, 2.5, -8',
+            'True, True, True, True',
+            'True, True, True',
+            ''
+        ]
+        self.__test_print_output(lines, expected_output_lines)
+
+    def test_numeric_type_errors(self):
+        errors: dict[str, tuple[type, str]] = {
+            'x = int(true)': (ValueError, "Cannot convert value 'True' of type '<class 'bool'>' to integer"),
+            'x = float("abc")': (ValueError, "Cannot convert string of value 'abc' to float"),
+            'x = -"abc"': (SyntaxError, "Non-number value 'abc' cannot be negated"),
+            'x = -true': (SyntaxError, "Non-number value 'True' cannot be negated"),
+            'x = 1 < "2"': (SyntaxError, "Invalid type for '<': '<class 'int'>', '<class 'str'>'"),
+            'x = true + 1': (SyntaxError, "Invalid type for '+': '<class 'bool'>', '<class 'int'>'"),
+        }
+        for line, (error_type, message) in errors.items():
+            self.__init_executor([line], None)
+            with self.assertRaises(error_type) as ctx:
+                self.__executor.execute()
+            self.assertEqual(message, str(ctx.exception))
+
     def test_str_functions(self):
         lines = [
             's = "This is a bigger string"',
@@ -1078,6 +1665,268 @@ class TestAstExecutor(TestCase):
         with patch("builtins.input", return_value="1"):
             self.__executor.execute()
 
+    def test_string_appended_to_itself(self):
+        lines = [
+            'procedure show(x:byRef)',
+            '    print(x.length)',
+            'endprocedure',
+            'class Log',
+            '    private text = ""',
+            '    public procedure add(line)',
+            '        text = text + line + ","',
+            '    endprocedure',
+            '    public function size()',
+            '        return text.length',
+            '    endfunction',
+            'endclass',
+            's = ""',
+            'log = new Log()',
+            'for i = 0 to 999',
+            '    s = s + str(i MOD 10)',
+            '    log.add("x")',
+            '    if i == 500 then',
+            '        print(s.length)',
+            '        t = s',
+            '    endif',
+            'next i',
+            't = t + "!"',
+            'print(s.substring(0, 12))',
+            'print(s.length)',
+            'print(t.length)',
+            'show(s)',
+            'print(log.size())',
+            's = s + s',
+            'print(s.length)',
+        ]
+        with patch.object(StrBuilder, "append", autospec=True, side_effect=StrBuilder.append) as append:
+            self.__test_print_output(lines, ["501", "012345678901", "1000", "502", "1000", "2000", "2000", ""])
+        self.assertGreater(append.call_count, 1000)
+
+    def test_substring_views(self):
+        lines = [
+            's = ""',
+            'for i = 0 to 999',
+            '    s = s + str(i MOD 10)',
+            'next i',
+            'digits = 0',
+            'rest = s',
+            'while rest.length > 1',
+            '    if rest.substring(0, 1) == "7" then',
+            '        digits = digits + 1',
+            '    endif',
+            '    rest = rest.substring(1, rest.length - 1)',
+            '    if rest.length == 600 then',
+            '        middle = rest',
+            '        tail = rest.substring(590, 100) + "!"',
+            '    endif',
+            'endwhile',
+            'print(digits)',
+            'print(rest.length)',
+            'print(middle.substring(0, 5))',
+            'print(middle.length)',
+            'print(tail)',
+            'middle = middle + "x"',
+            'print(middle.substring(598, 3))',
+            'print(middle.substring(600, 1))',
+        ]
+        with patch.object(StrView, "view", autospec=True, side_effect=StrView.view) as view:
+            self.__test_print_output(lines, ["100", "1", "01234", "600", "0123456789!", "89x", "x", ""])
+        self.assertGreater(view.call_count, 500)
+
+    def test_substring_of_view_out_of_range(self):
+        lines = [
+            's = ""',
+            'for i = 0 to 999',
+            '    s = s + "a"',
+            'next i',
+            's = s.substring(500, 500)',
+            'x = s.substring(500, 1)',
+        ]
+        self.__init_executor(lines, None)
+        with self.assertRaises(SyntaxError) as ctx:
+            self.__executor.execute()
+        self.assertEqual(f"Cannot find substring of '{'a' * 500}' starting from out-of-range index '500'", str(ctx.exception))
+
+    def test_append_non_string_to_long_string(self):
+        lines = [
+            's = ""',
+            'for i = 1 to 300',
+            '    s = s + "a" + str(i)',
+            'next i',
+            's = s + "b" + 1',
+        ]
+        self.__init_executor(lines, None)
+        with self.assertRaises(SyntaxError) as ctx:
+            self.__executor.execute()
+        self.assertEqual("Invalid type for '+': '<class 'str'>', '<class 'int'>'", str(ctx.exception))
+
+    def test_output_flushed_before_input(self):
+        lines = [
+            'print("first")',
+            'name = input("Name? ")',
+            'print("hello " + name)',
+        ]
+        buffer = StringIO()
+        output_on_input: list[str] = []
+
+        def fake_input(msg: str) -> str:
+            output_on_input.append(buffer.getvalue())
+            return "erl"
+
+        for flush_policy, expected_on_input in ((FlushPolicy.ON_INPUT, "first\n"), (FlushPolicy.LINE, "first\n"), (FlushPolicy.ON_EXIT, "")):
+            buffer.seek(0)
+            buffer.truncate(0)
+            output_on_input.clear()
+            executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), output_stream=buffer, flush_policy=flush_policy)
+            with patch("builtins.input", side_effect=fake_input):
+                executor.execute()
+            self.assertEqual([expected_on_input], output_on_input)
+            self.assertEqual("first\nhello erl\n", buffer.getvalue())
+
+    def test_input_provider(self):
+        lines = [
+            'print("start")',
+            'total = 0',
+            'for i = 1 to 3',
+            '    total = total + int(input("Number " + str(i) + ": "))',
+            'next i',
+            'print(total)',
+        ]
+        buffer = StringIO()
+        executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), output_stream=buffer, input_provider=ListInputProvider(["1", "20", "300"]))
+        with patch("builtins.input", side_effect=AssertionError("console read")):
+            executor.execute()
+        self.assertEqual("start\nNumber 1: Number 2: Number 3: 321\n", buffer.getvalue())
+
+        buffer = StringIO()
+        prompts: list[str] = []
+        executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), output_stream=buffer,
+                               input_provider=CallableInputProvider(lambda prompt: prompts.append(prompt) or "5"))
+        executor.execute()
+        self.assertEqual("start\n15\n", buffer.getvalue())
+        self.assertEqual(["Number 1: ", "Number 2: ", "Number 3: "], prompts)
+
+    def test_input_provider_exhausted(self):
+        lines = [
+            'a = input("a? ")',
+            'b = input("b? ")',
+        ]
+        executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), output_stream=StringIO(), input_provider=ListInputProvider(["only"]))
+        with self.assertRaises(EOFError):
+            executor.execute()
+
+    def test_output_flushed_in_blocks(self):
+        lines = [
+            "for i = 1 to 1000",
+            "    print(i)",
+            "next i",
+        ]
+        writes: list[str] = []
+
+        class RecordingStream(StringIO):
+            def write(self, s: str) -> int:
+                writes.append(s)
+                return super().write(s)
+
+        buffer = RecordingStream()
+        executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), output_stream=buffer, output_buffer_size=1024, flush_policy=FlushPolicy.BLOCK)
+        executor.execute()
+        self.assertEqual("".join(f"{i}\n" for i in range(1, 1001)), buffer.getvalue())
+        self.assertEqual(4, len(writes))
+        self.assertTrue(all(len(s) >= 1024 for s in writes[:-1]))
+
+    def test_output_flushed_during_long_loop(self):
+        #
+        # Output printed before a long loop is written out after the maximum latency, while the loop is still running rather than when the program exits
+        #
+        lines = [
+            'print("started")',
+            "i = 0",
+            "while i < 3",
+            "    i = i + 1",
+            "endwhile",
+            'print("finished")',
+        ]
+        written = threading.Event()
+        output_in_loop: list[str] = []
+
+        class NotifyingStream(StringIO):
+            def write(self, s: str) -> int:
+                result: int = super().write(s)
+                written.set()
+                return result
+
+        def wait_in_loop(node: Node, ctx: ExeCtx):
+            if isinstance(node, WhileLoop) and not output_in_loop:
+                written.wait(5)
+                output_in_loop.append(buffer.getvalue())
+
+        buffer = NotifyingStream()
+        executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), pre_callback=wait_in_loop, output_stream=buffer, output_max_latency=0.05)
+        executor.execute()
+        self.assertEqual(["started\n"], output_in_loop)
+        self.assertEqual("started\nfinished\n", buffer.getvalue())
+
+    def test_print_array_in_blocks(self):
+        lines = [
+            "array a[100, 100]",
+            "for i = 0 to 99",
+            "    for j = 0 to 99",
+            "        a[i, j] = i * j",
+            "    next j",
+            "next i",
+            'print(a[1, 2], a, "s")',
+        ]
+        writes: list[str] = []
+
+        class RecordingStream(StringIO):
+            def write(self, s: str) -> int:
+                writes.append(s)
+                return super().write(s)
+
+        buffer = RecordingStream()
+        executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), output_stream=buffer, output_buffer_size=1024, flush_policy=FlushPolicy.BLOCK)
+        executor.execute()
+        rows: str = ", ".join("[" + ", ".join(str(i * j) for j in range(100)) + "]" for i in range(100))
+        self.assertEqual(f"2, [{rows}], s\n", buffer.getvalue())
+        self.assertGreater(len(writes), 10)
+        self.assertTrue(all(len(s) < 2048 for s in writes))
+
+    def test_print_multidimensional_arrays(self):
+        #
+        # Every sub-array has all the remaining dimensions: arrays of 3 or more dimensions used to be printed with the later sub-arrays flattened,
+        # e.g. [[[null, null], [null, null]], [null, null, null, 'x']] for the first array below
+        #
+        lines = [
+            "array a[2, 2, 2]",
+            'a[1, 1, 1] = "x"',
+            "print(a)",
+            "array b[2, 1, 2, 1]",
+            "b[0, 0, 1, 0] = 1",
+            "b[1, 0, 0, 0] = 2",
+            "print(b)",
+        ]
+        expected_output_lines = [
+            "[[[null, null], [null, null]], [[null, null], [null, 'x']]]",
+            "[[[[null], [1]]], [[[2], [null]]]]",
+            "",
+        ]
+        self.__test_print_output(lines, expected_output_lines)
+
+    def test_output_flushed_before_error(self):
+        lines = [
+            'print("before")',
+            'x = 1 / 0',
+            'print("after")',
+        ]
+        buffer = StringIO()
+        output_on_error: list[str] = []
+        executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), output_stream=buffer, on_error=lambda e, nodes: output_on_error.append(buffer.getvalue()),
+                               flush_policy=FlushPolicy.ON_EXIT)
+        with self.assertRaises(ZeroDivisionError):
+            executor.execute()
+        self.assertEqual(["before\n"], output_on_error)
+
     def test_file_functions(self):
         file_path: str = "file.txt"
         lines = [
@@ -1111,6 +1960,68 @@ class TestAstExecutor(TestCase):
         self.__test_print_output(lines, expected_output_lines)
         os.remove(file_path)
 
+    def test_memory_mapped_file_reads(self):
+        file_path: str = "file.txt"
+        with open(file_path, "w") as f:
+            f.write("first line\nsecond line")
+        lines = [
+            f'file = openRead("{file_path}")',
+            'while NOT file.endOfFile()',
+            '    print(file.readLine())',
+            'endwhile',
+            'print(file.endOfFile())',
+            'file.close()',
+            f'unclosed = openRead("{file_path}")',
+        ]
+        buffer = StringIO()
+        executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), output_stream=buffer, memory_map_min_size=0)
+        executor.execute()
+        self.assertEqual("first line\n\nsecond line\nTrue\n", buffer.getvalue())
+        os.remove(file_path)
+
+    def test_file_passed_to_subroutines(self):
+        file_path: str = "file.txt"
+        lines = [
+            "procedure copyLine(src:byRef, dst:byRef)",
+            "    dst.writeLine(src.readLine() + \"!\")",
+            "endprocedure",
+            f'f = openWrite("{file_path}")',
+            'f.writeLine("a")',
+            'f.writeLine("b")',
+            'f.close()',
+            f'src = openRead("{file_path}")',
+            'dst = openWrite("copy.txt")',
+            'copyLine(src, dst)',
+            'copyLine(src, dst)',
+            'print(src.endOfFile())',
+            'src.close()',
+            'dst.close()',
+        ]
+        self.__test_print_output(lines, ["True", ""])
+        with open("copy.txt") as f:
+            self.assertEqual("a\n!\nb\n!\n", f.read())
+        os.remove(file_path)
+        os.remove("copy.txt")
+
+    def test_file_mode_errors(self):
+        file_path: str = "file.txt"
+        for statement, message in (("f.readLine()", "Cannot read from a file that was opened via openWrite()"),
+                                   ('g.writeLine("x")', "Cannot write to a file that was opened via openRead()"),
+                                   ("x = f.endOfFile()", "Cannot check for end-of-file in closed file stream"),
+                                   ("x.close()", "Cannot perform file close operation on non-file '1'")):
+            lines = [
+                f'f = openWrite("{file_path}")',
+                f'g = openRead("{file_path}")',
+                "x = 1",
+                "f.close()" if "endOfFile" in statement else "",
+                statement,
+            ]
+            self.__init_executor(lines, None)
+            with self.assertRaises(SyntaxError) as ctx:
+                self.__executor.execute()
+            self.assertEqual(message, str(ctx.exception))
+        os.remove(file_path)
+
     def test_class_simple(self):
         lines = [
             "class A",
@@ -1178,6 +2089,197 @@ class TestAstExecutor(TestCase):
         expected_output_lines = ["False", ""]
         self.__test_print_output(lines, expected_output_lines)
 
+    def test_instances_sharing_class_layout(self):
+        lines = [
+            "function next_id(n)",
+            "    print(\"id \" + str(n))",
+            "    return n + 1",
+            "endfunction",
+            "class A",
+            "    public count = 1",
+            "    public id = next_id(count)",
+            "    public label = \"a\"",
+            "    public procedure rename(l)",
+            "        label = l",
+            "        count = count + 1",
+            "    endprocedure",
+            "endclass",
+            "class B inherits A",
+            "    public extra",
+            "endclass",
+            "x = new B()",
+            "y = new B()",
+            "x.rename(\"x\")",
+            "print(x.label + \" \" + str(x.count) + \" \" + str(x.id))",
+            "print(y.label + \" \" + str(y.count) + \" \" + str(y.id))",
+        ]
+        expected_output_lines = [
+            "id 1",
+            "id 1",
+            "x 2 2",
+            "a 1 2",
+            ""
+        ]
+        self.__test_print_output(lines, expected_output_lines)
+
+    def test_methods_resolved_through_class_layout(self):
+        lines = [
+            "class A",
+            "    public function twice(n)",
+            "        return n * 2",
+            "    endfunction",
+            "    public val = twice(2)",
+            "    public function describe()",
+            "        return \"A \" + str(val)",
+            "    endfunction",
+            "endclass",
+            "class B inherits A",
+            "    public function describe()",
+            "        return \"B \" + super.describe()",
+            "    endfunction",
+            "endclass",
+            "a = new A()",
+            "b = new B()",
+            "print(a.describe())",
+            "print(b.describe())",
+        ]
+        objects: list[ObjSymTable] = []
+
+        def callback(node: Node, ctx: ExeCtx):
+            if node.line_index == len(lines) - 1 and not objects:
+                objects.extend(ctx.global_table.lookup_symbol(name).value for name in ("a", "b"))
+
+        buffer = StringIO()
+        self.__init_executor(lines, callback, buffer)
+        self.__executor.execute()
+        self.assertEqual("A 4\nB A 4\n", buffer.getvalue())
+        #
+        # Instances only hold their fields, the methods being shared by the layouts of their classes
+        #
+        a, b = objects
+        self.assertEqual(["val"], list(a.keys()))
+        self.assertEqual(["super"], list(b.keys()))
+        self.assertEqual(["val"], list(b.parent.keys()))
+        self.assertIs(a.methods, b.parent.methods)
+        self.assertEqual(["describe"], list(b.methods))
+
+    def test_field_initializers_only_see_methods_declared_before(self):
+        lines = [
+            "class A",
+            "    public val = twice(2)",
+            "    public function twice(n)",
+            "        return n * 2",
+            "    endfunction",
+            "endclass",
+            "a = new A()",
+        ]
+        self.__init_executor(lines, None)
+        with self.assertRaises(SyntaxError) as ctx:
+            self.__executor.execute()
+        self.assertEqual("Function or procedure 'twice' is not defined", str(ctx.exception))
+
+    def test_duplicate_class_member(self):
+        self.__init_executor(["class A", "    public x = 1", "    private x", "endclass", "a = new A()"], None)
+        with self.assertRaises(SyntaxError) as ctx:
+            self.__executor.execute()
+        self.assertEqual("Declaration of the attribute 'x' cannot appear more than once", str(ctx.exception))
+
+    def test_private_members_of_other_instance(self):
+        #
+        # Private members are accessible from the methods of any instance of the same class, but not from those of other classes
+        #
+        lines = [
+            "class A",
+            "    private secret = 1",
+            "    public function peek(other)",
+            "        return other.secret",
+            "    endfunction",
+            "endclass",
+            "class B",
+            "    private secret = 2",
+            "    public function peek(other)",
+            "        return other.secret",
+            "    endfunction",
+            "endclass",
+            "a = new A()",
+            "b = new A()",
+            "print(a.peek(b))",
+            "c = new B()",
+            "print(c.peek(a))",
+        ]
+        buffer = StringIO()
+        executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), output_stream=buffer)
+        with self.assertRaises(SyntaxError) as ctx:
+            executor.execute()
+        self.assertEqual("Cannot reference private field 'secret'", str(ctx.exception))
+        self.assertEqual("1\n", buffer.getvalue())
+
+    def test_debug_log_of_objects_referencing_themselves(self):
+        #
+        # Arrays and objects are logged by their type, so that objects referencing themselves can be used while debug logging is enabled
+        #
+        lines = [
+            "class Item",
+            "    public link",
+            "endclass",
+            "a = new Item()",
+            "b = new Item()",
+            "a.link = b",
+            "b.link = a",
+            "c = a",
+            "print(c.link.link == a)",
+        ]
+        buffer = StringIO()
+        executor = AstExecutor(Parser(Lexer(Tokenizer(), lines)), output_stream=buffer)
+        with self.assertLogs(level="DEBUG") as logs:
+            executor.execute()
+        self.assertEqual("True\n", buffer.getvalue())
+        self.assertTrue(any(record.getMessage().endswith(": <ObjRef>.") for record in logs.records))
+
+    def test_short_lived_objects_reclaimed(self):
+        #
+        # Objects are only kept while referenced, whether they are created in a loop or inside functions.
+        # Objects referencing each other are reclaimed when the cycle is collected, so the size of the heap stays bounded by a constant
+        # that does not depend on the number of objects allocated
+        #
+        max_live_objects: int = 0
+        heap: Optional[ObjectHeap] = None
+
+        def callback(node: Node, ctx: ExeCtx):
+            nonlocal max_live_objects, heap
+            if isinstance(node, VarAssign):
+                heap = ctx.object_heap
+                max_live_objects = max(max_live_objects, len(heap))
+
+        lines = [
+            "class Item",
+            "    public link",
+            "    public val = 0",
+            "endclass",
+            "function make_pair(v)",
+            "    a = new Item()",
+            "    b = new Item()",
+            "    a.link = b",
+            "    b.link = a",
+            "    a.val = v",
+            "    return a",
+            "endfunction",
+            "kept = new Item()",
+            "for i = 1 to 20000",
+            "    tmp = new Item()",
+            "    tmp.val = i",
+            "    pair = make_pair(i)",
+            "    total = tmp.val + pair.link.link.val",
+            "next i",
+            "kept.val = total",
+        ]
+        self.__init_executor(lines, callback)
+        self.__executor.execute()
+        self.assertEqual(1 + 20000 * 3, heap.allocated_count)
+        self.assertLess(max_live_objects, 1000)
+        gc.collect()
+        self.assertEqual(0, len(heap))
+
     def test_instantiate_in_return(self):
         lines = [
             "class A",
@@ -0,0 +1,105 @@
+import os
+from io import IOBase
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from erl_file import ErlFile, MappedErlFile
+
+
+class TestErlFile(TestCase):
+
+    def setUp(self):
+        self.__dir = TemporaryDirectory()
+        self.__path: str = os.path.join(self.__dir.name, "file.txt")
+
+    def tearDown(self):
+        self.__dir.cleanup()
+
+    def test_write_then_read(self):
+        file = ErlFile.open_write(self.__path)
+        self.assertIsInstance(file, IOBase)
+        self.assertTrue(file.for_writing)
+        self.assertTrue(file.writable())
+        self.assertFalse(file.readable())
+        file.write_line("first")
+        file.write_line("")
+        file.write_line("third")
+        self.assertTrue(file.at_end())
+        file.close()
+        self.assertTrue(file.closed)
+
+        file = ErlFile.open_read(self.__path)
+        self.assertFalse(file.for_writing)
+        self.assertTrue(file.readable())
+        lines: list[str] = []
+        while not file.at_end():
+            lines.append(file.read_line())
+        self.assertEqual(["first\n", "\n", "third\n"], lines)
+        self.assertEqual("", file.read_line())
+        file.close()
+        file.close()
+        self.assertTrue(file.closed)
+
+    def test_lines_longer_than_buffer(self):
+        line: str = "x" * (ErlFile.BUFFER_SIZE + 10)
+        with open(self.__path, "w") as f:
+            f.write(f"{line}\nlast")
+        file = ErlFile.open_read(self.__path)
+        self.assertEqual(line + "\n", file.read_line())
+        self.assertFalse(file.at_end())
+        self.assertEqual("last", file.read_line())
+        self.assertTrue(file.at_end())
+        file.close()
+
+    def test_end_of_file_does_not_consume_lines(self):
+        with open(self.__path, "w") as f:
+            f.write("a\nb")
+        file = ErlFile.open_read(self.__path)
+        self.assertFalse(file.at_end())
+        self.assertFalse(file.at_end())
+        self.assertEqual("a\n", file.read_line())
+        self.assertEqual("b", file.read_line())
+        self.assertTrue(file.at_end())
+        self.assertTrue(file.at_end())
+        self.assertEqual("", file.read_line())
+        self.assertEqual("", file.read_line())
+        file.close()
+
+        file = ErlFile.open_read(self.__path)
+        self.assertEqual("a\n", file.read_line())
+        self.assertFalse(file.at_end())
+        self.assertEqual("b", file.read_line())
+        self.assertTrue(file.at_end())
+        file.close()
+
+    def test_empty_file(self):
+        file = ErlFile.open_write(self.__path)
+        self.assertTrue(file.at_end())
+        file.close()
+        file = ErlFile.open_read(self.__path)
+        self.assertTrue(file.at_end())
+        self.assertEqual("", file.read_line())
+        file.close()
+
+    def test_memory_mapped_reads_match_text_mode(self):
+        contents: list[str] = ["", "a", "a\n", "a\nb", "a\n\nb\n", "a\r\nb\r\n", "a\rb\r", "a\r", "\r\n\r", "héllo\nwörld ✓\n", "x" * 100000 + "\ny"]
+        for content in contents:
+            with open(self.__path, "w", newline="") as f:
+                f.write(content)
+            results: list[list[str]] = []
+            for memory_mapped in (False, True):
+                file = ErlFile.open_read(self.__path, memory_mapped)
+                self.assertIs(memory_mapped, isinstance(file, MappedErlFile))
+                self.assertFalse(file.for_writing)
+                lines: list[str] = []
+                while not file.at_end():
+                    lines.append(file.read_line())
+                lines.append(file.read_line())
+                file.close()
+                self.assertTrue(file.closed)
+                results.append(lines)
+            self.assertEqual(results[0], results[1], repr(content))
+
+    def test_open_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            ErlFile.open_read(os.path.join(self.__dir.name, "missing.txt"))
@@ -0,0 +1,58 @@
+import os
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from input_provider import InputProvider, StdinInputProvider, ListInputProvider, FileInputProvider, CallableInputProvider
+
+
+class TestInputProvider(TestCase):
+
+    def test_stdin_input(self):
+        provider = StdinInputProvider()
+        self.assertFalse(provider.echo_prompt)
+        with patch("builtins.input", return_value="typed") as mock_input:
+            self.assertEqual("typed", provider.read_line("Prompt: "))
+        mock_input.assert_called_once_with("Prompt: ")
+
+    def test_list_input(self):
+        provider = ListInputProvider(["a", "", "c"])
+        self.assertTrue(provider.echo_prompt)
+        self.assertEqual(["a", "", "c"], [provider.read_line("?") for _ in range(3)])
+        with self.assertRaises(EOFError):
+            provider.read_line("?")
+
+    def test_file_input(self):
+        with TemporaryDirectory() as work_dir:
+            path: str = os.path.join(work_dir, "inputs.txt")
+            with open(path, "w") as f:
+                f.write("first\n\nlast")
+            with FileInputProvider(path) as provider:
+                self.assertTrue(provider.echo_prompt)
+                self.assertEqual(["first", "", "last"], [provider.read_line("?") for _ in range(3)])
+                with self.assertRaises(EOFError):
+                    provider.read_line("?")
+
+    def test_stream_input_not_closed(self):
+        stream = StringIO("1\n2\n")
+        with FileInputProvider(stream) as provider:
+            self.assertEqual("1", provider.read_line("?"))
+        self.assertFalse(stream.closed)
+        self.assertEqual("2\n", stream.readline())
+
+    def test_callable_input(self):
+        prompts: list[str] = []
+        provider = CallableInputProvider(lambda prompt: prompts.append(prompt) or prompt.upper())
+        self.assertFalse(provider.echo_prompt)
+        self.assertEqual("X? ", provider.read_line("x? "))
+        self.assertEqual(["x? "], prompts)
+
+    def test_read_line_required(self):
+        class NoReadLineInputProvider(InputProvider):
+            pass
+
+        with self.assertRaises(TypeError):
+            NoReadLineInputProvider()
+        with self.assertRaises(TypeError):
+            InputProvider()
@@ -0,0 +1,53 @@
+import logging
+import os
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch, call
+
+from erl_file import ErlFile
+from interpreter import Interpreter
+
+
+class TestInterpreter(TestCase):
+
+    def setUp(self):
+        #
+        # The interpreter logs to a file in the working directory, which is made a temporary directory
+        #
+        self.__dir = TemporaryDirectory()
+        self.__prev_cwd: str = os.getcwd()
+        os.chdir(self.__dir.name)
+        root: logging.Logger = logging.getLogger()
+        self.__prev_handlers: list[logging.Handler] = list(root.handlers)
+        self.__prev_level: int = root.level
+
+    def tearDown(self):
+        root: logging.Logger = logging.getLogger()
+        for handler in root.handlers:
+            if handler not in self.__prev_handlers:
+                root.removeHandler(handler)
+                handler.close()
+        root.setLevel(self.__prev_level)
+        os.chdir(self.__prev_cwd)
+        self.__dir.cleanup()
+
+    def test_large_files_memory_mapped(self):
+        with open("small.txt", "w") as f:
+            f.write("small\n")
+        with open("large.txt", "w") as f:
+            f.write("large\n" + "x" * 100)
+        lines = [
+            'small = openRead("small.txt")',
+            'large = openRead("large.txt")',
+            'print(small.readLine(), large.readLine())',
+            'small.close()',
+            'large.close()',
+        ]
+        stdout = StringIO()
+        with patch.object(Interpreter, "MEMORY_MAP_MIN_SIZE", 64), patch.object(ErlFile, "open_read", wraps=ErlFile.open_read) as open_read, \
+                patch("sys.stdout", stdout):
+            Interpreter(lines).interpret()
+        self.assertEqual([call("small.txt", False), call("large.txt", True)], open_read.call_args_list)
+        self.assertEqual("small\n, large\n\n", stdout.getvalue())
+
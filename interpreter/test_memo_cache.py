@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+from memo_cache import MemoCache
+
+
+class TestMemoCache(TestCase):
+
+    def test_get_and_put(self):
+        cache = MemoCache(4)
+        self.assertIsNone(cache.get(("f", 1)))
+        cache.put(("f", 1), 10)
+        self.assertEqual(10, cache.get(("f", 1)))
+        self.assertEqual(0, cache.get(("f", 2)) if ("f", 2) in cache else 0)
+        cache.put(("f", 2), 0)
+        self.assertEqual(0, cache.get(("f", 2)))
+        self.assertEqual(2, len(cache))
+        self.assertEqual(2, cache.hits)
+        self.assertEqual(1, cache.misses)
+        self.assertAlmostEqual(2 / 3, cache.hit_rate)
+
+    def test_least_recently_used_evicted(self):
+        cache = MemoCache(2)
+        cache.put(1, "a")
+        cache.put(2, "b")
+        cache.get(1)
+        cache.put(3, "c")
+        self.assertIn(1, cache)
+        self.assertNotIn(2, cache)
+        self.assertIn(3, cache)
+        self.assertEqual(1, cache.evictions)
+        self.assertEqual(2, len(cache))
+
+    def test_clear(self):
+        cache = MemoCache(2)
+        self.assertEqual(0.0, cache.hit_rate)
+        cache.put(1, "a")
+        cache.get(1)
+        cache.get(2)
+        cache.clear()
+        self.assertEqual(0, len(cache))
+        self.assertEqual((0, 0, 0), (cache.hits, cache.misses, cache.evictions))
+        self.assertEqual("0/2 results cached, 0 hit(s), 0 miss(es), 0 eviction(s), hit rate 0.0%", str(cache))
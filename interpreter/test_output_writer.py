@@ -0,0 +1,139 @@
+import threading
+from io import StringIO
+from unittest import TestCase
+from unittest.mock import patch
+
+from output_writer import OutputWriter, FlushPolicy
+
+
+class CountingStream(StringIO):
+    """StringIO counting how many times it is written to."""
+
+    def __init__(self):
+        super().__init__()
+        self.writes: int = 0
+
+    def write(self, s: str) -> int:
+        self.writes += 1
+        return super().write(s)
+
+
+class TestOutputWriter(TestCase):
+
+    def test_line_policy(self):
+        stream = CountingStream()
+        writer = OutputWriter(stream, flush_policy=FlushPolicy.LINE)
+        writer.write_line("a")
+        self.assertEqual("a\n", stream.getvalue())
+        writer.write_line("b")
+        self.assertEqual("a\nb\n", stream.getvalue())
+        self.assertEqual(2, stream.writes)
+        self.assertEqual(0, writer.buffered_size)
+
+    def test_block_policy(self):
+        stream = CountingStream()
+        writer = OutputWriter(stream, buffer_size=10, flush_policy=FlushPolicy.BLOCK)
+        writer.write_line("1234")
+        writer.write_line("")
+        self.assertEqual("", stream.getvalue())
+        self.assertEqual(6, writer.buffered_size)
+        writer.before_input()
+        self.assertEqual("", stream.getvalue())
+        writer.write_line("abc")
+        self.assertEqual("1234\n\nabc\n", stream.getvalue())
+        self.assertEqual(1, stream.writes)
+        writer.write_line("rest")
+        writer.flush()
+        self.assertEqual("1234\n\nabc\nrest\n", stream.getvalue())
+        self.assertEqual(2, stream.writes)
+
+    def test_on_input_policy(self):
+        stream = CountingStream()
+        writer = OutputWriter(stream, buffer_size=10, flush_policy=FlushPolicy.ON_INPUT)
+        writer.write_line("prompt")
+        self.assertEqual("", stream.getvalue())
+        writer.before_input()
+        self.assertEqual("prompt\n", stream.getvalue())
+        writer.write_line("0123456789")
+        self.assertEqual("prompt\n0123456789\n", stream.getvalue())
+        self.assertEqual(2, stream.writes)
+
+    def test_on_exit_policy(self):
+        stream = CountingStream()
+        writer = OutputWriter(stream, buffer_size=4, flush_policy=FlushPolicy.ON_EXIT)
+        for i in range(100):
+            writer.write_line(str(i))
+        writer.before_input()
+        self.assertEqual(0, stream.writes)
+        writer.flush()
+        self.assertEqual("".join(f"{i}\n" for i in range(100)), stream.getvalue())
+        self.assertEqual(1, stream.writes)
+        writer.flush()
+        self.assertEqual(1, stream.writes)
+
+    def test_write_without_newline(self):
+        stream = CountingStream()
+        writer = OutputWriter(stream, buffer_size=10, flush_policy=FlushPolicy.LINE)
+        writer.write("Name? ")
+        self.assertEqual(6, writer.buffered_size)
+        writer.write_line("done")
+        self.assertEqual("Name? done\n", stream.getvalue())
+        writer = OutputWriter(stream, buffer_size=10, flush_policy=FlushPolicy.BLOCK)
+        writer.write("0123456789")
+        self.assertEqual("Name? done\n0123456789", stream.getvalue())
+
+    def test_write_parts(self):
+        stream = CountingStream()
+        writer = OutputWriter(stream, buffer_size=10, flush_policy=FlushPolicy.ON_INPUT)
+        writer.write_parts(["[1, 2", ", 3]"])
+        self.assertEqual(9, writer.buffered_size)
+        writer.write_parts(iter(["[4]", "[5]"]))
+        self.assertEqual("[1, 2, 3][4]", stream.getvalue())
+        self.assertEqual(3, writer.buffered_size)
+        writer = OutputWriter(stream, buffer_size=10, flush_policy=FlushPolicy.LINE)
+        writer.write_parts("0123456789" for _ in range(3))
+        self.assertEqual(30, writer.buffered_size)
+        writer.write_line("")
+        self.assertEqual("[1, 2, 3][4]" + "0123456789" * 3 + "\n", stream.getvalue())
+
+    def test_max_latency(self):
+        written = threading.Event()
+
+        class NotifyingStream(CountingStream):
+            def write(self, s: str) -> int:
+                written.set()
+                return super().write(s)
+
+        stream = NotifyingStream()
+        writer = OutputWriter(stream, buffer_size=1000, flush_policy=FlushPolicy.ON_EXIT, max_latency=0.05)
+        writer.write_line("a")
+        writer.write("b")
+        self.assertEqual("", stream.getvalue())
+        self.assertTrue(written.wait(5))
+        self.assertEqual("a\nb", stream.getvalue())
+        self.assertEqual(1, stream.writes)
+        self.assertEqual(0, writer.buffered_size)
+        #
+        # Output buffered after the timer fired is written out by a new timer
+        #
+        written.clear()
+        writer.write_parts(["c", "d"])
+        self.assertTrue(written.wait(5))
+        self.assertEqual("a\nbcd", stream.getvalue())
+        self.assertEqual(2, stream.writes)
+
+    def test_default_stream_resolved_when_flushing(self):
+        writer = OutputWriter()
+        writer.write_line("hello")
+        stdout = StringIO()
+        with patch("sys.stdout", stdout):
+            writer.flush()
+        self.assertEqual("hello\n", stdout.getvalue())
+
+    def test_illegal_buffer_size(self):
+        with self.assertRaises(AssertionError):
+            OutputWriter(StringIO(), buffer_size=0)
+
+    def test_illegal_max_latency(self):
+        with self.assertRaises(AssertionError):
+            OutputWriter(StringIO(), max_latency=0)
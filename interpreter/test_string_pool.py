@@ -0,0 +1,24 @@
+from unittest import TestCase
+
+from string_pool import StringPool, intern_name
+
+
+class TestStringPool(TestCase):
+
+    def test_intern_name(self):
+        name: str = "".join(["count", "er"])
+        self.assertIsNot("counter", name)
+        self.assertIs(intern_name("counter"), intern_name(name))
+        self.assertEqual("counter", intern_name(name))
+
+    def test_pooled(self):
+        pool = StringPool()
+        first: str = "".join(["hello", " world"])
+        second: str = "".join(["hello", " world"])
+        self.assertIsNot(first, second)
+        self.assertIs(first, pool.pooled(first))
+        self.assertIs(first, pool.pooled(second))
+        self.assertEqual("", pool.pooled(""))
+        self.assertEqual(2, len(pool))
+        self.assertIn("hello world", pool)
+        self.assertNotIn("hello", pool)
@@ -1,6 +1,9 @@
+import sys
+import tracemalloc
+from io import StringIO
 from unittest import TestCase
 
-from sym_table import SymTable, ArrayVal, SymAddr
+from sym_table import SymTable, ArrayVal, SymAddr, NullVal, NULL, LocalSymTable, SymRef, ClassLayout, ObjSymTable, ObjectHeap, ObjRef, StrBuilder, StrView
 
 
 class TestArrayVal(TestCase):
@@ -31,6 +34,111 @@ class TestArrayVal(TestCase):
         self.assertEqual(0, start)
         self.assertEqual(self.arr.size // self.arr.dims[0], size)
 
+    def test_strides(self):
+        self.assertEqual((3 * 4 * 5 * 6, 4 * 5 * 6, 5 * 6, 6, 1), self.arr.strides)
+        self.assertEqual((1,), ArrayVal([7]).strides)
+
+    def test_get_and_set_item(self):
+        self.__init_contiguous_arr()
+        self.assertEqual(self.arr.get_at([1, 2, 3, 4, 5]), self.arr.get_item(1, 2, 3, 4, 5))
+        self.assertEqual(self.arr.get_at([1, 2]), self.arr.get_item(1, 2))
+        self.assertEqual(-1, self.arr.set_item(-1, 1, 2, 3, 4, 5))
+        self.assertEqual(-1, self.arr.get_at([1, 2, 3, 4, 5]))
+        with self.assertRaises(IndexError) as ctx:
+            self.arr.get_item(0, 3)
+        self.assertEqual("Array index 3 is out of bounds, it must be between 0 and 2", str(ctx.exception))
+        with self.assertRaises(IndexError) as ctx:
+            self.arr.set_item(0, 1, 2)
+        self.assertEqual("Illegal indexing for value setting: [1, 2]", str(ctx.exception))
+        with self.assertRaises(IndexError):
+            self.arr.get_item()
+
+    def test_get_and_set_values(self):
+        arr = ArrayVal([20])
+        self.assertEqual([NullVal()] * 3, arr.get_values(0, 3))
+        arr.set_values(2, range(2, 18))
+        self.assertEqual('q', arr.typecode)
+        self.assertEqual(NullVal(), arr.get_at([1]))
+        self.assertEqual(list(range(5, 10)), list(arr.get_values(5, 10)))
+        self.assertEqual([NullVal(), 2, 3], arr.get_values(1, 4))
+        arr.set_values(0, [0, 1])
+        arr.set_values(18, arr.get_values(2, 4))
+        self.assertEqual(list(range(18)) + [2, 3], list(arr.get_values(0, 20)))
+        same_arr = ArrayVal([20])
+        same_arr.vals = list(range(18)) + [2, 3]
+        self.assertEqual(same_arr, arr)
+        #
+        # Values that cannot be stored in the typed array switch it to a list
+        #
+        arr.set_values(3, [1.5, "a"])
+        self.assertIsNone(arr.typecode)
+        self.assertEqual([2, 1.5, "a", 5], arr.get_values(2, 6))
+        arr.set_values(0, [2 ** 70])
+        self.assertEqual(2 ** 70, arr.get_at([0]))
+        with self.assertRaises(IndexError):
+            arr.set_values(19, [1, 2])
+        with self.assertRaises(IndexError):
+            arr.get_values(-1, 2)
+
+    def test_set_values_of_views(self):
+        arr = ArrayVal([3, 4])
+        arr.vals = list(range(12))
+        row = arr.get_item(1)
+        self.assertEqual([4, 5, 6, 7], list(row.get_values(0, 4)))
+        row.set_values(1, [0, 0])
+        self.assertEqual([4, 0, 0, 7], list(row.get_values(0, 4)))
+        self.assertEqual([4, 5, 6, 7], list(arr.get_values(4, 8)))
+        other_row = arr.get_item(2)
+        arr.set_values(8, [1.5] * 4)
+        self.assertEqual([8, 9, 10, 11], list(other_row.get_values(0, 4)))
+        self.assertEqual([1.5] * 4, list(arr.get_values(8, 12)))
+
+    def test_null_singleton(self):
+        self.assertIs(NULL, NullVal())
+        self.assertEqual(NULL, NullVal())
+        self.assertNotEqual(NULL, 0)
+        self.assertNotEqual(0, NULL)
+        arr = ArrayVal([4])
+        self.assertIs(NULL, arr.get_item(0))
+        arr.set_item(1, 1)
+        self.assertIs(NULL, arr.get_item(0))
+        arr.set_item("a", 2)
+        self.assertIs(NULL, arr.get_item(3))
+        arr.set_item(NullVal(), 1)
+        self.assertEqual([NULL, NULL, "a", NULL], list(arr))
+
+    def test_str_builder(self):
+        builder = StrBuilder("ab")
+        builder.append("c")
+        builder.append("")
+        builder.append("de")
+        self.assertEqual("abcde", builder.build())
+        self.assertEqual("abcde", str(builder))
+        builder.append("f")
+        self.assertEqual("abcdef", builder.build())
+        tbl = SymTable(init_symbols={"s": builder})
+        self.assertEqual("abcdef", tbl.addr_of("s").value)
+        self.assertEqual("abcdef", SymRef(SymTable(tbl), "r", tbl.addr_of("s")).value)
+        tbl.close()
+
+    def test_str_view(self):
+        base: str = "0123456789abcdef"
+        view = StrView(base, 3, 10)
+        self.assertEqual("3456789abc", view.build())
+        self.assertIs(view.build(), view.build())
+        self.assertEqual("3456789abc", str(view))
+        for start in range(10):
+            for length in range(-2, 14):
+                expected: str = base[3:13][start:start + length]
+                self.assertEqual(expected, view.substring(start, length))
+                sub_view: StrView = view.view(start, length)
+                self.assertIs(base, sub_view.base)
+                self.assertEqual(expected, sub_view.build())
+                self.assertEqual(len(expected), sub_view.length)
+        tbl = SymTable(init_symbols={"s": view})
+        self.assertEqual("3456789abc", tbl.addr_of("s").value)
+        tbl.close()
+
     def test_get_value_at(self):
         self.__init_contiguous_arr()
         #
@@ -67,6 +175,148 @@ class TestArrayVal(TestCase):
         self.__init_contiguous_arr()
         self.assertListEqual([i for i in range(0, self.arr.size)], self.arr.vals)
 
+    def test_typed_storage(self):
+        arr = ArrayVal([3, 4])
+        self.assertIsNone(arr.typecode)
+        self.assertEqual(NullVal(), arr.get_at([2, 3]))
+        arr.set_at([0, 1], 5)
+        self.assertEqual('q', arr.typecode)
+        self.assertEqual(5, arr.get_at([0, 1]))
+        self.assertEqual(NullVal(), arr.get_at([0, 0]))
+        self.assertEqual("[[null, 5, null, null], [null, null, null, null], [null, null, null, null]]", str(arr))
+        arr.set_at([0, 1], NullVal())
+        self.assertEqual(NullVal(), arr.get_at([0, 1]))
+        self.assertEqual('q', arr.typecode)
+        floats = ArrayVal([2])
+        floats.set_at([1], 0.5)
+        self.assertEqual('d', floats.typecode)
+        self.assertEqual([NullVal(), 0.5], floats.vals)
+
+    def test_typed_storage_fallback(self):
+        for first, second in [(1, 1.5), (1.5, 1), (1, True), (1, 's'), (1, 2 ** 64)]:
+            arr = ArrayVal([2, 2])
+            arr.set_at([0, 0], first)
+            arr.set_at([1, 1], second)
+            self.assertIsNone(arr.typecode)
+            self.assertEqual([first, NullVal(), NullVal(), second], arr.vals)
+            self.assertIs(type(second), type(arr.get_at([1, 1])))
+        arr = ArrayVal([2])
+        arr.set_at([0], 's')
+        arr.set_at([1], 1)
+        self.assertIsNone(arr.typecode)
+        self.assertEqual(['s', 1], arr.vals)
+
+    def test_typed_sub_arr_and_equality(self):
+        arr = ArrayVal([3, 5])
+        other = ArrayVal([3, 5])
+        for i in range(3):
+            for j in range(5):
+                if (i + j) % 2:
+                    arr.set_at([i, j], i * j)
+                    other.set_at([i, j], i * j)
+        self.assertEqual(arr, other)
+        sub_arr: ArrayVal = arr.get_at([1])
+        self.assertEqual('q', sub_arr.typecode)
+        self.assertEqual("[0, null, 2, null, 4]", str(sub_arr))
+        sub_arr.set_at([1], 7)
+        self.assertEqual(NullVal(), arr.get_at([1, 1]))
+        other.set_at([1, 0], NullVal())
+        self.assertNotEqual(arr, other)
+        arr.set_at([1, 0], NullVal())
+        self.assertEqual(arr, other)
+        other.set_at([2, 1], 3)
+        self.assertNotEqual(arr, other)
+        other.vals
+        self.assertIsNone(other.typecode)
+        other.set_at([2, 1], 2)
+        self.assertEqual(arr, other)
+
+    def test_sub_arr_views(self):
+        self.__init_contiguous_arr()
+        sub_arr: ArrayVal = self.arr.get_at([1, 2])
+        self.assertTrue(sub_arr.is_view)
+        self.assertEqual([4, 5, 6], sub_arr.dims)
+        self.assertEqual(4, sub_arr.length)
+        row: ArrayVal = sub_arr.get_at([3, 4])
+        self.assertTrue(row.is_view)
+        self.assertEqual(self.arr.get_at([1, 2, 3, 4]), row)
+        self.assertEqual(str(self.arr.get_at([1, 2, 3, 4])), str(row))
+        start, size = self.arr.get_slice([1, 2, 3, 4])
+        self.assertEqual(start + 2, row.get_at([2]))
+        #
+        # Writing to a view gives it its own copy of the values
+        #
+        row.set_at([2], -1)
+        self.assertFalse(row.is_view)
+        self.assertEqual(-1, row.get_at([2]))
+        self.assertEqual(start + 2, self.arr.get_at([1, 2, 3, 4, 2]))
+        self.assertTrue(sub_arr.is_view)
+        #
+        # Writing to the array gives its views their own copy of the values
+        #
+        self.arr.set_at([1, 2, 0, 0, 0], -2)
+        self.assertFalse(sub_arr.is_view)
+        self.assertEqual(start - 3 * 5 * 6 - 4 * 6, sub_arr.get_at([0, 0, 0]))
+        self.assertEqual(-2, self.arr.get_at([1, 2, 0, 0, 0]))
+
+    def test_iterate_views_of_list_storage(self):
+        arr = ArrayVal([2, 100000])
+        arr.set_at([1, 99999], "s")
+        self.assertIsNone(arr.typecode)
+        row: ArrayVal = arr.get_at([1])
+        self.assertTrue(row.is_view)
+        self.assertEqual([NullVal()] * 99999 + ["s"], list(row))
+        #
+        # Iterating a view allocates no copy of its values
+        #
+        tracemalloc.start()
+        try:
+            for _ in row:
+                pass
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, 10000)
+
+    def test_typed_sub_arr_views(self):
+        arr = ArrayVal([3, 2])
+        arr.set_at([1, 1], 1.5)
+        row: ArrayVal = arr.get_at([1])
+        self.assertEqual('d', row.typecode)
+        self.assertEqual([NullVal(), 1.5], list(row))
+        arr.set_at([1, 0], 's')
+        self.assertIsNone(arr.typecode)
+        self.assertEqual('d', row.typecode)
+        self.assertEqual("[null, 1.5]", str(row))
+        self.assertEqual("[[null, null], ['s', 1.5], [null, null]]", str(arr))
+
+    def test_render_matches_nested_lists(self):
+        for dims in ([1], [5], [1, 1], [3, 1], [1, 4], [2, 3, 4], [2, 1, 3, 1], [2, 3, 4, 5, 6]):
+            arr = ArrayVal(list(dims))
+            self.assertEqual(TestArrayVal.__stringify(list(arr), list(dims)), str(arr))
+            for pos in range(0, arr.size, 2):
+                arr.set_values(pos, [pos])
+            self.assertEqual(TestArrayVal.__stringify(list(arr), list(dims)), str(arr))
+            arr.set_values(0, [0.5])
+            arr.set_values(arr.size - 1, ["s"])
+            self.assertEqual(TestArrayVal.__stringify(list(arr), list(dims)), str(arr))
+            if len(dims) > 1 and arr.strides[0] > 1:
+                sub_arr: ArrayVal = arr.get_at([dims[0] - 1])
+                self.assertEqual(TestArrayVal.__stringify(list(sub_arr), dims[1:]), "".join(sub_arr.render()))
+        self.__init_contiguous_arr()
+        self.assertEqual(TestArrayVal.__stringify(list(self.arr), list(self.arr.dims)), str(self.arr))
+        self.assertEqual(self.arr.size // self.arr.dims[-1], len(list(self.arr.render())))
+
+    @staticmethod
+    def __stringify(vals: list, dims: list[int]) -> str:
+        #
+        # Reference representation of arrays, made by splitting the values into nested lists
+        #
+        if len(dims) > 1:
+            slice_length: int = len(vals) // dims[0]
+            return '[' + ", ".join(TestArrayVal.__stringify(vals[i:i + slice_length], dims[1:]) for i in range(0, len(vals), slice_length)) + ']'
+        return '[' + ", ".join(f"'{val}'" if type(val) is str else str(val) for val in vals) + ']'
+
     def __init_contiguous_arr(self):
         v = 0
         for i in range(0, self.arr.dims[0]):
@@ -201,3 +451,181 @@ class TestSymTable(TestCase):
         self.assertIsNone(self.sym_table.lookup_symbol('x'))
         self.assertEqual(3, self.sym_table.lookup_symbol('x', 3))
         self.assertEqual(3, self.sym_table.lookup_symbol('x'))
+
+    def test_cached_lookup_invalidation(self):
+        self.sym_table.update_symbol('x', 1)
+        middle: SymTable = SymTable(SymTable(self.sym_table))
+        child: SymTable = SymTable(middle)
+        self.assertEqual((1, self.sym_table), child.lookup_symbol_with_table('x'))
+        self.assertEqual((1, self.sym_table), child.lookup_symbol_with_table('x'))
+        #
+        # Updating the value found keeps the lookup valid
+        #
+        self.sym_table.update_symbol('x', 2)
+        self.assertEqual(2, child.lookup_symbol('x'))
+        #
+        # Adding the symbol to a closer scope shadows it, removing it reveals it again
+        #
+        middle.parent.update_symbol('x', 3)
+        self.assertEqual((3, middle.parent), child.lookup_symbol_with_table('x'))
+        middle.parent.clear_symbol('x')
+        self.assertEqual((2, self.sym_table), child.lookup_symbol_with_table('x'))
+        self.sym_table.clear_symbol('x')
+        self.assertIsNone(child.lookup_symbol_with_table('x'))
+        #
+        # Symbols added while lookups fail are found
+        #
+        self.sym_table.lookup_symbol('y', 4)
+        self.assertEqual(4, child.lookup_symbol('y'))
+        #
+        # Closing a scope detaches its descendants from its ancestors
+        #
+        middle.parent.close()
+        self.assertIsNone(child.lookup_symbol('y'))
+
+    def test_local_sym_table(self):
+        self.sym_table.update_symbol('x', 1)
+        self.sym_table.update_symbol('y', 2)
+        local: LocalSymTable = LocalSymTable(self.sym_table)
+        local.bind('a', 3)
+        local.bind('b', None)
+        local.bind('y', SymAddr(self.sym_table, 'y'))
+        self.assertEqual({'a', 'y'}, set(local.keys()))
+        self.assertEqual(1, local.lookup_symbol('x'))
+        #
+        # byRef parameters alias the variable of the caller
+        #
+        ref: SymAddr = local.addr_of('y', may_be_ref=True)
+        self.assertIsInstance(ref, SymRef)
+        ref.value = 4
+        self.assertEqual(4, self.sym_table.lookup_symbol('y'))
+        #
+        # Files left open in the frame are closed with it
+        #
+        stream = StringIO()
+        local.update_symbol('f', stream)
+        local.close()
+        self.assertTrue(stream.closed)
+        self.assertIsNone(local.parent)
+
+    def test_symbols_keyed_by_interned_names(self):
+        name: str = "".join(["sym", "bol"])
+        self.sym_table.update_symbol(name, 1)
+        self.assertIs(sys.intern("symbol"), next(iter(self.sym_table)))
+        self.assertEqual(1, self.sym_table.lookup_symbol("symbol"))
+        layout: ClassLayout = ClassLayout("A", False)
+        layout.add_member("".join(["mem", "ber"]), 2, True)
+        self.assertIs(sys.intern("member"), next(iter(ObjSymTable(self.sym_table, layout))))
+
+    def test_obj_sym_table_layout(self):
+        parent_layout: ClassLayout = ClassLayout("A", False)
+        parent_layout.add_member("a", 1, True)
+        layout: ClassLayout = ClassLayout("B", True)
+        layout.add_member("b", NullVal(), False)
+        layout.add_member("c", "expr", True, needs_evaluation=True)
+        layout.add_member("d", 2, True)
+        with self.assertRaises(SyntaxError):
+            layout.add_member("b", 3, True)
+        self.assertEqual({"b": NullVal()}, layout.template)
+        self.assertEqual([("c", "expr", True, {}), ("d", 2, False, {})], layout.initializers)
+        self.assertEqual(frozenset({"super", "c", "d"}), layout.public_names)
+        parent: ObjSymTable = ObjSymTable(self.sym_table, parent_layout)
+        obj: ObjSymTable = ObjSymTable(parent, layout)
+        other: ObjSymTable = ObjSymTable(parent, layout)
+        self.assertEqual(["super", "b"], list(obj.keys()))
+        self.assertIs(layout.public_names, other.public_symbols)
+        obj.update_symbol("b", 4)
+        self.assertEqual(NullVal(), other.lookup_symbol("b"))
+        self.assertEqual((1, parent), obj.lookup_symbol_with_table("a"))
+        self.assertFalse(obj.is_symbol_public("b"))
+
+    def test_obj_sym_table_methods(self):
+        layout: ClassLayout = ClassLayout("A", False)
+        layout.add_member("f", "f_decl", True, is_method=True)
+        layout.add_member("a", 1, True)
+        layout.add_member("b", "expr", True, needs_evaluation=True)
+        layout.add_member("g", "g_decl", False, is_method=True)
+        layout.add_member("c", "expr", True, needs_evaluation=True)
+        layout.add_member("d", 2, True)
+        self.assertEqual({"a": 1}, layout.template)
+        self.assertEqual({"f": "f_decl", "g": "g_decl"}, layout.methods)
+        self.assertEqual(["f", "a", "b", "g", "c", "d"], layout.member_names)
+        self.assertEqual([{"f": "f_decl"}, layout.methods, layout.methods], [methods for *_, methods in layout.initializers])
+        self.assertIs(layout.initializers[1][3], layout.initializers[2][3])
+        #
+        # Methods are resolved through the layout rather than stored in each instance
+        #
+        obj: ObjSymTable = ObjSymTable(self.sym_table, layout)
+        for name, val, _, _ in layout.initializers:
+            obj.update_symbol(name, val)
+        self.assertEqual(["a", "b", "c", "d"], list(obj.keys()))
+        self.assertIn("g", obj)
+        self.assertEqual("f_decl", obj["f"])
+        self.assertEqual("g_decl", obj.lookup_symbol("g"))
+        self.assertEqual(("g_decl", obj), LocalSymTable(obj).lookup_symbol_with_table("g"))
+        self.assertIsNone(obj.get("h"))
+        self.assertEqual([("f", "f_decl"), ("a", 1), ("b", "expr"), ("g", "g_decl"), ("c", "expr"), ("d", 2)], list(obj.get_fields()))
+        #
+        # A field hides the method of the same name for its instance only
+        #
+        obj.update_symbol("f", 3)
+        obj.update_symbol("e", 4)
+        self.assertEqual(3, obj.lookup_symbol("f"))
+        self.assertEqual("f_decl", ObjSymTable(self.sym_table, layout).lookup_symbol("f"))
+        self.assertEqual([("f", 3), ("a", 1), ("b", "expr"), ("g", "g_decl"), ("c", "expr"), ("d", 2), ("e", 4)], list(obj.get_fields()))
+
+    def test_render_object(self):
+        parent_layout: ClassLayout = ClassLayout("A", False)
+        parent_layout.add_member("a", "x", True)
+        layout: ClassLayout = ClassLayout("B", True)
+        layout.add_member("b", NullVal(), False)
+        obj: ObjSymTable = ObjSymTable(ObjSymTable(self.sym_table, parent_layout), layout)
+        arr: ArrayVal = ArrayVal([2, 2])
+        arr.set_values(0, [1, 2, 3])
+        obj.update_symbol("b", arr)
+        expected: str = "<Instance of 'B': {super: <Instance of 'A': {a: x}>, b: [[1, 2], [3, null]], a: x}>"
+        self.assertEqual(expected, str(obj))
+        self.assertEqual(["<Instance of 'B': {", "super: ", "<Instance of 'A': {", "a: ", "x", "}>", ", b: ", "[[1, 2]", ", [3, null]]", ", a: ", "x", "}>"],
+                         list(obj.render()))
+        ref: ObjRef = ObjectHeap().allocate(obj)
+        self.assertEqual(f"Address to '_._B_1_._' of value {expected}", str(ref))
+        self.assertEqual(" of null value", str(SymAddr(self.sym_table, "missing")))
+
+    def test_render_object_referencing_itself(self):
+        layout: ClassLayout = ClassLayout("C", True)
+        layout.add_member("link", NullVal(), True)
+        heap: ObjectHeap = ObjectHeap()
+        a: ObjRef = heap.allocate(ObjSymTable(self.sym_table, layout))
+        b: ObjRef = heap.allocate(ObjSymTable(self.sym_table, layout))
+        a.value.update_symbol("link", b)
+        b.value.update_symbol("link", a)
+        with self.assertRaises(RecursionError):
+            str(a)
+        b.value.update_symbol("link", NullVal())
+        self.assertEqual("<Instance of 'C': {link: Address to '_._C_2_._' of value <Instance of 'C': {link: null}>}>", str(a.value))
+
+    def test_object_heap(self):
+        heap: ObjectHeap = ObjectHeap()
+        ref: ObjRef = heap.allocate(ObjSymTable(self.sym_table, ClassLayout("A", False)))
+        other: ObjRef = heap.allocate(ObjSymTable(self.sym_table, ClassLayout("A", False)))
+        self.assertEqual((1, 2), (ref.handle, other.handle))
+        self.assertEqual(2, len(heap))
+        self.assertIs(ref.value, heap.get(1))
+        self.assertIs(heap, ref.sym_table)
+        self.assertEqual(("_._A_1_._", "_._A_2_._"), (ref.name, other.name))
+        #
+        # Objects are reclaimed along with their last reference
+        #
+        self.sym_table.update_symbol('x', ref)
+        ref = None
+        self.assertIn(1, heap)
+        other = None
+        self.assertNotIn(2, heap)
+        self.assertIsNone(heap.get(2))
+        self.sym_table.clear_symbol('x')
+        self.assertEqual(0, len(heap))
+        self.assertEqual(2, heap.allocated_count)
+        #
+        # Instances are numbered per class, as handles are shared by all classes
+        #
+        self.assertEqual("_._B_1_._", heap.allocate(ObjSymTable(self.sym_table, ClassLayout("B", False))).name)
@@ -1,3 +1,4 @@
+import sys
 from typing import Iterator
 from unittest import TestCase
 
@@ -163,6 +164,20 @@ class TestTokenizer(TestCase):
         self.__test_line('glob"alarray"', [self.id_token("glob"),
                                            self.str_token("alarray")])
 
+    def test_identifiers_and_literals_shared(self):
+        #
+        # All the occurrences of an identifier are the same interned string, and equal string literals share the same string
+        #
+        tokens: list[ParsedToken] = list(self.tokenizer.tokenize(['counter = "text"', 'counter = counter + "te" + "xt"', 'print("text")']))
+        ids: list[str] = [t.text for t in tokens if t.val == TokenVals.ID]
+        self.assertEqual(["counter"] * 3, ids)
+        self.assertTrue(all(text is ids[0] for text in ids))
+        self.assertIs(sys.intern("".join(["coun", "ter"])), ids[0])
+        literals: list[str] = [t.text for t in tokens if t.val == TokenVals.STRING]
+        self.assertEqual(["text", "te", "xt", "text"], literals)
+        self.assertIs(literals[0], literals[3])
+        self.assertEqual(3, len(self.tokenizer.string_pool))
+
     def test_str_literals_properly_closed(self):
         #
         # String literals without closing '"' on the same line should raise a SyntaxError
@@ -1,6 +1,7 @@
 from typing import Iterator, ClassVar, Iterable, Tuple, Optional, Callable
 
 from parsed_token import TokenVals, ParsedToken, KNOWN_CONTENTS_DESC
+from string_pool import StringPool, intern_name
 
 
 class Tokenizer:
@@ -16,6 +17,10 @@ class Tokenizer:
         Takes an optional Callable as input which is called for every line in the source code input that is iterated over.
         """
         self.on_new_line_input = on_new_line_input
+        #
+        # Pool of the string literals of the lines being tokenized, so that equal literals share a single string
+        #
+        self.string_pool: StringPool = StringPool()
 
     def tokenize(self, lines: Iterable[str]) -> Iterator[ParsedToken]:
         """Converts an iterable of lines into an iterator of tokens.
@@ -24,6 +29,7 @@ class Tokenizer:
         :return: succession of tokens, up to comment delimiter.
         """
         Tokenizer.CURRENT_LINE = 0
+        self.string_pool = StringPool()
         for line in lines:
             if self.on_new_line_input is not None:
                 self.on_new_line_input(line)
@@ -160,10 +166,10 @@ class Tokenizer:
             if chunk and chunk[0] == Tokenizer.__STR_SEP:
                 #
                 # If a string, returns string literal token
-                # with text set to the chunk minus the '"' on both ends.
+                # with text set to the chunk minus the '"' on both ends, taken from the pool of literals.
                 #
                 yield (ParsedToken(line_index=Tokenizer.CURRENT_LINE)
-                       .set_text(chunk[1:-1]).set_val(TokenVals.STRING))
+                       .set_text(self.string_pool.pooled(chunk[1:-1])).set_val(TokenVals.STRING))
             else:
                 #
                 # Eliminate white spaces
@@ -192,7 +198,7 @@ class Tokenizer:
             first_char: str = meta_token[i]
             second_char: str = meta_token[i + 1:i + 2]  # this yields '' if out of bounds
             if Tokenizer.__id_cond(first_char):
-                t, i = Tokenizer.__id_token_or_known(first_char, meta_token, i)
+                t, i = Tokenizer.__id_token_or_known(meta_token, i)
                 yield t
             elif Tokenizer.__num_cond(first_char, second_char):
                 t, i = Tokenizer.__num_token(first_char, second_char, meta_token, i)
@@ -223,16 +229,17 @@ class Tokenizer:
         return first_char == Tokenizer.__UNDERSCORE or first_char.isalpha()
 
     @staticmethod
-    def __id_token_or_known(first_char: str, meta_token: str, i: int) -> Tuple[ParsedToken, int]:
+    def __id_token_or_known(meta_token: str, i: int) -> Tuple[ParsedToken, int]:
         #
         # Valid identifiers start with alphabetical characters or underscores and continue with those as well as
-        # digits. Will therefore extract the largest possible substring such that these criteria are met
+        # digits. Will therefore extract the largest possible substring such that these criteria are met.
+        # The text is interned, so that all the occurrences of an identifier share the same name
         #
-        text: str = first_char
+        start: int = i
         i += 1
         while i < len(meta_token) and (meta_token[i] == Tokenizer.__UNDERSCORE or meta_token[i].isalnum()):
-            text += meta_token[i]
             i += 1
+        text: str = intern_name(meta_token[start:i])
         #
         # set_val() set the token value to ID, but set_text() overrides that if the text matches that
         # of a keyword or symbol in KNOWN_TOKENS